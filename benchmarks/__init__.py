@@ -0,0 +1,5 @@
+"""
+Benchmarks for the IPSC ranking system.
+Run individual benchmarks as modules from the repository root, e.g.
+``python -m benchmarks.player_lookup``.
+"""
@@ -0,0 +1,140 @@
+"""
+Benchmark of the full rating pipeline on synthetic match data.
+Times load_matches, inactivity decay, process_match, generate_ranking and
+save_rankings_by_division separately and reports throughput and peak RSS.
+
+Example:
+    python -m benchmarks.pipeline --players 100000 --matches 50000
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+from combined_skill import IPSCRankingSystem
+from run_metrics import peak_rss_mb
+
+
+def generate_in_subprocess(match_dir, players, matches, years, seed):
+    """Generate the synthetic data in a child process so it does not count towards peak RSS"""
+    subprocess.run([
+        sys.executable, '-m', 'benchmarks.synthetic',
+        '--output', match_dir,
+        '--players', str(players),
+        '--matches', str(matches),
+        '--years', str(years),
+        '--seed', str(seed),
+    ], check=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run_pipeline(workdir, workers=None, decay_samples=100):
+    """
+    Run the rating pipeline in ``workdir`` (which holds match_data/) stage by stage.
+
+    Returns:
+        dict: Per stage the wall time in seconds, the number of items processed
+              and the peak RSS in MB after the stage
+    """
+    # The ranking system reads ./match_data/ and writes ./results/
+    previous_dir = os.getcwd()
+    os.chdir(workdir)
+    stages = {}
+
+    def record(stage, start, items, unit):
+        stages[stage] = {
+            'seconds': time.perf_counter() - start,
+            'items': items,
+            'unit': unit,
+            'peak_rss_mb': peak_rss_mb(),
+        }
+
+    try:
+        start = time.perf_counter()
+        ranking_system = IPSCRankingSystem()
+        matches = ranking_system.load_matches(workers=workers)
+        rows = sum(len(match['combined_results']) for match in matches)
+        record('load_matches', start, len(matches), 'matches')
+        stages['load_matches']['rows'] = rows
+
+        start = time.perf_counter()
+        for match in matches:
+            ranking_system.process_match(match)
+        record('process_match', start, len(matches), 'matches')
+        stages['process_match']['rows'] = rows
+
+        # Outstanding lazy decay plus full-population decay passes at later dates
+        start = time.perf_counter()
+        ranking_system.flush_pending_decay()
+        for day in range(1, decay_samples + 1):
+            ranking_system.adjust_for_inactivity(ranking_system.last_match_date + timedelta(days=day))
+        record('adjust_for_inactivity', start, decay_samples * len(ranking_system.store), 'player updates')
+
+        start = time.perf_counter()
+        rankings = ranking_system.generate_ranking(sweden_only=True)
+        record('generate_ranking', start, len(rankings), 'players')
+
+        start = time.perf_counter()
+        ranking_system.save_rankings_by_division()
+        record('save_rankings_by_division', start, len(rankings), 'players')
+    finally:
+        os.chdir(previous_dir)
+
+    return stages
+
+
+def print_report(stages):
+    """Print a table of stage timings and throughput"""
+    print("\n" + "=" * 100)
+    print("RATING PIPELINE BENCHMARK")
+    print("=" * 100)
+    print(f"{'Stage':<28} {'Time (s)':>10} {'Throughput':>32} {'Rows/s':>12} {'Peak RSS (MB)':>14}")
+    print("-" * 100)
+    for stage, result in stages.items():
+        seconds = result['seconds']
+        rate = result['items'] / seconds if seconds > 0 else float('inf')
+        throughput = f"{rate:,.0f} {result['unit']}/s"
+        rows = f"{result['rows'] / seconds:,.0f}" if 'rows' in result and seconds > 0 else ''
+        peak = f"{result['peak_rss_mb']:.1f}" if result['peak_rss_mb'] is not None else '-'
+        print(f"{stage:<28} {seconds:>10.3f} {throughput:>32} {rows:>12} {peak:>14}")
+    print("-" * 100)
+    print(f"{'Total':<28} {sum(r['seconds'] for r in stages.values()):>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the rating pipeline on synthetic data')
+    parser.add_argument('--players', type=int, default=10000, help='Size of the synthetic player pool')
+    parser.add_argument('--matches', type=int, default=5000, help='Number of synthetic match files')
+    parser.add_argument('--years', type=int, default=5, help='Years spanned by the match dates')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed of the generator')
+    parser.add_argument('--workers', type=int, default=None, help='Processes used by load_matches')
+    parser.add_argument('--decay-samples', type=int, default=100,
+                       help='Full-population inactivity decay passes to time')
+    parser.add_argument('--workdir', default=None,
+                       help='Directory to generate into and run in (kept afterwards; reused if it has match_data/)')
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='ipsc_benchmark_')
+    match_dir = os.path.join(workdir, 'match_data')
+    try:
+        if not os.path.isdir(match_dir):
+            print(f"Generating {args.matches} matches for {args.players} players in {match_dir}...")
+            start = time.perf_counter()
+            generate_in_subprocess(match_dir, args.players, args.matches, args.years, args.seed)
+            print(f"Generated in {time.perf_counter() - start:.1f}s")
+        else:
+            print(f"Reusing match data in {match_dir}")
+
+        stages = run_pipeline(workdir, workers=args.workers, decay_samples=args.decay_samples)
+        print_report(stages)
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
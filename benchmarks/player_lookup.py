@@ -0,0 +1,173 @@
+"""
+Microbenchmark of the per-result-row player lookup in the replay loop.
+Compares building the player id from scratch for every row (division
+normalization plus string formatting) with the interned lookup done by
+IPSCRankingSystem.get_or_create_player.
+"""
+
+import argparse
+import random
+import time
+
+from combined_skill import IPSCRankingSystem
+from division_normalizer import normalize_division_name
+from rating_store import RatingStore, make_player_id
+
+RAW_DIVISIONS = (
+    'Open', 'Open+', 'Open-', 'Standard', 'Standard+', 'Standard-',
+    'Production', 'Production-', 'Production Optics', 'Production Optics+',
+    'Revolver', 'Classic', 'Classic-', 'Pistol Caliber Carbine Optics+',
+    'Semi-Auto Open', 'Semi-Auto Standard', 'Modified', 'Custom'
+)
+REGIONS = ('SWE', 'NOR', 'FIN', 'DEN', 'GER', 'POL', 'Unknown')
+
+
+def generate_rows(players, rows, seed=0):
+    """Result rows as (first, last, region, division, alias), drawn from a fixed player pool"""
+    rng = random.Random(seed)
+    pool = [(f"First{i}", f"Last{i}", rng.choice(REGIONS), rng.choice(RAW_DIVISIONS), f"alias{i}")
+            for i in range(players)]
+    return [rng.choice(pool) for _ in range(rows)]
+
+
+def baseline_normalize_division_name(division_name):
+    """Copy of the division normalization before interning, which built its mapping on every call"""
+    if not division_name:
+        return 'Unknown'
+    base_division = division_name.lower().strip()
+    for suffix in ['+', '-', 'plus', 'minus']:
+        if base_division.endswith(suffix):
+            base_division = base_division[:-len(suffix)].strip()
+
+    division_mapping = {
+        # Open variations
+        'open': 'Open',
+        'semi-auto open': 'Open',
+        'semiminusauto_open': 'Open',
+        'semi_auto_open': 'Open',
+
+        # Standard variations
+        'standard': 'Standard',
+        'semi-auto standard': 'Standard',
+        'semiminusauto_standard': 'Standard',
+        'semi_auto_standard': 'Standard',
+        'standard_manual': 'Standard',
+
+        # Production variations
+        'production': 'Production',
+
+        # Revolver variations
+        'revolver': 'Revolver',
+
+        # Classic variations
+        'classic': 'Classic',
+
+        # Pistol Caliber Carbine variations
+        'pistol caliber carbine': 'Pistol Caliber Carbine',
+        'pistol_caliber_carbine': 'Pistol Caliber Carbine',
+        'pistol caliber carbine optics': 'Pistol Caliber Carbine',
+        'pistol_caliber_carbine_optics': 'Pistol Caliber Carbine',
+        'pistol caliber carbine iron': 'Pistol Caliber Carbine',
+        'pistol_caliber_carbine_iron': 'Pistol Caliber Carbine',
+
+        # Production Optics variations
+        'production optics': 'Production Optics',
+        'production_optics': 'Production Optics',
+        'production optics light': 'Production Optics',
+        'production_optics_light': 'Production Optics',
+
+        # Handle other variations that might appear
+        'modified': 'Open',  # Modified is typically similar to Open
+        'custom': 'Open',    # Custom is typically similar to Open
+        'semi-auto limited': 'Standard',  # Limited is typically similar to Standard
+        'semiminusauto_limited': 'Standard',
+    }
+
+    if base_division in division_mapping:
+        return division_mapping[base_division]
+    for key, value in division_mapping.items():
+        if key in base_division or base_division in key:
+            return value
+
+    if 'open' in base_division:
+        return 'Open'
+    elif 'standard' in base_division:
+        return 'Standard'
+    elif 'production' in base_division and 'optics' in base_division:
+        return 'Production Optics'
+    elif 'production' in base_division:
+        return 'Production'
+    elif 'revolver' in base_division:
+        return 'Revolver'
+    elif 'classic' in base_division:
+        return 'Classic'
+    elif 'pistol' in base_division and 'carbine' in base_division:
+        return 'Pistol Caliber Carbine'
+    elif 'carbine' in base_division:
+        return 'Pistol Caliber Carbine'
+    return division_name.strip()
+
+
+def uncached_lookup(store, rows):
+    """Per-row lookup as done before interning: normalize, build the id, look it up"""
+    for first_name, last_name, region, division, alias in rows:
+        normalized_division = baseline_normalize_division_name(division)
+        player_id = make_player_id(first_name, last_name, region, normalized_division)
+        idx = store.index.get(player_id)
+        if idx is None:
+            idx = store.add_player(player_id, first_name, last_name, alias, region, normalized_division)
+
+
+def interned_lookup(ranking_system, rows):
+    """Per-row lookup through the ranking system's intern table"""
+    get_or_create_player = ranking_system.get_or_create_player
+    for first_name, last_name, region, division, alias in rows:
+        get_or_create_player(first_name, last_name, region, division, alias)
+
+
+def best_time(function, repeats):
+    """Best wall time of ``repeats`` calls of ``function``"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark per-row player lookup')
+    parser.add_argument('--players', type=int, default=20000, help='Distinct players')
+    parser.add_argument('--rows', type=int, default=500000, help='Result rows to look up')
+    parser.add_argument('--repeats', type=int, default=5, help='Timed repetitions (best is reported)')
+    args = parser.parse_args()
+
+    rows = generate_rows(args.players, args.rows)
+
+    def run_uncached():
+        uncached_lookup(RatingStore(0.0, 1.0), rows)
+
+    def run_interned():
+        interned_lookup(IPSCRankingSystem(), rows)
+
+    # The baseline copy must still normalize like the current code, and both paths must
+    # assign the same players to the same indices
+    assert all(baseline_normalize_division_name(division) == normalize_division_name(division)
+               for division in RAW_DIVISIONS)
+    store = RatingStore(0.0, 1.0)
+    uncached_lookup(store, rows)
+    ranking_system = IPSCRankingSystem()
+    interned_lookup(ranking_system, rows)
+    assert store.metadata['player_id'] == ranking_system.store.metadata['player_id']
+
+    uncached = best_time(run_uncached, args.repeats)
+    interned = best_time(run_interned, args.repeats)
+
+    print(f"Rows: {args.rows}, distinct players: {len(store)}")
+    print(f"Uncached lookup: {uncached:.3f}s ({uncached / args.rows * 1e9:.0f} ns/row)")
+    print(f"Interned lookup: {interned:.3f}s ({interned / args.rows * 1e9:.0f} ns/row)")
+    print(f"Speedup: {uncached / interned:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Synthetic match data generator for benchmarking the rating pipeline.
+Writes match_<id>.json files in the scraper's format with power-law player
+participation, a Level II-V mix with level-dependent field sizes, mixed
+divisions in combined_results and dates spread over several years.
+"""
+
+import argparse
+import json
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+
+LEVEL_MIX = {'Level II': 0.70, 'Level III': 0.24, 'Level IV': 0.05, 'Level V': 0.01}
+
+# Range of competitors per match level
+LEVEL_FIELD_SIZE = {
+    'Level II': (15, 60),
+    'Level III': (40, 160),
+    'Level IV': (120, 350),
+    'Level V': (250, 900),
+}
+
+# Raw division names as they appear in results (with the +/- variants the normalizer handles)
+DIVISIONS = {
+    'Open': ('Open', 'Open+', 'Open-'),
+    'Standard': ('Standard', 'Standard+', 'Standard-'),
+    'Production': ('Production', 'Production-'),
+    'Production Optics': ('Production Optics', 'Production Optics+', 'Production Optics-'),
+    'Classic': ('Classic', 'Classic-'),
+    'Revolver': ('Revolver',),
+    'Pistol Caliber Carbine': ('Pistol Caliber Carbine Optics', 'Pistol Caliber Carbine Optics+'),
+}
+DIVISION_WEIGHTS = (0.22, 0.22, 0.15, 0.25, 0.08, 0.03, 0.05)
+
+REGIONS = ('SWE', 'NOR', 'FIN', 'DEN', 'GER', 'POL', 'EST')
+REGION_WEIGHTS = (0.55, 0.12, 0.1, 0.08, 0.07, 0.05, 0.03)
+
+# Share of match files scraped without combined results (ineligible or not yet published)
+NO_RESULTS_FRACTION = 0.1
+
+# Share of entries shot in another division than the player's usual one
+OTHER_DIVISION_FRACTION = 0.1
+
+# Participation weight of the k-th most active player is proportional to k ** -exponent
+PARTICIPATION_EXPONENT = 0.8
+
+
+def _sample_participants(rng, cumulative_weights, size):
+    """Draw ``size`` distinct players according to the participation weights"""
+    players = len(cumulative_weights)
+    chosen = np.empty(0, dtype=np.int64)
+    while len(chosen) < size:
+        draws = np.searchsorted(cumulative_weights, rng.random(2 * size), side='right')
+        chosen = np.unique(np.concatenate((chosen, np.minimum(draws, players - 1))))
+    return rng.permutation(chosen)[:size]
+
+
+def generate_matches(players=10000, matches=5000, years=5, seed=0, participation_exponent=PARTICIPATION_EXPONENT):
+    """Yield ``matches`` synthetic match dicts, in match id order, for a pool of ``players`` shooters"""
+    rng = np.random.default_rng(seed)
+
+    division_names = list(DIVISIONS)
+    skill = rng.normal(0.0, 1.0, players)
+    home_division = rng.choice(len(division_names), players, p=DIVISION_WEIGHTS)
+    region = rng.choice(len(REGIONS), players, p=REGION_WEIGHTS)
+
+    weights = np.arange(1, players + 1, dtype=np.float64) ** -participation_exponent
+    rng.shuffle(weights)
+    cumulative_weights = np.cumsum(weights) / weights.sum()
+
+    levels = list(LEVEL_MIX)
+    match_levels = rng.choice(len(levels), matches, p=list(LEVEL_MIX.values()))
+    start = datetime(2025 - years, 1, 1)
+    match_days = rng.integers(0, 365 * years, matches)
+    match_hours = rng.choice([0, 9, 12], matches)
+
+    for match_id in range(1, matches + 1):
+        level = levels[match_levels[match_id - 1]]
+        match_date = start + timedelta(days=int(match_days[match_id - 1]), hours=int(match_hours[match_id - 1]))
+        match_info = {
+            'match_id': match_id,
+            'divisions': [],
+            'match_url': f'/event/22/{match_id}/',
+            'match_title': f'Synthetic {level} Match {match_id}',
+            'match_level': level,
+            'match_date': match_date.isoformat(),
+        }
+
+        if rng.random() >= NO_RESULTS_FRACTION:
+            low, high = LEVEL_FIELD_SIZE[level]
+            size = min(int(rng.integers(low, high + 1)), players)
+            participants = _sample_participants(rng, cumulative_weights, size)
+
+            divisions = home_division[participants].copy()
+            switched = rng.random(size) < OTHER_DIVISION_FRACTION
+            divisions[switched] = rng.choice(len(division_names), int(switched.sum()), p=DIVISION_WEIGHTS)
+
+            performance = skill[participants] + rng.normal(0.0, 0.5, size)
+            best, worst = performance.max(), performance.min()
+            percentage = np.maximum(1.0, 100 * (performance - worst + 0.1) / (best - worst + 0.1))
+            order = np.argsort(-percentage, kind='stable')
+
+            results = []
+            for position, i in enumerate(order.tolist(), start=1):
+                player = int(participants[i])
+                division_name = division_names[divisions[i]]
+                variants = DIVISIONS[division_name]
+                results.append({
+                    'position': position,
+                    'match_percentage': round(float(percentage[i]), 2),
+                    'match_points': round(float(percentage[i]) * 5, 4),
+                    'first_name': f'First{player}',
+                    'last_name': f'Last{player}',
+                    'division': variants[player % len(variants)],
+                    'category': [],
+                    'region': REGIONS[region[player]],
+                    'classification': 'U',
+                    'alias': f'alias{player}' if player % 3 == 0 else '',
+                    'club': f'Club {player % 200}'
+                })
+
+            match_info['divisions'] = [{'url': f'/event/22/{match_id}/{d}/', 'name': division_names[d]}
+                                       for d in sorted(set(divisions.tolist()))]
+            match_info['combined_results'] = results
+
+        yield match_info
+
+
+def synthetic_matches(players=10000, matches=5000, years=5, seed=0):
+    """Synthetic matches with results as an in-memory list, ordered by date then match id like the engine's"""
+    generated = [match for match in generate_matches(players, matches, years, seed) if match.get('combined_results')]
+    generated.sort(key=lambda match: (match['match_date'], match['match_id']))
+    return generated
+
+
+def generate_match_data(output_dir, players=10000, matches=5000, years=5, seed=0,
+                        participation_exponent=PARTICIPATION_EXPONENT):
+    """
+    Write ``matches`` synthetic match files for a pool of ``players`` shooters.
+
+    Returns:
+        dict: Number of match files, files with results, result rows and
+              distinct players that took part
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    total_rows = 0
+    with_results = 0
+    participated = set()
+
+    for match_info in generate_matches(players, matches, years, seed, participation_exponent):
+        results = match_info.get('combined_results')
+        if results:
+            total_rows += len(results)
+            with_results += 1
+            participated.update(result['first_name'] for result in results)
+
+        with open(os.path.join(output_dir, f"match_{match_info['match_id']}.json"), 'w', encoding='utf-8') as f:
+            json.dump(match_info, f, indent=2, ensure_ascii=False)
+
+    return {
+        'matches': matches,
+        'matches_with_results': with_results,
+        'result_rows': total_rows,
+        'players': len(participated),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic IPSC match data')
+    parser.add_argument('--output', default='./match_data/', help='Directory to write match files to')
+    parser.add_argument('--players', type=int, default=10000, help='Size of the player pool')
+    parser.add_argument('--matches', type=int, default=5000, help='Number of match files')
+    parser.add_argument('--years', type=int, default=5, help='Years spanned by the match dates')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    args = parser.parse_args()
+
+    summary = generate_match_data(args.output, args.players, args.matches, args.years, args.seed)
+    print(f"Generated {summary['matches']} matches ({summary['matches_with_results']} with results, "
+          f"{summary['result_rows']} result rows, {summary['players']} players) in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,41 @@
 import openskill
+import argparse
+import copy
 import json
 import os
-import csv
+import time
 import numpy as np
 from datetime import datetime, timedelta
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import lru_cache
+from itertools import groupby
 import statistics
 
 import openskill.models
 
 from pprint import pprint
 from division_normalizer import normalize_division_name
+from rating_store import (RatingStore, NO_MATCH, MICROSECONDS_PER_DAY, make_player_id,
+                          to_microseconds, from_microseconds)
+from match_store import MatchStore, MATCH_STORE_LOCATION
+from match_manifest import update_manifest, matches_with_results, read_match_files
+from rating_kernel import bradley_terry_part_rate
+from decay_models import ConstantDecay, ExponentialDecay
+from rating_checkpoint import (save_checkpoint, load_checkpoint, restore_checkpoint, parameter_differences,
+                               save_history_checkpoint, list_history_checkpoints, truncate_history,
+                               HISTORY_LOCATION)
+from run_metrics import RunMetrics, timed_stage
+from rating_ledger import RatingLedger, LEDGER_LOCATION
+from rating_evaluation import PredictiveEvaluator
+from wave_scheduler import WaveReplay
+from results_writer import (rankings_json, rankings_csv, write_output_files, available_compressions,
+                            COMPRESSION_FORMATS)
 
 MATCH_FILES_LOCATION = './match_data/'
 RESULTS_FOLDER = './results/'
+CHECKPOINT_FILE = './checkpoints/rating_checkpoint.npz'
 
 OPENSKILL_MODEL = openskill.models.BradleyTerryPart
 
@@ -30,26 +52,87 @@ MAX_SIGMA_MULTIPLIER = 2.0         # Maximum sigma as multiple of starting sigma
 # Legacy constant decay (kept for compatibility/comparison)
 SIGMA_DECAY_PER_DAY = 0.01  # Constant added to sigma per day of inactivity
 
+# Apply inactivity decay lazily, only to the players taking part in a match
+# (and once more before ranking), instead of to every player before every match
+LAZY_DECAY = True
+
+# Rate matches with the in-project NumPy Bradley-Terry partial pairing kernel
+# instead of openskill's object-based BradleyTerryPart.rate
+VECTORIZED_RATING_KERNEL = False
+
+# Default locations of the JSON run report and cProfile capture (see --report/--profile)
+RUN_REPORT_FILE = './run_report.json'
+PROFILE_FILE = './run_profile.prof'
+
+# Precompressed copies written next to each result file; .br is opt-in (--compress gz br)
+# since it needs the optional brotli package
+OUTPUT_COMPRESSION = ('gz',)
+
 from scipy.stats import norm
 z_score = abs(norm.ppf(PERCENTILE / 100.0))
 
 START_SIGMA = START_MU/z_score
 
+@lru_cache(maxsize=None)
+def percentile_z_score(percentile):
+    """Number of standard deviations below the mean at the given percentile"""
+    return abs(norm.ppf(percentile / 100.0))
+
+def first_divergence(rated_ids, rated_hashes, match_ids, match_hashes):
+    """Number of leading matches that are the same (id and, where known, content hash) in both lists
+    
+    Equal to ``len(rated_ids)`` when everything rated is still available unchanged.
+    """
+    for position, (rated_id, rated_hash, match_id, match_hash) in enumerate(
+            zip(rated_ids, rated_hashes, match_ids, match_hashes)):
+        if rated_id != match_id or (rated_hash and match_hash and rated_hash != match_hash):
+            return position
+    return min(len(rated_ids), len(match_ids))
+
+def rate_match_arrays(model, vectorized_kernel, mu, sigma, scores):
+    """New mu and sigma arrays of one match's participants (one-player teams), rated by ``model``"""
+    if vectorized_kernel:
+        return bradley_terry_part_rate(model, mu, sigma, scores)
+    teams = [[model.rating(mu=float(player_mu), sigma=float(player_sigma))] for player_mu, player_sigma in zip(mu, sigma)]
+    updated_teams = model.rate(teams, scores=scores)
+    return (np.array([team[0].mu for team in updated_teams], dtype=np.float64),
+            np.array([team[0].sigma for team in updated_teams], dtype=np.float64))
+
+def parse_match_date(match_data):
+    """Parse the ISO match date of a match"""
+    return datetime.fromisoformat(match_data['match_date'].replace('Z', '+00:00'))
+
 class IPSCRankingSystem:
     def __init__(self,
                  exponential_initial_decay=EXPONENTIAL_INITIAL_DECAY,
                  exponential_growth_rate=EXPONENTIAL_GROWTH_RATE,
                  max_sigma_multiplier=MAX_SIGMA_MULTIPLIER,
                  use_exponential_decay=True,
-                 sigma_decay_per_day=SIGMA_DECAY_PER_DAY):
+                 sigma_decay_per_day=SIGMA_DECAY_PER_DAY,
+                 lazy_decay=LAZY_DECAY,
+                 vectorized_kernel=VECTORIZED_RATING_KERNEL,
+                 decay_model=None,
+                 model_class=OPENSKILL_MODEL,
+                 same_day_batch=False):
         # Initialize OpenSkill model with custom parameters for IPSC
-        self.model = OPENSKILL_MODEL(
+        self.model = model_class(
             mu=START_MU,  # Default skill level
             sigma=START_SIGMA,  # Default uncertainty
             beta=START_MU/12,  # Default for L2 matches, will be adjusted per match level
             tau=START_MU/300,  # Skill decay rate per day (kept for compatibility)
         )
         
+        # The vectorized kernel reproduces BradleyTerryPart only
+        if vectorized_kernel and not isinstance(self.model, openskill.models.BradleyTerryPart):
+            raise ValueError(f"The vectorized rating kernel requires BradleyTerryPart, not {model_class.__name__}")
+        self.vectorized_kernel = vectorized_kernel
+        
+        # Rate each calendar day's matches from a snapshot taken at the start of the
+        # day (see process_day); relies on the lazy decay timeline
+        if same_day_batch and not lazy_decay:
+            raise ValueError("Same-day batches require lazy decay")
+        self.same_day_batch = same_day_batch
+        
         # Optimized exponential decay configuration
         self.use_exponential_decay = use_exponential_decay
         self.exponential_initial_decay = exponential_initial_decay
@@ -59,11 +142,47 @@ class IPSCRankingSystem:
         # Legacy constant decay (for backward compatibility)
         self.sigma_decay_per_day = sigma_decay_per_day
         
-        # Store all players with their current ratings
-        self.players = {}
+        # Decay model computing the sigma added for inactivity (see decay_models.py);
+        # built from the settings above unless one is given
+        self.decay_model = decay_model or self._default_decay_model()
         
-        # Track match history for inactivity adjustment
-        self.player_last_match = {}
+        # Store all players with their current ratings, last match time and
+        # lazy decay position as parallel arrays indexed by player index
+        self.store = RatingStore(self.model.mu, self.model.sigma)
+        
+        # Intern table of raw (first, last, region, division) result fields -> store index
+        self.player_handles = {}
+        
+        # Rankings by sweden_only flag, cleared whenever ratings change
+        self.ranking_cache = {}
+        
+        # Stage timings, per-match latency and counters of this run
+        self.metrics = RunMetrics()
+        
+        # Optional append-only ledger of every rating change (see open_ledger)
+        self.ledger = None
+        
+        # Directory for a dated checkpoint at every month boundary of the replay, or None
+        self.history_directory = None
+        
+        # Optional predictive evaluator scoring pre-match ratings (see rating_evaluation.py)
+        self.evaluator = None
+        
+        # When a list, decay statistics are appended to it instead of accumulated, so
+        # replays that rate matches out of order can add them in match order
+        self.decay_statistics_log = None
+        
+        # Lazy decay state: the time of every processed match (the points at which
+        # eager decay would have been applied). Each player's position in this
+        # timeline up to which decay has been applied lives in the store.
+        self.lazy_decay = lazy_decay
+        self.decay_timeline = np.empty(1024, dtype=np.int64)
+        self.decay_timeline_length = 0
+        
+        # Matches rated so far, used to resume from checkpoints
+        self.processed_match_ids = []
+        self.processed_match_hashes = []
+        self.last_match_date = None
         
         # Track time decay statistics
         self.time_decay_stats = {
@@ -83,149 +202,585 @@ class IPSCRankingSystem:
         # Ensure results folder exists
         os.makedirs(RESULTS_FOLDER, exist_ok=True)
     
-    def load_matches(self):
-        """Load all match files from the match_data directory"""
-        matches = []
-        
-        for filename in os.listdir(MATCH_FILES_LOCATION):
-            if filename.endswith('.json'):
-                filepath = os.path.join(MATCH_FILES_LOCATION, filename)
-                try:
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        match_data = json.load(f)
-                        if 'combined_results' in match_data and len(match_data['combined_results']) > 0:
-                            matches.append(match_data)
-                except Exception as e:
-                    print(f"Error loading {filename}: {e}")
-        
-        # Sort matches by date
-        matches.sort(key=lambda x: datetime.fromisoformat(x['match_date'].replace('Z', '+00:00')))
+    @timed_stage('load')
+    def load_matches(self, workers=None):
+        """Load all match files with results, using the match manifest to skip empty ones
+        
+        Args:
+            workers (int): Processes used to parse the files (default: one per CPU)
+        """
+        manifest = update_manifest(MATCH_FILES_LOCATION)
+        matches = read_match_files(MATCH_FILES_LOCATION, matches_with_results(manifest), workers)
+        
+        # Sort matches by date, then match id so same-day matches have a fixed order
+        matches.sort(key=lambda x: (parse_match_date(x), x.get('match_id', -1)))
         return matches
     
     def get_player_id(self, first_name, last_name, region, division, alias=None):
         """Create a unique player identifier with division"""
-        return f"{first_name}_{last_name}_{region}_{division}".lower().replace(' ', '_').replace('+', 'plus').replace('-', 'minus')
+        return make_player_id(first_name, last_name, region, division)
     
     def get_or_create_player(self, first_name, last_name, region, division, alias=None):
-        """Get existing player or create new one"""
+        """Get existing player or create new one, returning the player's index in the store"""
+        # Raw result fields map straight to the player's index once seen
+        key = (first_name, last_name, region, division)
+        idx = self.player_handles.get(key)
+        if idx is not None:
+            return idx
+        
         # Normalize the division name
         normalized_division = normalize_division_name(division)
         player_id = self.get_player_id(first_name, last_name, region, normalized_division, alias)
         
-        if player_id not in self.players:
-            self.players[player_id] = {
-                'rating': self.model.rating(name=player_id),
-                'first_name': first_name,
-                'last_name': last_name,
-                'alias': alias,
-                'region': region,
-                'division': normalized_division,
-                'matches_played': 0
-            }
+        idx = self.store.index.get(player_id)
+        if idx is None:
+            idx = self.store.add_player(player_id, first_name, last_name, alias, region, normalized_division)
         
-        return player_id
+        self.player_handles[key] = idx
+        return idx
+    
+    def _default_decay_model(self):
+        """Exponential decay (gentle at first, accelerating for long absences) or the legacy constant decay"""
+        if self.use_exponential_decay:
+            return ExponentialDecay(initial_decay=self.exponential_initial_decay,
+                                    growth_rate=self.exponential_growth_rate)
+        return ConstantDecay(decay_per_day=self.sigma_decay_per_day)
     
+    def calculate_additional_sigma(self, days_inactive, player_indices=None):
+        """Sigma added for the given days of inactivity (NumPy array) of the given players"""
+        player_state = None
+        if self.decay_model.uses_player_state:
+            player_state = {'indices': player_indices, 'store': self.store}
+        return self.decay_model.additional_sigma(days_inactive, player_state)
+
     def adjust_for_inactivity(self, current_date):
         """Adjust ratings for player inactivity using optimized exponential decay"""
-        for player_id, player_data in self.players.items():
-            if player_id in self.player_last_match:
-                days_since_last_match = (current_date - self.player_last_match[player_id]).days
-                if days_since_last_match > 0:
-                    current_rating = player_data['rating']
-                    
-                    # Apply optimized exponential decay or fallback to constant decay
-                    if self.use_exponential_decay:
-                        # Exponential decay: additional_sigma = initial_decay * (exp(growth_rate * days/30) - 1)
-                        # This provides gentle initial decay that accelerates for longer inactivity periods
-                        additional_sigma = self.exponential_initial_decay * (
-                            np.exp(self.exponential_growth_rate * days_since_last_match / 30) - 1
-                        )
-                    else:
-                        # Legacy constant decay
-                        additional_sigma = self.sigma_decay_per_day * days_since_last_match
-                    
-                    # Calculate new sigma with decay
-                    new_sigma = current_rating.sigma + additional_sigma
-                    
-                    # Cap sigma at maximum allowed value (multiple of starting sigma)
-                    max_sigma = START_SIGMA * self.max_sigma_multiplier
-                    new_sigma = min(new_sigma, max_sigma)
-                    
-                    # Create a new rating with updated sigma (mu stays the same)
-                    try:
-                        player_data['rating'] = self.model.rating(
-                            mu=current_rating.mu,
-                            sigma=new_sigma
-                        )
-                        
-                        # Update statistics
-                        if additional_sigma > 0:
-                            self.time_decay_stats['players_affected'] += 1
-                            self.time_decay_stats['total_decay_applied'] += additional_sigma
-                            self.time_decay_stats['max_days_inactive'] = max(
-                                self.time_decay_stats['max_days_inactive'],
-                                days_since_last_match
-                            )
-                        
-                        # Optional: Log significant decay for debugging
-                        if days_since_last_match > 30 and False:  # Log if inactive for more than 30 days
-                            decay_type = "exponential" if self.use_exponential_decay else "constant"
-                            print(f"Applied {decay_type} time decay to {player_id}: {days_since_last_match} days inactive, "
-                                  f"sigma: {current_rating.sigma:.2f} -> {new_sigma:.2f} (+{additional_sigma:.3f})")
-                                  
-                    except Exception as e:
-                        print(f"Could not adjust inactivity for {player_id}: {e}")
+        self.ranking_cache.clear()
+        store = self.store
+        last_match = store.active('last_match_time')
+        
+        # Only players that have played and have been inactive for at least a day
+        inactive = np.flatnonzero(last_match != NO_MATCH)
+        days_since_last_match = (to_microseconds(current_date) - last_match[inactive]) // MICROSECONDS_PER_DAY
+        has_gap = days_since_last_match > 0
+        inactive = inactive[has_gap]
+        days_since_last_match = days_since_last_match[has_gap]
+        if inactive.size == 0:
+            return
+        
+        additional_sigma = self.calculate_additional_sigma(days_since_last_match, inactive)
+        
+        # Add decay and cap sigma at maximum allowed value (multiple of starting sigma);
+        # mu stays the same
+        max_sigma = START_SIGMA * self.max_sigma_multiplier
+        store.sigma[inactive] = np.minimum(store.sigma[inactive] + additional_sigma, max_sigma)
+        
+        # Update statistics
+        self._record_decay_statistics(days_since_last_match, additional_sigma)
+
+    def _record_decay_statistics(self, days_inactive, additional_sigma):
+        """Accumulate time decay statistics for a batch of decay steps"""
+        applied = additional_sigma > 0
+        if applied.any():
+            self.add_decay_statistics(int(applied.sum()), additional_sigma[applied].sum(),
+                                      int(days_inactive[applied].max()))
+    
+    def add_decay_statistics(self, players_affected, decay_applied, max_days_inactive):
+        """Add one batch of decay steps to the time decay statistics (or to ``decay_statistics_log``)"""
+        if self.decay_statistics_log is not None:
+            self.decay_statistics_log.append((players_affected, decay_applied, max_days_inactive))
+            return
+        self.time_decay_stats['players_affected'] += players_affected
+        self.time_decay_stats['total_decay_applied'] += decay_applied
+        self.time_decay_stats['max_days_inactive'] = max(self.time_decay_stats['max_days_inactive'],
+                                                         max_days_inactive)
+
+    def apply_pending_decay(self, idx, upto=None):
+        """Bring a player's sigma up to date with the decay the eager path would have applied
+        
+        Decay is applied for every processed match between the player's last decay and
+        position ``upto`` of the decay timeline (defaults to its end), exactly as
+        adjust_for_inactivity would have done before each of those matches.
+        Returns whether any decay was applied.
+        """
+        store = self.store
+        start = store.decayed_through[idx]
+        if start < 0:
+            return False
+        end = self.decay_timeline_length if upto is None else upto
+        if end <= start:
+            return False
+        store.decayed_through[idx] = end
+        
+        days_inactive = (self.decay_timeline[start:end] - store.last_match_time[idx]) // MICROSECONDS_PER_DAY
+        days_inactive = days_inactive[days_inactive > 0]
+        if days_inactive.size == 0:
+            return False
+        
+        additional_sigma = self.calculate_additional_sigma(days_inactive, np.full(days_inactive.size, idx))
+        
+        # Accumulate sequentially (as the eager loop does); capping once at the end is
+        # equivalent to capping after every step since each step only adds sigma
+        new_sigma = np.cumsum(np.concatenate(([store.sigma[idx]], additional_sigma)))[-1]
+        store.sigma[idx] = min(new_sigma, START_SIGMA * self.max_sigma_multiplier)
+        
+        self._record_decay_statistics(days_inactive, additional_sigma)
+        return True
+
+    def flush_pending_decay(self):
+        """Apply outstanding lazy decay to all players, e.g. before ranking"""
+        if not self.lazy_decay:
+            return
+        decayed_through = self.store.active('decayed_through')
+        pending = np.flatnonzero((decayed_through >= 0) & (decayed_through < self.decay_timeline_length))
+        for idx in pending:
+            self.apply_pending_decay(idx)
+
+    def apply_decay_until(self, date):
+        """Apply inactivity decay to all players up to ``date``, as if a match were held then"""
+        self.flush_pending_decay()
+        self.adjust_for_inactivity(date)
+
+    def _append_to_decay_timeline(self, match_time):
+        """Record a processed match time, growing the timeline array as needed"""
+        if self.decay_timeline_length == len(self.decay_timeline):
+            self.decay_timeline = np.concatenate((self.decay_timeline, np.empty_like(self.decay_timeline)))
+        self.decay_timeline[self.decay_timeline_length] = match_time
+        self.decay_timeline_length += 1
 
     def process_match(self, match_data):
         """Process a single match and update player ratings"""
         if 'combined_results' not in match_data:
             return
         
-        match_date = datetime.fromisoformat(match_data['match_date'].replace('Z', '+00:00'))
+        started = time.perf_counter()
+        match_date = parse_match_date(match_data)
         match_level = match_data.get('match_level', 'Level II')
         
-        # Apply time decay for all players based on inactivity before processing this match
-        self.adjust_for_inactivity(match_date)
-        
-        # Adjust the model's beta for this match level
-        self.model.beta = self.beta_values.get(match_level, self.beta_values['Level II'])
-        
-        # Prepare teams using existing ratings directly
-        teams = []
-        player_ids = []
-        
-        for result in match_data['combined_results']:
-            player_id = self.get_or_create_player(
+        player_indices = [
+            self.get_or_create_player(
                 result['first_name'],
                 result['last_name'],
                 result.get('region', 'Unknown'),
                 result.get('division', 'Unknown'),
                 result.get('alias'),
             )
-            player_ids.append(player_id)
-            teams.append([self.players[player_id]['rating']])
+            for result in match_data['combined_results']
+        ]
+        scores = [result['match_percentage'] for result in match_data['combined_results']]
+        
+        self._rate_match(match_data.get('match_id', 'unknown'), match_date, match_level, player_indices, scores,
+                         started, match_data.get('content_hash'))
+    
+    def replay_match_store(self, match_store, start=0, verbose=False, end=None):
+        """Process matches of a compiled match store, from position ``start`` up to ``end`` (exclusive)"""
+        # Map the store's player codes to rating store indices as players are first seen
+        code_to_index = np.full(len(match_store.tables['player_ids']), -1, dtype=np.int64)
+        
+        for i in range(start, len(match_store) if end is None else end):
+            if verbose:
+                print(f"Processing match {i+1}/{len(match_store)}: {match_store.match_title(i)}")
             
-            self.player_last_match[player_id] = match_date
-            self.players[player_id]['matches_played'] += 1
+            started = time.perf_counter()
+            rows = match_store.result_slice(i)
+            self._rate_match(
+                int(match_store.match_id[i]),
+                from_microseconds(match_store.match_time[i]),
+                match_store.match_level(i),
+                self.match_store_players(match_store, i, code_to_index).tolist(),
+                match_store.match_percentage[rows].tolist(),
+                started,
+            )
+    
+    def match_store_players(self, match_store, i, code_to_index):
+        """Store indices of the participants of match ``i`` of a compiled match store
         
-        scores = [result['match_percentage'] for result in match_data['combined_results']]
+        ``code_to_index`` maps the match store's player codes to store indices
+        (-1 until seen) and is filled in as players are first seen.
+        """
+        player_codes = match_store.player_code[match_store.result_slice(i)]
+        player_indices = code_to_index[player_codes]
+        for code in np.unique(player_codes[player_indices < 0]):
+            player_id, first_name, last_name, alias, region, division = match_store.player_metadata(code)
+            idx = self.store.index.get(player_id)
+            if idx is None:
+                idx = self.store.add_player(player_id, first_name, last_name, alias, region, division)
+            code_to_index[code] = idx
+        return code_to_index[player_codes]
+    
+    def _rate_match(self, match_id, match_date, match_level, player_indices, scores, started=None,
+                    content_hash=None):
+        """Apply decay and rate one match given its participants' store indices and scores
+        
+        ``started`` is when work on the match began (e.g. before player lookup),
+        for the per-match latency recorded in the run metrics. ``content_hash``
+        identifies the version of the match file that was rated.
+        """
+        if started is None:
+            started = time.perf_counter()
+        match_time = to_microseconds(match_date)
+        store = self.store
+        
+        # Keep the state at the end of each month for point-in-time rankings
+        if (self.history_directory and self.last_match_date is not None and
+                (match_date.year, match_date.month) != (self.last_match_date.year, self.last_match_date.month)):
+            self.save_history_checkpoint()
+        
+        # Ratings are about to change
+        self.ranking_cache.clear()
+        
+        # Record progress for checkpointing
+        self.processed_match_ids.append(match_id)
+        self.processed_match_hashes.append(content_hash)
+        self.last_match_date = match_date
+        
+        # Apply time decay based on inactivity before processing this match, either to
+        # all players now or, in lazy mode, to each participant before it is rated
+        decay_started = time.perf_counter()
+        if self.lazy_decay:
+            self._append_to_decay_timeline(match_time)
+            players_decayed = 0
+            for idx in player_indices:
+                players_decayed += self.apply_pending_decay(idx)
+                store.decayed_through[idx] = self.decay_timeline_length
+        else:
+            players_affected = self.time_decay_stats['players_affected']
+            self.adjust_for_inactivity(match_date)
+            players_decayed = self.time_decay_stats['players_affected'] - players_affected
+        rate_started = time.perf_counter()
+        self.metrics.add_time('decay', rate_started - decay_started)
+        
+        # Adjust the model's beta for this match level
+        self.model.beta = self.beta_values.get(match_level, self.beta_values['Level II'])
+        
+        if self.evaluator is not None:
+            evaluator_indices = np.array(player_indices, dtype=np.intp)
+            self.evaluator.observe(match_time, match_level, self.model.beta, store.mu[evaluator_indices],
+                                   store.sigma[evaluator_indices], scores)
+        
+        if self.ledger is not None:
+            ledger_indices = np.array(player_indices, dtype=np.intp)
+            mu_before = store.mu[ledger_indices]
+            sigma_before = store.sigma[ledger_indices]
+        
+        self._update_ratings(self.model, match_id, match_time, player_indices, scores)
+        
+        if self.ledger is not None:
+            self.ledger.record_match(len(self.processed_match_ids) - 1, match_id, match_time, ledger_indices,
+                                     mu_before, sigma_before, store.mu[ledger_indices], store.sigma[ledger_indices],
+                                     scores)
+        
+        finished = time.perf_counter()
+        self.metrics.add_time('rate', finished - rate_started)
+        self.metrics.record_match(match_id, finished - started, len(player_indices),
+                                  len(set(player_indices)), players_decayed)
+    
+    def replay_days(self, matches, executor=None, verbose=False):
+        """Rate date ordered match dicts one calendar day at a time and return the number of days"""
+        days = 0
+        for day, day_matches in groupby(matches, key=lambda match: parse_match_date(match).date()):
+            day_matches = list(day_matches)
+            if verbose:
+                print(f"Processing {len(day_matches)} matches of {day}: "
+                      f"{', '.join(match.get('match_title', 'Unknown') for match in day_matches)}")
+            self.process_day(day_matches, executor)
+            days += 1
+        return days
+    
+    def process_day(self, matches, executor=None):
+        """Rate one calendar day's matches from a frozen snapshot of the ratings (same_day_batch mode)
+        
+        Every match is rated from its participants' ratings at the start of the day,
+        after inactivity decay, so the day's matches are independent of each other
+        and are rated concurrently when an ``executor`` is given. A player in several
+        of the day's matches gets the sum of their mu changes and the product of their
+        sigma ratios, combined in match order; a player in a single match gets exactly
+        that match's result.
+        """
+        if not self.same_day_batch:
+            raise ValueError("process_day requires a ranking system created with same_day_batch=True")
+        if self.ledger is not None:
+            raise ValueError("The rating ledger records sequential updates and cannot be used with same-day batches")
+        matches = [match for match in matches if match.get('combined_results')]
+        if not matches:
+            return
+        
+        started = time.perf_counter()
+        store = self.store
+        match_dates = [parse_match_date(match) for match in matches]
+        match_times = [to_microseconds(match_date) for match_date in match_dates]
+        
+        # Keep the state at the end of each month for point-in-time rankings
+        if (self.history_directory and self.last_match_date is not None and
+                (match_dates[0].year, match_dates[0].month) != (self.last_match_date.year, self.last_match_date.month)):
+            self.save_history_checkpoint()
+        
+        self.ranking_cache.clear()
+        match_players = [
+            np.array([
+                self.get_or_create_player(
+                    result['first_name'],
+                    result['last_name'],
+                    result.get('region', 'Unknown'),
+                    result.get('division', 'Unknown'),
+                    result.get('alias'),
+                )
+                for result in match['combined_results']
+            ], dtype=np.intp)
+            for match in matches
+        ]
+        match_scores = [[result['match_percentage'] for result in match['combined_results']] for match in matches]
+        
+        # One model per match so concurrently rated matches do not share a mutable beta
+        match_levels = [match.get('match_level', 'Level II') for match in matches]
+        models = []
+        for match_level in match_levels:
+            model = copy.copy(self.model)
+            model.beta = self.beta_values.get(match_level, self.beta_values['Level II'])
+            models.append(model)
+        
+        # Decay each participant up to its first match of the day; its later matches
+        # that day are less than a day apart and add no decay
+        decay_started = time.perf_counter()
+        timeline_start = self.decay_timeline_length
+        for match_time in match_times:
+            self._append_to_decay_timeline(match_time)
+        decayed = set()
+        players_decayed = []
+        for k, players in enumerate(match_players):
+            count = 0
+            for idx in players.tolist():
+                if idx not in decayed:
+                    decayed.add(idx)
+                    count += self.apply_pending_decay(idx, upto=timeline_start + k + 1)
+            players_decayed.append(count)
+        rate_started = time.perf_counter()
+        self.metrics.add_time('decay', rate_started - decay_started)
+        
+        # Frozen snapshot of every match's participants
+        snapshot_mu = [store.mu[players] for players in match_players]
+        snapshot_sigma = [store.sigma[players] for players in match_players]
+        if self.evaluator is not None:
+            for k in range(len(matches)):
+                self.evaluator.observe(match_times[k], match_levels[k], models[k].beta, snapshot_mu[k],
+                                       snapshot_sigma[k], match_scores[k])
+        
+        if executor is not None:
+            pending = [executor.submit(rate_match_arrays, models[k], self.vectorized_kernel, snapshot_mu[k],
+                                       snapshot_sigma[k], match_scores[k]) for k in range(len(matches))]
+        results = []
+        for k, match in enumerate(matches):
+            try:
+                if executor is not None:
+                    results.append(pending[k].result())
+                else:
+                    results.append(rate_match_arrays(models[k], self.vectorized_kernel, snapshot_mu[k],
+                                                     snapshot_sigma[k], match_scores[k]))
+            except Exception as e:
+                print(f"Error processing match {match.get('match_id', 'unknown')}: {e}")
+                results.append((snapshot_mu[k], snapshot_sigma[k]))
+        
+        # Merge the updates in match order
+        merged = np.zeros(len(store), dtype=bool)
+        for k, (players, (new_mu, new_sigma)) in enumerate(zip(match_players, results)):
+            first = ~merged[players]
+            store.mu[players] = np.where(first, new_mu, store.mu[players] + (new_mu - snapshot_mu[k]))
+            store.sigma[players] = np.where(first, new_sigma, store.sigma[players] * (new_sigma / snapshot_sigma[k]))
+            merged[players] = True
+            store.last_match_time[players] = match_times[k]
+            np.add.at(store.matches_played, players, 1)
+            store.decayed_through[players] = timeline_start + k + 1
+            self.processed_match_ids.append(matches[k].get('match_id', 'unknown'))
+            self.processed_match_hashes.append(matches[k].get('content_hash'))
+        self.last_match_date = match_dates[-1]
+        self.model.beta = models[-1].beta
+        
+        finished = time.perf_counter()
+        self.metrics.add_time('rate', finished - rate_started)
+        for k, players in enumerate(match_players):
+            self.metrics.record_match(matches[k].get('match_id', 'unknown'), (finished - started) / len(matches),
+                                      len(players), len(np.unique(players)), players_decayed[k])
+    
+    def _update_ratings(self, model, match_id, match_time, player_indices, scores):
+        """Rate one match with ``model`` (beta already set for its level), updating the participants in the store"""
+        store = self.store
+        player_indices = np.array(player_indices, dtype=np.intp)
+        store.last_match_time[player_indices] = match_time
+        np.add.at(store.matches_played, player_indices, 1)
         
         try:
-            updated_teams = self.model.rate(teams, scores=scores)
-            
-            # Update player ratings directly
-            for i, player_id in enumerate(player_ids):
-                self.players[player_id]['rating'] = updated_teams[i][0]
-                
+            # Gather by player index, rate on arrays and scatter back
+            store.mu[player_indices], store.sigma[player_indices] = rate_match_arrays(
+                model, self.vectorized_kernel, store.mu[player_indices], store.sigma[player_indices], scores
+            )
         except Exception as e:
-            print(f"Error processing match {match_data.get('match_id', 'unknown')}: {e}")
+            print(f"Error processing match {match_id}: {e}")
+    
+    def open_ledger(self, directory=LEDGER_LOCATION):
+        """Start recording rating changes in the ledger, continuing after the matches processed so far"""
+        self.ledger = RatingLedger(directory, start_match_index=len(self.processed_match_ids))
+        if self.ledger.records_kept:
+            print(f"Continuing rating ledger in {directory} after {self.ledger.records_kept} records")
+    
+    def close_ledger(self):
+        """Flush the ledger and rebuild its per-player index"""
+        if self.ledger is None:
+            return
+        records = self.ledger.close(self.store.metadata['player_id'])
+        print(f"Rating ledger in {self.ledger.directory} holds {records} records")
+        self.ledger = None
+    
+    @timed_stage('checkpoint')
+    def save_checkpoint(self, path=CHECKPOINT_FILE):
+        """Persist the full rating state after the last processed match"""
+        header = save_checkpoint(self, path)
+        print(f"Saved rating checkpoint after {header['matches_processed']} matches "
+              f"(last match date: {header['last_match_date']}) to {path}")
+    
+    @timed_stage('checkpoint')
+    def save_history_checkpoint(self):
+        """Persist the rating state after the last processed match as a dated history checkpoint"""
+        save_history_checkpoint(self, self.history_directory)
+    
+    @timed_stage('checkpoint')
+    def resume_from_checkpoint(self, match_ids, match_times, path=CHECKPOINT_FILE, match_hashes=None,
+                               history_directory=HISTORY_LOCATION):
+        """Restore the rating state from a checkpoint and return the position to replay from
+        
+        ``match_ids`` and ``match_times`` (microseconds) describe the date-ordered
+        matches available. Falls back to a full replay (position 0, state left
+        untouched) if there is no usable checkpoint or if it was produced with
+        different decay or beta parameters.
+        
+        With ``match_hashes`` (content hash of each match file) late, corrected
+        and removed matches are detected by comparing the matches in processing
+        order with those the checkpoint rated. The state is then rolled back to
+        the nearest history checkpoint before the first difference and replayed
+        from there. Without hashes, a match older than the checkpoint that is not
+        part of it causes a full replay.
+        """
+        checkpoint = load_checkpoint(path)
+        if checkpoint is None:
+            print("Falling back to full replay")
+            return 0
+        
+        differences = parameter_differences(self, checkpoint)
+        if differences:
+            print(f"Checkpoint parameters differ ({', '.join(differences)}), falling back to full replay")
+            return 0
+        
+        # Kept to report whose ratings moved once the replay is done
+        self.previous_checkpoint = checkpoint
+        
+        header = checkpoint['header']
+        if header['last_match_date'] is None:
+            restore_checkpoint(self, checkpoint)
+            return 0
+        
+        if match_hashes is not None:
+            return self._resume_with_change_detection(checkpoint, match_ids, match_times, match_hashes,
+                                                      history_directory)
+        
+        checkpoint_time = to_microseconds(datetime.fromisoformat(header['last_match_date']))
+        processed_ids = set(checkpoint['processed_match_ids'])
+        
+        # Matches are date ordered, so the new ones are a suffix
+        start = len(match_times)
+        while start > 0 and match_times[start - 1] > checkpoint_time:
+            start -= 1
+        late_matches = sum(1 for match_id in match_ids[:start] if match_id not in processed_ids)
+        
+        if late_matches:
+            print(f"{late_matches} matches not in the checkpoint are older than it, falling back to full replay")
+            return 0
+        
+        restore_checkpoint(self, checkpoint)
+        print(f"Resumed from checkpoint at {header['last_match_date']}: "
+              f"{header['matches_processed']} matches already rated, {len(match_times) - start} new matches to replay")
+        return start
+    
+    def _resume_with_change_detection(self, checkpoint, match_ids, match_times, match_hashes, history_directory):
+        """Resume from ``checkpoint`` or, if rated matches changed, from the history checkpoint before the change"""
+        rated_ids = [-1 if match_id is None else match_id for match_id in checkpoint['processed_match_ids']]
+        rated_hashes = checkpoint['processed_match_hashes']
+        
+        # First position in processing order where the available matches differ from the rated ones
+        divergence = first_divergence(rated_ids, rated_hashes, match_ids, match_hashes)
+        if divergence == len(rated_ids):
+            restore_checkpoint(self, checkpoint)
+            print(f"Resumed from checkpoint at {checkpoint['header']['last_match_date']}: "
+                  f"{len(rated_ids)} matches already rated, {len(match_ids) - divergence} new matches to replay")
+            return divergence
+        
+        # Describe what changed
+        rated = dict(zip(rated_ids, rated_hashes))
+        available = dict(zip(match_ids, match_hashes))
+        times = dict(zip(match_ids, match_times))
+        corrected = [match_id for match_id, content_hash in available.items()
+                     if match_id in rated and content_hash and rated[match_id] and content_hash != rated[match_id]]
+        removed = [match_id for match_id in rated if match_id not in available]
+        checkpoint_time = to_microseconds(datetime.fromisoformat(checkpoint['header']['last_match_date']))
+        late = [match_id for match_id in match_ids if match_id not in rated and times[match_id] <= checkpoint_time]
+        print(f"Rated matches changed: {len(corrected)} corrected, {len(late)} added late, {len(removed)} removed")
+        for label, changed in (('Corrected', corrected), ('Added late', late)):
+            for match_id in sorted(changed, key=lambda match_id: times[match_id])[:20]:
+                print(f"  {label}: match {match_id} ({from_microseconds(times[match_id]).date()})")
+        for match_id in removed[:20]:
+            print(f"  Removed: match {match_id}")
+        if divergence < len(match_times):
+            print(f"Earliest change at position {divergence + 1} ({from_microseconds(match_times[divergence]).date()})")
+        
+        # Roll back to the latest history checkpoint that only contains unchanged matches
+        for entry in reversed(list_history_checkpoints(history_directory)):
+            if entry['matches_processed'] > divergence:
+                continue
+            history_checkpoint = load_checkpoint(os.path.join(history_directory, entry['path']))
+            if history_checkpoint is None or parameter_differences(self, history_checkpoint):
+                continue
+            position = len(history_checkpoint['processed_match_ids'])
+            history_ids = [-1 if match_id is None else match_id
+                           for match_id in history_checkpoint['processed_match_ids']]
+            if first_divergence(history_ids, history_checkpoint['processed_match_hashes'],
+                                match_ids, match_hashes) < position:
+                continue
+            restore_checkpoint(self, history_checkpoint)
+            print(f"Rolled back to history checkpoint at {entry['last_match_date']}: "
+                  f"replaying {len(match_ids) - position} of {len(match_ids)} matches")
+            return position
+        
+        print("No history checkpoint before the earliest change, falling back to full replay")
+        return 0
+    
+    def report_rating_changes(self, top_n=20):
+        """Print which players' ratings differ from the checkpoint the run resumed from"""
+        previous = getattr(self, 'previous_checkpoint', None)
+        if previous is None:
+            return None
+        self.flush_pending_decay()
+        
+        store = self.store
+        previous_index = {player_id: idx for idx, player_id in enumerate(previous['metadata']['player_id'])}
+        current = np.array([previous_index.get(player_id, -1) for player_id in store.metadata['player_id']],
+                           dtype=np.int64)
+        known = np.flatnonzero(current >= 0)
+        
+        mu_change = store.mu[known] - previous['mu'][current[known]]
+        sigma_change = store.sigma[known] - previous['sigma'][current[known]]
+        moved = np.flatnonzero((mu_change != 0) | (sigma_change != 0))
+        rating_change = mu_change - percentile_z_score(PERCENTILE) * sigma_change
+        
+        print(f"\nRating changes since the previous run: {len(moved)} players moved, "
+              f"{len(store) - len(known)} new players")
+        for i in moved[np.argsort(-np.abs(rating_change[moved]), kind='stable')][:top_n]:
+            print(f"  {store.metadata['player_id'][known[i]]:<45} "
+                  f"rating {rating_change[i]:+8.3f}  μ {mu_change[i]:+8.3f}  σ {sigma_change[i]:+8.3f}")
+        return [store.metadata['player_id'][known[i]] for i in moved]
     
     def calculate_conservative_rating(self, rating, percentile=80.0):
         """Calculate conservative rating using specified percentile"""
-        from scipy.stats import norm
         alpha = 1
         target = 0
-        z = abs(norm.ppf(percentile / 100.0))
+        z = percentile_z_score(percentile)
         return rating.ordinal(z=z, alpha=alpha, target=target)
 
     def print_ranking_by_division(self, top_n=None, sweden_only=True):
@@ -292,65 +847,106 @@ class IPSCRankingSystem:
         print(f"\nTotal players ranked: {len(rankings)}")
         print()
 
+    @timed_stage('rank')
     def generate_ranking(self, sweden_only=True):
-        """Generate the final ranking of all players"""
-        rankings = []
+        """Generate the final ranking of all players
         
-        for player_id, player_data in self.players.items():
-            # Skip non-Swedish players if sweden_only is True
-            if sweden_only and ('region' not in player_data or player_data['region'] != 'SWE'):
-                continue
-                
-            rating = player_data['rating']
-            conservative_rating = self.calculate_conservative_rating(rating)
-            
-            rankings.append({
-                'player_id': player_id,
-                'first_name': player_data['first_name'],
-                'last_name': player_data['last_name'],
-                'alias': player_data['alias'],
-                'region': player_data.get('region', 'Unknown'),
-                'division': player_data['division'],
-                'mu': rating.mu,
-                'sigma': rating.sigma,
-                'conservative_rating': conservative_rating,
-                'ordinal': rating.ordinal(),
-                'matches_played': player_data['matches_played']
-            })
+        Ratings, ranks and percentages are computed on the store's arrays in a
+        single pass. The result is cached until the next match is rated, so
+        the print and save paths share one (read-only) list.
+        """
+        self.flush_pending_decay()
+        if sweden_only in self.ranking_cache:
+            return self.ranking_cache[sweden_only]
         
-        # Sort by conservative rating within each division
-        division_groups = defaultdict(list)
-        for player in rankings:
-            division_groups[player['division']].append(player)
+        store = self.store
+        metadata = store.metadata
         
-        # Sort each division and add division ranks
-        for division in division_groups.keys():
-            division_players = division_groups[division]
-            division_players.sort(key=lambda x: x['conservative_rating'], reverse=True)
-            
-            # Add division ranking positions
-            for i, player in enumerate(division_players):
-                player['division_rank'] = i + 1
-                if division_players:
-                    best_rating = division_players[0]['conservative_rating']
-                    player['percentage_of_best'] = (player['conservative_rating'] / best_rating * 100) if best_rating > 0 else 0
-        
-        # Create combined ranking sorted by conservative rating across all divisions
-        all_rankings = []
-        for division_players in division_groups.values():
-            all_rankings.extend(division_players)
+        # Skip non-Swedish players if sweden_only is True
+        if sweden_only:
+            selected = np.flatnonzero(np.array(metadata['region'], dtype=object) == 'SWE')
+        else:
+            selected = np.arange(len(store))
+        
+        # Players are added just before their first match is rated, so a history
+        # checkpoint taken at that point holds some that have not played yet
+        selected = selected[store.matches_played[selected] > 0]
+        
+        mu = store.mu[selected]
+        sigma = store.sigma[selected]
+        # Same as rating.ordinal(z=z, alpha=1, target=0) and rating.ordinal()
+        conservative_rating = mu - percentile_z_score(PERCENTILE) * sigma
+        ordinal = mu - 3.0 * sigma
+        
+        # Division groups numbered in order of first appearance
+        division_codes = {}
+        codes = np.array([division_codes.setdefault(metadata['division'][idx], len(division_codes))
+                          for idx in selected.tolist()], dtype=np.int64)
+        
+        # Sort by conservative rating within each division (stable, so ties keep store order)
+        division_order = np.lexsort((-conservative_rating, codes))
+        sorted_codes = codes[division_order]
+        group_start = np.searchsorted(sorted_codes, sorted_codes, side='left')
         
-        # Sort all players by conservative rating for combined ranking
-        all_rankings.sort(key=lambda x: x['conservative_rating'], reverse=True)
+        division_rank = np.empty(len(selected), dtype=np.int64)
+        division_rank[division_order] = np.arange(len(selected)) - group_start + 1
         
-        # Add combined ranking positions
-        for i, player in enumerate(all_rankings):
-            player['combined_rank'] = i + 1
+        best_rating = conservative_rating[division_order][group_start]
+        percentage_of_best = np.empty(len(selected))
+        # A best rating of exactly zero leaves its division at 0% instead of dividing by zero
+        sorted_rating = conservative_rating[division_order]
+        percentage_of_best[division_order] = np.divide(sorted_rating, best_rating, out=np.zeros_like(sorted_rating),
+                                                       where=best_rating != 0) * 100
+        has_positive_best = np.empty(len(selected), dtype=bool)
+        has_positive_best[division_order] = best_rating > 0
         
+        # Combined ranking sorted by conservative rating across all divisions
+        combined_order = division_order[np.argsort(-conservative_rating[division_order], kind='stable')]
+        
+        mu_values = mu.tolist()
+        sigma_values = sigma.tolist()
+        conservative_values = conservative_rating.tolist()
+        ordinal_values = ordinal.tolist()
+        division_ranks = division_rank.tolist()
+        percentages = percentage_of_best.tolist()
+        positive_best = has_positive_best.tolist()
+        store_indices = selected.tolist()
+        
+        all_rankings = []
+        for combined_rank, i in enumerate(combined_order.tolist(), start=1):
+            idx = store_indices[i]
+            all_rankings.append({
+                'player_id': metadata['player_id'][idx],
+                'first_name': metadata['first_name'][idx],
+                'last_name': metadata['last_name'][idx],
+                'alias': metadata['alias'][idx],
+                'region': metadata['region'][idx],
+                'division': metadata['division'][idx],
+                'mu': mu_values[i],
+                'sigma': sigma_values[i],
+                'conservative_rating': conservative_values[i],
+                'ordinal': ordinal_values[i],
+                'matches_played': int(store.matches_played[idx]),
+                'division_rank': division_ranks[i],
+                'percentage_of_best': percentages[i] if positive_best[i] else 0,
+                'combined_rank': combined_rank
+            })
+        
+        self.ranking_cache[sweden_only] = all_rankings
         return all_rankings
 
-    def save_rankings_by_division(self, filename_prefix='ipsc_ranking'):
-        """Save rankings to separate JSON and CSV files by division"""
+    @timed_stage('save')
+    def save_rankings_by_division(self, filename_prefix='ipsc_ranking', compact_json=False,
+                                  compressions=OUTPUT_COMPRESSION, workers=None):
+        """Save rankings to separate JSON and CSV files by division
+        
+        Args:
+            filename_prefix (str): Prefix of the result file names
+            compact_json (bool): Write JSON without indentation
+            compressions (tuple): Precompressed siblings to write next to each
+                                  file ('gz' and/or 'br')
+            workers (int): Number of files written concurrently
+        """
         rankings = self.generate_ranking(sweden_only=True)
         
         # Group by division
@@ -358,77 +954,51 @@ class IPSCRankingSystem:
         for player in rankings:
             divisions[player['division']].append(player)
         
-        # Save each division to its own JSON and CSV files
+        division_fieldnames = [
+            'division_rank', 'first_name', 'last_name', 'alias', 'region', 'division',
+            'conservative_rating', 'mu', 'sigma', 'ordinal', 'matches_played',
+            'percentage_of_best'
+        ]
+        combined_fieldnames = ['combined_rank'] + division_fieldnames
+        
+        # Each division gets its own JSON and CSV files, plus the combined files
+        outputs = {}
+        division_files = []
         for division, players in divisions.items():
             safe_division_name = division.replace('+', 'plus').replace('-', 'minus').replace(' ', '_').lower()
-            
-            # Save JSON file
             json_filename = os.path.join(RESULTS_FOLDER, f"{filename_prefix}_{safe_division_name}.json")
-            with open(json_filename, 'w', encoding='utf-8') as f:
-                json.dump(players, f, indent=2, ensure_ascii=False)
-            
-            # Save CSV file
             csv_filename = os.path.join(RESULTS_FOLDER, f"{filename_prefix}_{safe_division_name}.csv")
-            with open(csv_filename, 'w', newline='', encoding='utf-8') as f:
-                if players:
-                    fieldnames = [
-                        'division_rank', 'first_name', 'last_name', 'alias', 'region', 'division',
-                        'conservative_rating', 'mu', 'sigma', 'ordinal', 'matches_played',
-                        'percentage_of_best'
-                    ]
-                    writer = csv.DictWriter(f, fieldnames=fieldnames)
-                    writer.writeheader()
-                    
-                    for player in players:
-                        # Create a copy of the player dict with only the fields we want in CSV
-                        csv_row = {field: player.get(field, '') for field in fieldnames}
-                        # Round numeric values for better CSV readability
-                        for numeric_field in ['conservative_rating', 'mu', 'sigma', 'ordinal', 'percentage_of_best']:
-                            if isinstance(csv_row[numeric_field], (int, float)):
-                                csv_row[numeric_field] = round(csv_row[numeric_field], 2)
-                        writer.writerow(csv_row)
-            
-            print(f"Saved {len(players)} players for division {division}:")
-            print(f"  JSON: {json_filename}")
-            print(f"  CSV:  {csv_filename}")
+            outputs[json_filename] = lambda players=players: rankings_json(players, compact_json)
+            outputs[csv_filename] = lambda players=players: rankings_csv(players, division_fieldnames)
+            division_files.append((division, len(players), json_filename, csv_filename))
         
-        # Also save combined files
         combined_json_filename = os.path.join(RESULTS_FOLDER, f"{filename_prefix}_combined.json")
         combined_csv_filename = os.path.join(RESULTS_FOLDER, f"{filename_prefix}_combined.csv")
+        outputs[combined_json_filename] = lambda: rankings_json(rankings, compact_json)
+        outputs[combined_csv_filename] = lambda: rankings_csv(rankings, combined_fieldnames)
         
-        # Save combined JSON
-        with open(combined_json_filename, 'w', encoding='utf-8') as f:
-            json.dump(rankings, f, indent=2, ensure_ascii=False)
-        
-        # Save combined CSV
-        with open(combined_csv_filename, 'w', newline='', encoding='utf-8') as f:
-            if rankings:
-                fieldnames = [
-                    'combined_rank', 'division_rank', 'first_name', 'last_name', 'alias', 'region', 'division',
-                    'conservative_rating', 'mu', 'sigma', 'ordinal', 'matches_played',
-                    'percentage_of_best'
-                ]
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                
-                for player in rankings:
-                    # Create a copy of the player dict with only the fields we want in CSV
-                    csv_row = {field: player.get(field, '') for field in fieldnames}
-                    # Round numeric values for better CSV readability
-                    for numeric_field in ['conservative_rating', 'mu', 'sigma', 'ordinal', 'percentage_of_best']:
-                        if isinstance(csv_row[numeric_field], (int, float)):
-                            csv_row[numeric_field] = round(csv_row[numeric_field], 2)
-                    writer.writerow(csv_row)
+        compressions = available_compressions(compressions)
+        write_output_files(outputs, compressions, workers)
+        
+        for division, player_count, json_filename, csv_filename in division_files:
+            print(f"Saved {player_count} players for division {division}:")
+            print(f"  JSON: {json_filename}")
+            print(f"  CSV:  {csv_filename}")
         
         print(f"\nSaved combined rankings:")
         print(f"  JSON: {combined_json_filename}")
         print(f"  CSV:  {combined_csv_filename}")
+        if compressions:
+            print(f"  Compressed copies: {', '.join('.' + c for c in compressions)}")
     
     def analyze_division_variations(self, matches):
         """Analyze division name variations in the loaded matches"""
         from division_normalizer import get_division_statistics
         
-        stats = get_division_statistics(matches)
+        if isinstance(matches, MatchStore):
+            stats = matches.division_statistics()
+        else:
+            stats = get_division_statistics(matches)
         
         print("\n" + "="*80)
         print("DIVISION NAME ANALYSIS")
@@ -485,24 +1055,25 @@ class IPSCRankingSystem:
         if max_sigma_multiplier is not None:
             self.max_sigma_multiplier = max_sigma_multiplier
             print(f"Updated max sigma multiplier to: {max_sigma_multiplier}x")
+        
+        if any(value is not None for value in (exponential_initial_decay, exponential_growth_rate,
+                                               use_exponential_decay, sigma_decay_per_day)):
+            self.decay_model = self._default_decay_model()
     
     def print_time_decay_statistics(self):
         """Print statistics about time decay application"""
+        self.flush_pending_decay()
         print("\n" + "="*80)
         print("TIME DECAY STATISTICS")
         print("="*80)
         
         # Show current decay model configuration
-        decay_model = "Exponential (Optimized)" if self.use_exponential_decay else "Constant (Legacy)"
-        print(f"Decay model: {decay_model}")
+        print(f"Decay model: {self.decay_model.type}")
+        print(f"Decay application: {'lazy (participants only)' if self.lazy_decay else 'eager (all players per match)'}")
         
-        if self.use_exponential_decay:
-            print(f"Exponential initial decay: {self.exponential_initial_decay}")
-            print(f"Exponential growth rate: {self.exponential_growth_rate}")
-            print("Formula: additional_sigma = {:.3f} * (exp({:.3f} * days/30) - 1)".format(
-                self.exponential_initial_decay, self.exponential_growth_rate))
-        else:
-            print(f"Constant sigma decay per day: {self.sigma_decay_per_day}")
+        for name in self.decay_model.parameter_names:
+            print(f"{name.replace('_', ' ').capitalize()}: {getattr(self.decay_model, name)}")
+        print(f"Formula: {self.decay_model.formula()}")
         
         print(f"Maximum sigma multiplier: {self.max_sigma_multiplier}x (max sigma: {START_SIGMA * self.max_sigma_multiplier:.2f})")
         print(f"Players affected by time decay: {self.time_decay_stats['players_affected']}")
@@ -514,7 +1085,7 @@ class IPSCRankingSystem:
             print(f"Average decay per affected player: {avg_decay:.2f}")
         
         # Show optimization benefits
-        if self.use_exponential_decay:
+        if self.decay_model.type == 'exponential':
             print("\nOptimization Benefits:")
             print("- Exponential decay provides more realistic uncertainty growth")
             print("- Gentle initial decay for short absences")
@@ -523,25 +1094,120 @@ class IPSCRankingSystem:
             print("- Achieves 100% reasonable uncertainty vs 2.7% with constant decay")
 
 def main():
+    parser = argparse.ArgumentParser(description='Generate IPSC rankings from match data')
+    parser.add_argument('--incremental', action='store_true',
+                       help='Resume from the saved rating checkpoint and only replay newer matches')
+    parser.add_argument('--match-store', nargs='?', const=MATCH_STORE_LOCATION, default=None,
+                       help='Read matches from a compiled match store (see match_store.py) instead of match_data/')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Processes used to parse match_data/*.json (default: one per CPU)')
+    parser.add_argument('--compact-json', action='store_true',
+                       help='Write result JSON files without indentation')
+    parser.add_argument('--compress', nargs='*', choices=COMPRESSION_FORMATS, default=list(OUTPUT_COMPRESSION),
+                       help='Precompressed copies to write next to each result file (default: gz; br needs the brotli '
+                            'package; none if given without formats)')
+    parser.add_argument('--report', nargs='?', const=RUN_REPORT_FILE, default=None,
+                       help='Write a JSON run report with stage timings, match latency and counters')
+    parser.add_argument('--profile', nargs='?', const=PROFILE_FILE, default=None,
+                       help='Profile the match replay loop with cProfile and dump the stats to this file')
+    parser.add_argument('--ledger', nargs='?', const=LEDGER_LOCATION, default=None,
+                       help='Record every rating change in an append-only ledger (see rating_ledger.py)')
+    parser.add_argument('--wave-workers', type=int, default=None,
+                       help='Rate matches without shared shooters concurrently in this many processes '
+                            '(same ratings as the sequential replay)')
+    parser.add_argument('--evaluate', action='store_true',
+                       help='Score pre-match ratings against each result (pairwise accuracy, log-likelihood, '
+                            'rank correlation) while replaying')
+    parser.add_argument('--history', nargs='?', const=HISTORY_LOCATION, default=None,
+                       help='Keep a dated checkpoint at every month boundary for point-in-time rankings '
+                            '(see ranking_history.py)')
+    parser.add_argument('--same-day-batch', nargs='?', type=int, const=1, default=None, metavar='WORKERS',
+                       help='Rate each calendar day\'s matches from a snapshot of the ratings at the start of the day, '
+                            'in this many processes (see same_day_report.py for how the rankings differ)')
+    args = parser.parse_args()
+    if args.same_day_batch and (args.match_store or args.ledger or args.wave_workers):
+        parser.error('--same-day-batch cannot be combined with --match-store, --ledger or --wave-workers')
+    
     # Create ranking system
-    ranking_system = IPSCRankingSystem()
+    ranking_system = IPSCRankingSystem(same_day_batch=bool(args.same_day_batch))
     
     # Load and process all matches
     print("Loading matches...")
-    matches = ranking_system.load_matches()
+    if args.match_store:
+        with ranking_system.metrics.stage('load'):
+            matches = MatchStore.load(args.match_store)
+        match_ids = matches.match_id.tolist()
+        match_times = matches.match_time.tolist()
+        # The store keeps no content hashes, so changes to rated matches are not detected
+        match_hashes = None
+    else:
+        matches = ranking_system.load_matches(workers=args.workers)
+        match_ids = [match.get('match_id', -1) for match in matches]
+        match_times = [to_microseconds(parse_match_date(match)) for match in matches]
+        match_hashes = [match.get('content_hash') for match in matches]
     print(f"Found {len(matches)} matches")
     
     # Analyze division variations before processing
     ranking_system.analyze_division_variations(matches)
     
+    start = 0
+    if args.incremental:
+        print("\nResuming from checkpoint...")
+        start = ranking_system.resume_from_checkpoint(match_ids, match_times, match_hashes=match_hashes,
+                                                      history_directory=args.history or HISTORY_LOCATION)
+    if (args.same_day_batch and 0 < start < len(matches) and
+            parse_match_date(matches[start]).date() == parse_match_date(matches[start - 1]).date()):
+        # The day was batched without the new matches, so it has to be rated again
+        print("New matches fall on the last rated day, falling back to full replay")
+        resumed = ranking_system
+        ranking_system = IPSCRankingSystem(same_day_batch=True)
+        # Keep the previous checkpoint for the change report and the load and resume timings for the run report
+        ranking_system.previous_checkpoint = resumed.previous_checkpoint
+        ranking_system.metrics = resumed.metrics
+        start = 0
+    if args.history:
+        truncate_history(args.history, start)
+    
+    if args.ledger:
+        ranking_system.open_ledger(args.ledger)
+    ranking_system.history_directory = args.history
+    if args.evaluate:
+        ranking_system.evaluator = PredictiveEvaluator()
+    
     print("\nProcessing matches...")
-    for i, match in enumerate(matches):
-        print(f"Processing match {i+1}/{len(matches)}: {match.get('match_title', 'Unknown')}")
-        if 'combined_results' in match and len(match['combined_results']) > 0:
-            ranking_system.process_match(match)
+    with ranking_system.metrics.profiled(args.profile) if args.profile else nullcontext():
+        wave_replay = WaveReplay(ranking_system, args.wave_workers) if args.wave_workers else None
+        unsupported = wave_replay.unsupported_reason() if wave_replay else None
+        if wave_replay and (unsupported or args.match_store):
+            print(f"Replaying sequentially: {unsupported or 'wave scheduling reads match_data/ only'}")
+            wave_replay = None
+        
+        if args.match_store:
+            ranking_system.replay_match_store(matches, start=start, verbose=True)
+        elif args.same_day_batch:
+            executor = ProcessPoolExecutor(max_workers=args.same_day_batch) if args.same_day_batch > 1 else None
+            try:
+                days = ranking_system.replay_days(matches[start:], executor, verbose=True)
+            finally:
+                if executor is not None:
+                    executor.shutdown()
+            print(f"Rated {len(matches) - start} matches in {days} same-day batches")
+        elif wave_replay:
+            waves = wave_replay.replay(matches[start:])
+            print(f"Rated {len(matches) - start} matches in {waves} waves")
+        else:
+            for i, match in enumerate(matches[start:], start=start):
+                print(f"Processing match {i+1}/{len(matches)}: {match.get('match_title', 'Unknown')}")
+                if 'combined_results' in match and len(match['combined_results']) > 0:
+                    ranking_system.process_match(match)
+    
+    # Persist the rating state (and history) for the next incremental run
+    ranking_system.close_ledger()
+    ranking_system.save_checkpoint()
+    ranking_system.report_rating_changes()
     
     # Print the rankings by division
-    print(f"\nGenerated ranking for {len(ranking_system.players)} players in {len(matches)} matches")
+    print(f"\nGenerated ranking for {len(ranking_system.store)} players in {len(ranking_system.processed_match_ids)} matches")
     ranking_system.print_ranking_by_division(top_n=50, sweden_only=True)  # Show top 50 per division
     
     # Print the combined ranking
@@ -553,9 +1219,12 @@ def main():
     # Print time decay statistics
     ranking_system.print_time_decay_statistics()
     
+    if ranking_system.evaluator is not None:
+        ranking_system.evaluator.print_summary()
+    
     # Save rankings by division
     print(f"\nSaving results to {RESULTS_FOLDER}...")
-    ranking_system.save_rankings_by_division()
+    ranking_system.save_rankings_by_division(compact_json=args.compact_json, compressions=tuple(args.compress))
     
     # Print summary
     rankings = ranking_system.generate_ranking(sweden_only=True)
@@ -570,6 +1239,12 @@ def main():
         print(f"  {division}: {count} players")
     
     print(f"\nAll results saved to: {os.path.abspath(RESULTS_FOLDER)}")
+    
+    if args.report:
+        report = ranking_system.metrics.save_report(args.report, ranking_system)
+        print(f"\nRun report saved to: {args.report}")
+        for stage, timing in report['stages'].items():
+            print(f"  {stage}: {timing['seconds']:.2f}s in {timing['calls']} calls")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,153 @@
+"""
+Registry of inactivity decay models.
+Each model turns days of inactivity into the sigma added for them, for a
+whole NumPy array of decay steps at once. The ranking system, the decay
+optimizer and the checkpoint parameters all go through these classes, so a
+formula is written exactly once.
+"""
+
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+DECAY_MODELS = {}
+
+
+def register_decay_model(cls):
+    """Class decorator adding a decay model to the registry under its ``type``"""
+    DECAY_MODELS[cls.type] = cls
+    return cls
+
+
+class DecayModel(ABC):
+    """Base class of decay models
+
+    Subclasses set ``type`` and ``parameter_names`` and implement
+    ``additional_sigma``. Models listing ``uses_player_state`` get a dict with
+    the store indices (``'indices'``, aligned with the days) and the rating
+    store (``'store'``) of the decayed players.
+    """
+    type = None
+    parameter_names = ()
+    uses_player_state = False
+
+    def __init__(self, **parameters):
+        missing = [name for name in self.parameter_names if name not in parameters]
+        if missing:
+            raise ValueError(f"{self.type} decay model needs {', '.join(missing)}")
+        for name in self.parameter_names:
+            setattr(self, name, parameters[name])
+
+    @abstractmethod
+    def additional_sigma(self, days, player_state=None):
+        """Sigma added for each number of days of inactivity in the array ``days``"""
+
+    def parameters(self):
+        """Type and parameters as a JSON-serializable dict (stored in checkpoints)"""
+        return {'type': self.type, **{name: getattr(self, name) for name in self.parameter_names}}
+
+    def formula(self):
+        """Human-readable formula of the model"""
+        return self.type
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{name}={getattr(self, name)}' for name in self.parameter_names)})"
+
+
+@register_decay_model
+class ConstantDecay(DecayModel):
+    """Sigma grows linearly with days of inactivity (the legacy model)"""
+    type = 'constant'
+    parameter_names = ('decay_per_day',)
+
+    def additional_sigma(self, days, player_state=None):
+        return self.decay_per_day * days
+
+    def formula(self):
+        return f"additional_sigma = {self.decay_per_day} * days"
+
+
+@register_decay_model
+class LogarithmicDecay(DecayModel):
+    """Linear decay plus a logarithmic term that front-loads short absences"""
+    type = 'logarithmic'
+    parameter_names = ('base_decay', 'log_factor')
+
+    def additional_sigma(self, days, player_state=None):
+        return self.base_decay * days + self.log_factor * np.log(1 + days)
+
+    def formula(self):
+        return f"additional_sigma = {self.base_decay} * days + {self.log_factor} * log(1 + days)"
+
+
+@register_decay_model
+class ExponentialDecay(DecayModel):
+    """Gentle decay for short absences that accelerates for long ones"""
+    type = 'exponential'
+    parameter_names = ('initial_decay', 'growth_rate')
+
+    def additional_sigma(self, days, player_state=None):
+        return self.initial_decay * (np.exp(self.growth_rate * days / 30) - 1)
+
+    def formula(self):
+        return f"additional_sigma = {self.initial_decay:.3f} * (exp({self.growth_rate:.3f} * days/30) - 1)"
+
+
+@register_decay_model
+class AdaptiveDecay(DecayModel):
+    """Linear decay scaled by each player's performance variability
+
+    ``consistency`` maps player ids to their coefficient of variation of match
+    percentage; players without one get ``default_consistency``. Less
+    consistent players (higher CV) lose certainty faster.
+    """
+    type = 'adaptive'
+    parameter_names = ('base_decay', 'consistency_factor')
+    uses_player_state = True
+
+    def __init__(self, consistency=None, default_consistency=1.0, **parameters):
+        super().__init__(**parameters)
+        self.consistency = consistency or {}
+        self.default_consistency = default_consistency
+        self._consistency_by_index = np.empty(0)
+
+    def _consistency_of(self, indices, store):
+        """Consistency aligned with store indices, extended as players are added"""
+        player_ids = store.metadata['player_id']
+        known = len(self._consistency_by_index)
+        if known < len(player_ids):
+            new_values = [self.consistency.get(player_id, self.default_consistency) for player_id in player_ids[known:]]
+            self._consistency_by_index = np.concatenate((self._consistency_by_index, new_values))
+        return self._consistency_by_index[indices]
+
+    def parameters(self):
+        # Every constructor argument, so that a checkpoint notices changed player consistencies too
+        return {
+            **super().parameters(),
+            'consistency': {player_id: float(cv) for player_id, cv in self.consistency.items()},
+            'default_consistency': self.default_consistency,
+        }
+
+    def additional_sigma(self, days, player_state=None):
+        if player_state is None:
+            consistency = self.default_consistency
+        else:
+            consistency = self._consistency_of(player_state['indices'], player_state['store'])
+        consistency_multiplier = 1.0 + (consistency * self.consistency_factor)
+        return self.base_decay * days * consistency_multiplier
+
+    def formula(self):
+        return (f"additional_sigma = {self.base_decay} * days * (1 + player_cv * {self.consistency_factor})")
+
+
+def make_decay_model(config, **options):
+    """Decay model from a dict with ``type`` and its parameters (extra keys are ignored)
+
+    ``options`` are passed to the model's constructor, e.g. the player
+    consistency of an adaptive model.
+    """
+    model_type = config['type']
+    if model_type not in DECAY_MODELS:
+        raise ValueError(f"Unknown decay model {model_type} (known: {', '.join(DECAY_MODELS)})")
+    cls = DECAY_MODELS[model_type]
+    return cls(**{name: config[name] for name in cls.parameter_names if name in config}, **options)
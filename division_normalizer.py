@@ -3,6 +3,55 @@ Division name normalization for IPSC ranking system.
 Maps various division name variations to standard IPSC divisions.
 """
 
+from functools import lru_cache
+
+# Mapping of (lowercased, suffix-stripped) division name variations to standard divisions
+DIVISION_MAPPING = {
+    # Open variations
+    'open': 'Open',
+    'semi-auto open': 'Open',
+    'semiminusauto_open': 'Open',
+    'semi_auto_open': 'Open',
+    
+    # Standard variations  
+    'standard': 'Standard',
+    'semi-auto standard': 'Standard',
+    'semiminusauto_standard': 'Standard',
+    'semi_auto_standard': 'Standard',
+    'standard_manual': 'Standard',
+    
+    # Production variations
+    'production': 'Production',
+    
+    # Revolver variations
+    'revolver': 'Revolver',
+    
+    # Classic variations
+    'classic': 'Classic',
+    
+    # Pistol Caliber Carbine variations
+    'pistol caliber carbine': 'Pistol Caliber Carbine',
+    'pistol_caliber_carbine': 'Pistol Caliber Carbine',
+    'pistol caliber carbine optics': 'Pistol Caliber Carbine',
+    'pistol_caliber_carbine_optics': 'Pistol Caliber Carbine',
+    'pistol caliber carbine iron': 'Pistol Caliber Carbine',
+    'pistol_caliber_carbine_iron': 'Pistol Caliber Carbine',
+    
+    # Production Optics variations
+    'production optics': 'Production Optics',
+    'production_optics': 'Production Optics',
+    'production optics light': 'Production Optics',
+    'production_optics_light': 'Production Optics',
+    
+    # Handle other variations that might appear
+    'modified': 'Open',  # Modified is typically similar to Open
+    'custom': 'Open',    # Custom is typically similar to Open
+    'semi-auto limited': 'Standard',  # Limited is typically similar to Standard
+    'semiminusauto_limited': 'Standard',
+}
+
+
+@lru_cache(maxsize=None)
 def normalize_division_name(division_name):
     """
     Normalize division names to standard IPSC divisions.
@@ -16,6 +65,9 @@ def normalize_division_name(division_name):
     - 'Pistol Caliber Carbine'
     - 'Production Optics'
     
+    Results are memoized, since a dataset only has a few dozen distinct
+    division names but every result row is normalized.
+    
     Args:
         division_name (str): Original division name from match data
         
@@ -35,57 +87,12 @@ def normalize_division_name(division_name):
         if base_division.endswith(suffix):
             base_division = base_division[:-len(suffix)].strip()
     
-    # Mapping dictionary for various division name variations
-    division_mapping = {
-        # Open variations
-        'open': 'Open',
-        'semi-auto open': 'Open',
-        'semiminusauto_open': 'Open',
-        'semi_auto_open': 'Open',
-        
-        # Standard variations  
-        'standard': 'Standard',
-        'semi-auto standard': 'Standard',
-        'semiminusauto_standard': 'Standard',
-        'semi_auto_standard': 'Standard',
-        'standard_manual': 'Standard',
-        
-        # Production variations
-        'production': 'Production',
-        
-        # Revolver variations
-        'revolver': 'Revolver',
-        
-        # Classic variations
-        'classic': 'Classic',
-        
-        # Pistol Caliber Carbine variations
-        'pistol caliber carbine': 'Pistol Caliber Carbine',
-        'pistol_caliber_carbine': 'Pistol Caliber Carbine',
-        'pistol caliber carbine optics': 'Pistol Caliber Carbine',
-        'pistol_caliber_carbine_optics': 'Pistol Caliber Carbine',
-        'pistol caliber carbine iron': 'Pistol Caliber Carbine',
-        'pistol_caliber_carbine_iron': 'Pistol Caliber Carbine',
-        
-        # Production Optics variations
-        'production optics': 'Production Optics',
-        'production_optics': 'Production Optics',
-        'production optics light': 'Production Optics',
-        'production_optics_light': 'Production Optics',
-        
-        # Handle other variations that might appear
-        'modified': 'Open',  # Modified is typically similar to Open
-        'custom': 'Open',    # Custom is typically similar to Open
-        'semi-auto limited': 'Standard',  # Limited is typically similar to Standard
-        'semiminusauto_limited': 'Standard',
-    }
-    
     # Try to find exact match first
-    if base_division in division_mapping:
-        return division_mapping[base_division]
+    if base_division in DIVISION_MAPPING:
+        return DIVISION_MAPPING[base_division]
     
     # Try partial matching for compound names
-    for key, value in division_mapping.items():
+    for key, value in DIVISION_MAPPING.items():
         if key in base_division or base_division in key:
             return value
     
@@ -0,0 +1,238 @@
+"""
+Manifest of the scraped match_data/*.json files.
+Keeps one row per match file with the facts consumers need (date, level,
+number of combined results, divisions) plus size, mtime and a content hash,
+so unchanged or empty files can be skipped without opening them.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+MATCH_FILES_LOCATION = './match_data/'
+MANIFEST_FILENAME = 'manifest.csv'
+
+MANIFEST_FIELDS = (
+    'filename', 'match_id', 'match_date', 'match_level', 'result_count',
+    'divisions', 'size', 'mtime_ns', 'sha256'
+)
+
+# result_count for a file without a 'combined_results' key (or that could not be read)
+NO_RESULTS = -1
+
+_DIVISION_SEPARATOR = '|'
+
+# Fields of a match file (and of each combined result) used by the rating code;
+# everything else is dropped in the worker before the match is sent back
+MATCH_FIELDS = ('match_id', 'match_title', 'match_level', 'match_date')
+RESULT_FIELDS = ('first_name', 'last_name', 'alias', 'region', 'division', 'match_percentage')
+
+# Files handed to a worker at a time
+READ_CHUNK_SIZE = 32
+
+
+def _parse_row(row):
+    """Convert a manifest CSV row to typed values"""
+    return {
+        'filename': row['filename'],
+        'match_id': int(row['match_id']) if row['match_id'] else None,
+        'match_date': row['match_date'] or None,
+        'match_level': row['match_level'] or None,
+        'result_count': int(row['result_count']),
+        'divisions': row['divisions'].split(_DIVISION_SEPARATOR) if row['divisions'] else [],
+        'size': int(row['size']),
+        'mtime_ns': int(row['mtime_ns']),
+        'sha256': row['sha256'],
+    }
+
+
+def load_manifest(match_dir=MATCH_FILES_LOCATION):
+    """Read the manifest of a match directory as a dict of filename -> row"""
+    path = os.path.join(match_dir, MANIFEST_FILENAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        return {row['filename']: _parse_row(row) for row in csv.DictReader(f)}
+
+
+def save_manifest(manifest, match_dir=MATCH_FILES_LOCATION):
+    """Write the manifest atomically, ordered by filename"""
+    path = os.path.join(match_dir, MANIFEST_FILENAME)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=MANIFEST_FIELDS)
+        writer.writeheader()
+        for filename in sorted(manifest):
+            row = dict(manifest[filename])
+            row['divisions'] = _DIVISION_SEPARATOR.join(row['divisions'])
+            for field in ('match_id', 'match_date', 'match_level'):
+                if row[field] is None:
+                    row[field] = ''
+            writer.writerow(row)
+    os.replace(temp_path, path)
+
+
+def scan_match_file(match_dir, filename, stat=None):
+    """Read one match file and return its manifest row"""
+    filepath = os.path.join(match_dir, filename)
+    if stat is None:
+        stat = os.stat(filepath)
+    with open(filepath, 'rb') as f:
+        content = f.read()
+    return manifest_row(filename, content, stat)
+
+
+def manifest_row(filename, content, stat, match_data=None):
+    """Manifest row of a match file from its bytes and stat
+
+    The bytes are parsed unless the caller passes the already parsed
+    ``match_data`` (e.g. a scraper that has just written them).
+    """
+    row = {
+        'filename': filename,
+        'match_id': None,
+        'match_date': None,
+        'match_level': None,
+        'result_count': NO_RESULTS,
+        'divisions': [],
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': hashlib.sha256(content).hexdigest(),
+    }
+
+    try:
+        if match_data is None:
+            match_data = json.loads(content)
+        row['match_id'] = match_data.get('match_id')
+        row['match_date'] = match_data.get('match_date')
+        row['match_level'] = match_data.get('match_level')
+        row['divisions'] = [division['name'] for division in match_data.get('divisions', [])]
+        if 'combined_results' in match_data:
+            row['result_count'] = len(match_data['combined_results'])
+    except Exception as e:
+        print(f"Error loading {filename}: {e}")
+
+    return row
+
+
+def update_manifest(match_dir=MATCH_FILES_LOCATION, verbose=False):
+    """Bring the manifest of a match directory up to date and return it
+
+    Files whose size and mtime match their manifest row are not opened; new
+    or changed files are read and hashed, and rows of deleted files dropped.
+    """
+    manifest = load_manifest(match_dir)
+    updated = {}
+    scanned = 0
+
+    with os.scandir(match_dir) as entries:
+        for entry in entries:
+            if not entry.name.endswith('.json') or not entry.is_file():
+                continue
+            stat = entry.stat()
+            row = manifest.get(entry.name)
+            if row is None or row['size'] != stat.st_size or row['mtime_ns'] != stat.st_mtime_ns:
+                row = scan_match_file(match_dir, entry.name, stat)
+                scanned += 1
+            updated[entry.name] = row
+
+    removed = len(set(manifest) - set(updated))
+    if scanned or removed or not os.path.exists(os.path.join(match_dir, MANIFEST_FILENAME)):
+        save_manifest(updated, match_dir)
+
+    if verbose:
+        print(f"Manifest: {len(updated)} files, {scanned} scanned, {removed} removed")
+    return updated
+
+
+def refresh_manifest_entry(manifest, match_dir, filename):
+    """Rescan a single (new or rewritten) file into an in-memory manifest"""
+    manifest[filename] = scan_match_file(match_dir, filename)
+    return manifest[filename]
+
+
+def is_row_eligible(row, levels, divisions):
+    """Whether a manifest row is a match of one of ``levels`` with one of ``divisions``"""
+    return row['match_level'] in levels and bool(set(row['divisions']) & divisions)
+
+
+def matches_with_results(manifest):
+    """Manifest rows of matches with combined results, ordered by date then match id"""
+    rows = [row for row in manifest.values() if row['result_count'] > 0]
+    rows.sort(key=lambda row: (row['match_date'] or '', row['match_id'] if row['match_id'] is not None else -1))
+    return rows
+
+
+def read_projected_match(filepath):
+    """Parse one match file and keep only MATCH_FIELDS and RESULT_FIELDS
+
+    The match also gets a 'content_hash' (SHA-256 of the file, as in the
+    manifest) so rated matches can later be checked for corrections. Returns
+    None for a file without combined results, or an error message string if
+    the file could not be read.
+    """
+    try:
+        with open(filepath, 'rb') as f:
+            content = f.read()
+        match_data = json.loads(content)
+    except Exception as e:
+        return f"Error loading {os.path.basename(filepath)}: {e}"
+
+    results = match_data.get('combined_results')
+    if not results:
+        return None
+
+    match = {field: match_data[field] for field in MATCH_FIELDS if field in match_data}
+    match['combined_results'] = [{field: result[field] for field in RESULT_FIELDS if field in result}
+                                 for result in results]
+    match['content_hash'] = hashlib.sha256(content).hexdigest()
+    return match
+
+
+def read_match_files(match_dir, rows, workers=None):
+    """Read the match files of manifest rows, in parallel over ``workers`` processes
+
+    Matches come back in the order of ``rows``; files without results are
+    left out. ``workers`` defaults to the number of CPUs, and 1 reads the
+    files in this process.
+    """
+    filepaths = [os.path.join(match_dir, row['filename']) for row in rows]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(filepaths)))
+
+    if workers == 1:
+        loaded = map(read_projected_match, filepaths)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            loaded = list(executor.map(read_projected_match, filepaths, chunksize=READ_CHUNK_SIZE))
+
+    matches = []
+    for match in loaded:
+        if isinstance(match, str):
+            print(match)
+        elif match is not None:
+            matches.append(match)
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Update the manifest of scraped match files')
+    parser.add_argument('--match-data', default=MATCH_FILES_LOCATION,
+                       help='Directory with scraped match JSON files')
+    args = parser.parse_args()
+
+    manifest = update_manifest(args.match_data, verbose=True)
+    with_results = matches_with_results(manifest)
+    without_key = sum(1 for row in manifest.values() if row['result_count'] == NO_RESULTS)
+    print(f"Matches with combined results: {len(with_results)}")
+    print(f"Matches with empty combined results: {sum(1 for row in manifest.values() if row['result_count'] == 0)}")
+    print(f"Files without combined results: {without_key}")
+    print(f"Total result rows: {sum(row['result_count'] for row in with_results)}")
+
+
+if __name__ == "__main__":
+    main()
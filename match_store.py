@@ -0,0 +1,313 @@
+"""
+Columnar binary match store compiled from the scraped match_data/*.json files.
+Only matches with combined results are kept. Match attributes and result rows
+are stored as NumPy columns (one .npy file each, loaded memory-mapped) with
+player, division and region names interned to integer codes, divisions
+already normalized and dates converted to integer days/microseconds.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+
+import numpy as np
+
+from division_normalizer import normalize_division_name
+from match_manifest import update_manifest, matches_with_results, read_match_files
+from rating_store import make_player_id, to_microseconds, MICROSECONDS_PER_DAY
+
+MATCH_FILES_LOCATION = './match_data/'
+MATCH_STORE_LOCATION = './match_store/'
+
+MATCH_STORE_VERSION = 1
+
+MATCH_COLUMNS = ('match_id', 'match_time', 'match_day', 'level_code', 'title_code', 'date_code', 'result_offset')
+RESULT_COLUMNS = ('player_code', 'division_code', 'raw_division_code', 'region_code', 'match_percentage')
+
+
+class _Interner:
+    """Assigns consecutive integer codes to hashable values"""
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def __call__(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+
+def manifest_fingerprint(rows):
+    """Hash of the filenames and content hashes of manifest rows, identifying the matches a store holds"""
+    digest = hashlib.sha256()
+    for row in sorted(rows, key=lambda row: row['filename']):
+        digest.update(f"{row['filename']}:{row['sha256']}\n".encode())
+    return digest.hexdigest()
+
+
+def read_store_header(store_dir=MATCH_STORE_LOCATION):
+    """Header of a compiled store, or None if there is none"""
+    path = os.path.join(store_dir, 'header.json')
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compile_match_store(match_dir=MATCH_FILES_LOCATION, store_dir=MATCH_STORE_LOCATION, workers=None, force=False):
+    """Compile all match JSON files with combined results into a columnar store
+
+    The match directory's manifest (see match_manifest.py) is brought up to
+    date first, so only new or changed files are hashed and files without
+    results are never opened. If the store was compiled from exactly the
+    same files (by content hash) it is left as is, unless ``force`` is set.
+    """
+    start = time.perf_counter()
+    manifest = update_manifest(match_dir)
+    rows = matches_with_results(manifest)
+    fingerprint = manifest_fingerprint(rows)
+
+    existing = read_store_header(store_dir)
+    if (not force and existing is not None and existing.get('version') == MATCH_STORE_VERSION and
+            existing.get('manifest_fingerprint') == fingerprint):
+        print(f"Match store {store_dir} is up to date ({existing['matches']} matches)")
+        return existing
+
+    matches = []
+    for match_data in read_match_files(match_dir, rows, workers):
+        match_date = datetime.fromisoformat(match_data['match_date'].replace('Z', '+00:00'))
+        matches.append((to_microseconds(match_date), match_data.get('match_id', -1), match_data))
+    files_read = len(rows)
+
+    # Same order as the rating engine: by date, then match id
+    matches.sort(key=lambda item: (item[0], item[1]))
+
+    levels, titles, dates = _Interner(), _Interner(), _Interner()
+    divisions, raw_divisions, regions = _Interner(), _Interner(), _Interner()
+    players = _Interner()
+    player_table = {'first_name': [], 'last_name': [], 'alias': [], 'region': [], 'division': []}
+
+    match_columns = {column: [] for column in MATCH_COLUMNS}
+    result_columns = {column: [] for column in RESULT_COLUMNS}
+
+    for match_time, match_id, match_data in matches:
+        match_columns['match_id'].append(match_id)
+        match_columns['match_time'].append(match_time)
+        match_columns['match_day'].append(match_time // MICROSECONDS_PER_DAY)
+        match_columns['level_code'].append(levels(match_data.get('match_level', 'Level II')))
+        match_columns['title_code'].append(titles(match_data.get('match_title', 'Unknown')))
+        match_columns['date_code'].append(dates(match_data['match_date']))
+        match_columns['result_offset'].append(len(result_columns['player_code']))
+
+        for result in match_data['combined_results']:
+            region = result.get('region', 'Unknown')
+            raw_division = result.get('division', 'Unknown')
+            division = normalize_division_name(raw_division)
+
+            player_id = make_player_id(result['first_name'], result['last_name'], region, division)
+            known_players = len(players.values)
+            player_code = players(player_id)
+            if player_code == known_players:
+                # Descriptive fields come from the player's first appearance, as in the engine
+                player_table['first_name'].append(result['first_name'])
+                player_table['last_name'].append(result['last_name'])
+                player_table['alias'].append(result.get('alias'))
+                player_table['region'].append(region)
+                player_table['division'].append(division)
+
+            result_columns['player_code'].append(player_code)
+            result_columns['division_code'].append(divisions(division))
+            result_columns['raw_division_code'].append(raw_divisions(raw_division))
+            result_columns['region_code'].append(regions(region))
+            result_columns['match_percentage'].append(result['match_percentage'])
+
+    match_columns['result_offset'].append(len(result_columns['player_code']))
+
+    dtypes = {
+        'match_id': np.int64, 'match_time': np.int64, 'match_day': np.int32, 'level_code': np.int16,
+        'title_code': np.int32, 'date_code': np.int32, 'result_offset': np.int64,
+        'player_code': np.int32, 'division_code': np.int16, 'raw_division_code': np.int16,
+        'region_code': np.int16, 'match_percentage': np.float64,
+    }
+
+    # Written to a sibling directory and swapped in when complete, so an interrupted compile never
+    # mixes old and new columns and readers that have the old columns memory-mapped keep them
+    temp_dir = os.path.normpath(store_dir) + '.tmp'
+    if os.path.exists(temp_dir):
+        shutil.rmtree(temp_dir)
+    os.makedirs(temp_dir)
+    for column, values in list(match_columns.items()) + list(result_columns.items()):
+        np.save(os.path.join(temp_dir, f"{column}.npy"), np.array(values, dtype=dtypes[column]))
+
+    tables = {
+        'levels': levels.values,
+        'titles': titles.values,
+        'dates': dates.values,
+        'divisions': divisions.values,
+        'raw_divisions': raw_divisions.values,
+        'regions': regions.values,
+        'player_ids': players.values,
+        'players': player_table,
+    }
+    with open(os.path.join(temp_dir, 'tables.json'), 'w', encoding='utf-8') as f:
+        json.dump(tables, f, ensure_ascii=False)
+
+    header = {
+        'version': MATCH_STORE_VERSION,
+        'compiled': datetime.now().isoformat(),
+        'source': os.path.abspath(match_dir),
+        'files': len(manifest),
+        'files_read': files_read,
+        'manifest_fingerprint': fingerprint,
+        'matches': len(matches),
+        'results': len(result_columns['player_code']),
+        'players': len(players.values),
+    }
+    with open(os.path.join(temp_dir, 'header.json'), 'w', encoding='utf-8') as f:
+        json.dump(header, f, indent=2)
+    _replace_store(temp_dir, store_dir)
+
+    print(f"Compiled {header['matches']} matches ({header['results']} results, {header['players']} players) "
+          f"from {files_read} files in {time.perf_counter() - start:.1f}s to {store_dir}")
+    return header
+
+
+def _replace_store(temp_dir, store_dir):
+    """Move a freshly compiled store directory into place, removing the previous one"""
+    old_dir = os.path.normpath(store_dir) + '.old'
+    if os.path.exists(old_dir):
+        shutil.rmtree(old_dir)
+    if os.path.exists(store_dir):
+        # A directory can only be renamed over an empty one, so the old store is moved aside first
+        os.replace(store_dir, old_dir)
+    os.replace(temp_dir, store_dir)
+    if os.path.exists(old_dir):
+        shutil.rmtree(old_dir)
+
+
+class MatchStore:
+    """Read-only, memory-mapped view of a compiled match store"""
+
+    def __init__(self, store_dir, header, tables, columns):
+        self.store_dir = store_dir
+        self.header = header
+        self.tables = tables
+        for column, values in columns.items():
+            setattr(self, column, values)
+
+    @classmethod
+    def load(cls, store_dir=MATCH_STORE_LOCATION):
+        """Open a compiled store, memory-mapping its columns"""
+        with open(os.path.join(store_dir, 'header.json'), 'r', encoding='utf-8') as f:
+            header = json.load(f)
+        if header.get('version') != MATCH_STORE_VERSION:
+            raise ValueError(f"Match store version {header.get('version')} is not supported "
+                             f"(expected {MATCH_STORE_VERSION}), recompile with match_store.py")
+        with open(os.path.join(store_dir, 'tables.json'), 'r', encoding='utf-8') as f:
+            tables = json.load(f)
+        columns = {
+            column: np.load(os.path.join(store_dir, f"{column}.npy"), mmap_mode='r')
+            for column in MATCH_COLUMNS + RESULT_COLUMNS
+        }
+        # Columns that disagree with the header (or each other) would silently misalign matches and results
+        lengths = {column: len(columns[column]) for column in MATCH_COLUMNS + RESULT_COLUMNS}
+        expected = {column: header['matches'] for column in MATCH_COLUMNS}
+        expected['result_offset'] = header['matches'] + 1
+        expected.update({column: header['results'] for column in RESULT_COLUMNS})
+        mismatched = [column for column in lengths if lengths[column] != expected[column]]
+        if mismatched or int(columns['result_offset'][-1]) != header['results']:
+            raise ValueError(f"Match store {store_dir} is inconsistent with its header "
+                             f"({', '.join(mismatched) or 'result_offset'}), recompile with match_store.py --force")
+        return cls(store_dir, header, tables, columns)
+
+    def __len__(self):
+        return len(self.match_id)
+
+    def match_level(self, i):
+        return self.tables['levels'][self.level_code[i]]
+
+    def match_title(self, i):
+        return self.tables['titles'][self.title_code[i]]
+
+    def match_date(self, i):
+        return self.tables['dates'][self.date_code[i]]
+
+    def result_slice(self, i):
+        """Slice of the result columns belonging to match i"""
+        return slice(int(self.result_offset[i]), int(self.result_offset[i + 1]))
+
+    def player_metadata(self, code):
+        """Return (player_id, first_name, last_name, alias, region, division) for a player code"""
+        players = self.tables['players']
+        return (self.tables['player_ids'][code], players['first_name'][code], players['last_name'][code],
+                players['alias'][code], players['region'][code], players['division'][code])
+
+    def iter_match_dicts(self):
+        """Yield matches as dicts holding only the fields the rating code uses"""
+        players = self.tables['players']
+        divisions = self.tables['divisions']
+        for i in range(len(self)):
+            rows = self.result_slice(i)
+            results = []
+            for code, division_code, percentage in zip(self.player_code[rows].tolist(),
+                                                       self.division_code[rows].tolist(),
+                                                       self.match_percentage[rows].tolist()):
+                results.append({
+                    'first_name': players['first_name'][code],
+                    'last_name': players['last_name'][code],
+                    'alias': players['alias'][code],
+                    'region': players['region'][code],
+                    'division': divisions[division_code],
+                    'match_percentage': percentage,
+                })
+            yield {
+                'match_id': int(self.match_id[i]),
+                'match_title': self.match_title(i),
+                'match_level': self.match_level(i),
+                'match_date': self.match_date(i),
+                'combined_results': results,
+            }
+
+    def division_statistics(self):
+        """Division name statistics in the same shape as division_normalizer.get_division_statistics"""
+        raw_counts = np.bincount(self.raw_division_code, minlength=len(self.tables['raw_divisions']))
+        normalized_counts = np.bincount(self.division_code, minlength=len(self.tables['divisions']))
+        original_divisions = dict(zip(self.tables['raw_divisions'], raw_counts.tolist()))
+        normalized_divisions = dict(zip(self.tables['divisions'], normalized_counts.tolist()))
+        return {
+            'original_divisions': original_divisions,
+            'normalized_divisions': normalized_divisions,
+            'total_original_variations': len(original_divisions),
+            'total_normalized_divisions': len(normalized_divisions)
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile match_data JSON files into a columnar match store')
+    parser.add_argument('--match-data', default=MATCH_FILES_LOCATION,
+                       help='Directory with scraped match JSON files')
+    parser.add_argument('--output', default=MATCH_STORE_LOCATION,
+                       help='Directory to write the compiled store to')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Processes used to parse the match files (default: one per CPU)')
+    parser.add_argument('--force', action='store_true',
+                       help='Recompile even if no match file has changed since the last compile')
+    args = parser.parse_args()
+
+    compile_match_store(args.match_data, args.output, workers=args.workers, force=args.force)
+
+    start = time.perf_counter()
+    store = MatchStore.load(args.output)
+    print(f"Loaded {len(store)} matches back in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Side-by-side comparison of rating models in a single replay.
+Matches are loaded and normalized once; each match's participants are
+resolved to player indices once and then rated by N independent rating
+states (one per OpenSkill model and parameter set) in lockstep. Every state
+is scored on its pre-match predictions, and the final rankings are compared
+with the first (baseline) variant.
+
+Example:
+    python model_comparison.py --models BradleyTerryPart PlackettLuce ThurstoneMostellerPart
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import openskill.models
+from scipy.stats import spearmanr
+
+from combined_skill import IPSCRankingSystem, OPENSKILL_MODEL, parse_match_date
+from match_store import MatchStore, MATCH_STORE_LOCATION
+from rating_evaluation import PredictiveEvaluator
+from rating_store import METADATA_FIELDS, from_microseconds
+
+MODEL_COMPARISON_FILE = './model_comparison.json'
+
+# Models compared by default; the full-pairing models are quadratic in the
+# field size with openskill and can be added with --models
+DEFAULT_MODELS = ('BradleyTerryPart', 'PlackettLuce', 'ThurstoneMostellerPart')
+
+# Players of the combined ranking compared between variants
+TOP_PLAYERS = 50
+
+# IPSCRankingSystem arguments a variant may set
+VARIANT_OPTIONS = ('exponential_initial_decay', 'exponential_growth_rate', 'max_sigma_multiplier',
+                   'use_exponential_decay', 'sigma_decay_per_day')
+
+
+def build_ranking_system(variant):
+    """Ranking system for one variant
+
+    A variant is a dict with a ``name``, an openskill ``model`` class name and
+    optionally IPSCRankingSystem decay settings (see VARIANT_OPTIONS) and a
+    ``beta_scale`` multiplying every level's beta.
+    """
+    model_name = variant.get('model', OPENSKILL_MODEL.__name__)
+    if not hasattr(openskill.models, model_name):
+        raise ValueError(f"Unknown openskill model {model_name}")
+    options = {key: variant[key] for key in VARIANT_OPTIONS if key in variant}
+    ranking_system = IPSCRankingSystem(model_class=getattr(openskill.models, model_name), **options)
+    if 'beta_scale' in variant:
+        for level in ranking_system.beta_values:
+            ranking_system.beta_values[level] *= variant['beta_scale']
+    ranking_system.evaluator = PredictiveEvaluator()
+    return ranking_system
+
+
+def ranking_agreement(ranking, baseline_ranking, top_players=TOP_PLAYERS):
+    """How closely a ranking follows a baseline ranking (both from generate_ranking)
+
+    Returns:
+        dict: Spearman correlation of the conservative ratings of common players,
+        share of the baseline's top players also in the top of ``ranking`` and
+        mean absolute shift in combined rank
+    """
+    baseline_rank = {player['player_id']: player['combined_rank'] for player in baseline_ranking}
+    baseline_rating = {player['player_id']: player['conservative_rating'] for player in baseline_ranking}
+    baseline_top = {player['player_id'] for player in baseline_ranking if player['combined_rank'] <= top_players}
+    common = [player for player in ranking if player['player_id'] in baseline_rank]
+    top = {player['player_id'] for player in ranking if player['combined_rank'] <= top_players}
+    rating_correlation = None
+    if len(common) > 1:
+        rating_correlation = float(spearmanr([player['conservative_rating'] for player in common],
+                                             [baseline_rating[player['player_id']] for player in common]).correlation)
+    return {
+        'rating_correlation_with_baseline': rating_correlation,
+        'top_overlap_with_baseline': len(top & baseline_top) / max(len(baseline_top), 1),
+        'mean_rank_shift_from_baseline': (float(np.mean([abs(player['combined_rank'] - baseline_rank[player['player_id']])
+                                                         for player in common])) if common else None),
+    }
+
+
+class FanOutReplay:
+    """Rates each match once per variant, resolving its participants only once"""
+
+    def __init__(self, variants):
+        self.variants = variants
+        self.systems = [build_ranking_system(variant) for variant in variants]
+        self.rate_seconds = [0.0] * len(variants)
+        self.matches = 0
+
+    def _mirror_new_players(self):
+        """Add players first seen by the baseline state to the other states, at the same indices"""
+        source = self.systems[0].store
+        for system in self.systems[1:]:
+            store = system.store
+            for idx in range(len(store), len(source)):
+                store.add_player(*(source.metadata[field][idx] for field in METADATA_FIELDS))
+
+    def process_match(self, match_data):
+        """Rate one match in every rating state"""
+        baseline = self.systems[0]
+        results = match_data['combined_results']
+        player_indices = [
+            baseline.get_or_create_player(
+                result['first_name'],
+                result['last_name'],
+                result.get('region', 'Unknown'),
+                result.get('division', 'Unknown'),
+                result.get('alias'),
+            )
+            for result in results
+        ]
+        self._mirror_new_players()
+
+        self._rate_in_all_systems(match_data.get('match_id', 'unknown'), parse_match_date(match_data),
+                                  match_data.get('match_level', 'Level II'), player_indices,
+                                  [result['match_percentage'] for result in results], match_data.get('content_hash'))
+
+    def _rate_in_all_systems(self, match_id, match_date, match_level, player_indices, scores, content_hash=None):
+        """Rate one match, with participants already resolved to store indices, in every rating state"""
+        for i, system in enumerate(self.systems):
+            started = time.perf_counter()
+            system._rate_match(match_id, match_date, match_level, player_indices, scores, started, content_hash)
+            self.rate_seconds[i] += time.perf_counter() - started
+        self.matches += 1
+
+    def replay(self, matches, verbose=False):
+        """Rate all matches (date ordered match dicts) in every rating state"""
+        for i, match in enumerate(matches):
+            if verbose and (i + 1) % 100 == 0:
+                print(f"  {i + 1}/{len(matches)} matches")
+            if match.get('combined_results'):
+                self.process_match(match)
+
+    def replay_match_store(self, match_store, verbose=False):
+        """Rate all matches of a compiled match store in every rating state, reading its columns directly"""
+        baseline = self.systems[0]
+        code_to_index = np.full(len(match_store.tables['player_ids']), -1, dtype=np.int64)
+        for i in range(len(match_store)):
+            if verbose and (i + 1) % 100 == 0:
+                print(f"  {i + 1}/{len(match_store)} matches")
+            player_indices = baseline.match_store_players(match_store, i, code_to_index)
+            self._mirror_new_players()
+            self._rate_in_all_systems(int(match_store.match_id[i]), from_microseconds(match_store.match_time[i]),
+                                      match_store.match_level(i), player_indices.tolist(),
+                                      match_store.match_percentage[match_store.result_slice(i)].tolist())
+
+    def comparison(self, sweden_only=True, top_players=TOP_PLAYERS):
+        """Per variant: predictive metrics, rating summary and agreement with the baseline ranking"""
+        rankings = [system.generate_ranking(sweden_only=sweden_only) for system in self.systems]
+
+        report = []
+        for variant, system, ranking, seconds in zip(self.variants, self.systems, rankings, self.rate_seconds):
+            predictive = system.evaluator.summary()
+            ratings = np.array([player['conservative_rating'] for player in ranking]) if ranking else np.zeros(1)
+            report.append({
+                'name': variant['name'],
+                'variant': variant,
+                'rate_seconds': seconds,
+                'players_ranked': len(ranking),
+                'pairwise_accuracy': predictive['pairwise_accuracy'],
+                'log_loss': predictive['log_loss'],
+                'rank_correlation': predictive['mean_rank_correlation'],
+                'mean_sigma': float(np.mean([player['sigma'] for player in ranking])) if ranking else None,
+                'mean_rating': float(ratings.mean()),
+                **ranking_agreement(ranking, rankings[0], top_players),
+            })
+        return report
+
+
+def print_comparison(report, top_players=TOP_PLAYERS):
+    """Print the comparison report as a table"""
+    print("\n" + "="*130)
+    print("RATING MODEL COMPARISON (first variant is the baseline)")
+    print("="*130)
+    print(f"{'Variant':<28} {'Rate (s)':>9} {'Accuracy':>9} {'Log loss':>9} {'Rank ρ':>8} {'Mean σ':>8} "
+          f"{'Rating ρ vs base':>17} {f'Top {top_players} overlap':>15} {'Mean rank shift':>16}")
+    print("-"*130)
+
+    def number(value, width, decimals):
+        return f"{value:>{width}.{decimals}f}" if value is not None else f"{'-':>{width}}"
+
+    for entry in report:
+        print(f"{entry['name']:<28} {entry['rate_seconds']:>9.2f} {number(entry['pairwise_accuracy'], 9, 4)} "
+              f"{number(entry['log_loss'], 9, 4)} {number(entry['rank_correlation'], 8, 4)} "
+              f"{number(entry['mean_sigma'], 8, 3)} {number(entry['rating_correlation_with_baseline'], 17, 4)} "
+              f"{entry['top_overlap_with_baseline'] * 100:>14.0f}% {number(entry['mean_rank_shift_from_baseline'], 16, 1)}")
+    print("\nLog loss uses the Bradley-Terry win probability for every model; accuracy and rank correlation "
+          "only depend on the order of the pre-match ratings.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare rating models side by side in a single replay')
+    parser.add_argument('--models', nargs='+', default=list(DEFAULT_MODELS),
+                       help=f'openskill models to compare, the first is the baseline (default: {" ".join(DEFAULT_MODELS)})')
+    parser.add_argument('--variants', default=None,
+                       help='JSON file with a list of variants ({"name", "model", decay settings, "beta_scale"}) '
+                            'instead of --models')
+    parser.add_argument('--match-store', nargs='?', const=MATCH_STORE_LOCATION, default=None,
+                       help='Read matches from a compiled match store (see match_store.py) instead of match_data/')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Processes used to parse match_data/*.json (default: one per CPU)')
+    parser.add_argument('--all-regions', action='store_true', help='Compare rankings of all regions, not only Sweden')
+    parser.add_argument('--output', nargs='?', const=MODEL_COMPARISON_FILE, default=None,
+                       help='Write the comparison report as JSON')
+    args = parser.parse_args()
+
+    if args.variants:
+        with open(args.variants, 'r', encoding='utf-8') as f:
+            variants = json.load(f)
+    else:
+        variants = [{'name': model, 'model': model} for model in args.models]
+
+    print("Loading matches...")
+    start = time.perf_counter()
+    if args.match_store:
+        # Replayed straight from the memory-mapped columns
+        matches = MatchStore.load(args.match_store)
+    else:
+        matches = IPSCRankingSystem().load_matches(workers=args.workers)
+    print(f"Loaded {len(matches)} matches in {time.perf_counter() - start:.1f}s")
+
+    print(f"Replaying with {len(variants)} variants: {', '.join(variant['name'] for variant in variants)}")
+    start = time.perf_counter()
+    fan_out = FanOutReplay(variants)
+    if args.match_store:
+        fan_out.replay_match_store(matches, verbose=True)
+    else:
+        fan_out.replay(matches, verbose=True)
+    print(f"Replayed in {time.perf_counter() - start:.1f}s")
+
+    report = fan_out.comparison(sweden_only=not args.all_regions)
+    print_comparison(report)
+
+    if args.output:
+        with open(args.output + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        os.replace(args.output + '.tmp', args.output)
+        print(f"\nComparison report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,131 @@
+import argparse
+import hashlib
 import json
+import multiprocessing
 import os
+import time
 import numpy as np
 import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
 from collections import defaultdict, Counter
 import statistics
+from concurrent.futures import ProcessPoolExecutor
 from scipy import optimize
 from scipy.stats import norm
 import openskill
 import openskill.models
-from combined_skill import IPSCRankingSystem, START_MU, START_SIGMA, PERCENTILE
+from combined_skill import (IPSCRankingSystem, START_MU, START_SIGMA, PERCENTILE,
+                            EXPONENTIAL_INITIAL_DECAY, EXPONENTIAL_GROWTH_RATE, MAX_SIGMA_MULTIPLIER,
+                            parse_match_date)
+from match_store import MatchStore, MATCH_STORE_LOCATION
+from match_manifest import update_manifest, matches_with_results, read_match_files
 from division_normalizer import normalize_division_name
+from rating_evaluation import PredictiveEvaluator, ordered_pairs
+from decay_models import ExponentialDecay, make_decay_model
+
+# Continuous parameter search (see search_parameters)
+SEARCH_CACHE_LOCATION = './optimization_cache/'
+SEARCH_LEVELS = ('Level II', 'Level III', 'Level IV', 'Level V')
+SEARCH_PARAMETERS = {
+    'exponential_initial_decay': EXPONENTIAL_INITIAL_DECAY,
+    'exponential_growth_rate': EXPONENTIAL_GROWTH_RATE,
+    'max_sigma_multiplier': MAX_SIGMA_MULTIPLIER,
+    'beta_level_ii': START_MU/12,
+    'beta_level_iii': START_MU/6,
+    'beta_level_iv': START_MU/3,
+    'beta_level_v': START_MU/1.5,
+}
+SEARCH_METHODS = ('nelder-mead', 'powell')
+
+# Share of the matches (oldest first) only used to build up ratings before scoring predictions
+SEARCH_TRAIN_FRACTION = 0.7
+
+# Test matches between checks of whether an evaluation can still beat the others
+EARLY_STOP_INTERVAL = 25
+
+# Optimizer whose preloaded matches forked sweep workers replay (shared copy-on-write)
+_sweep_optimizer = None
+
+def _simulate_forked_model(model):
+    """Replay and evaluate one decay model in a forked sweep worker"""
+    return _sweep_optimizer.simulate_model(model)
 
 class SigmaDecayOptimizer:
     def __init__(self):
         self.match_data = []
+        # Compiled match store replayed instead of match_data when loaded with one
+        self.match_store = None
         self.player_activity_patterns = defaultdict(list)
         self.player_performance_consistency = defaultdict(list)
         self.temporal_gaps = []
         self.match_dates = []
         
-    def load_and_analyze_data(self):
-        """Load all match data and analyze temporal patterns"""
-        print("Loading match data for analysis...")
+    def load_and_analyze_data(self, match_store=None, workers=None):
+        """Load all match data and analyze temporal patterns
         
-        match_files_location = './match_data/'
-        for filename in os.listdir(match_files_location):
-            if filename.endswith('.json'):
-                filepath = os.path.join(match_files_location, filename)
-                try:
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        match_data = json.load(f)
-                        if 'combined_results' in match_data and len(match_data['combined_results']) > 0:
-                            self.match_data.append(match_data)
-                except Exception as e:
-                    print(f"Error loading {filename}: {e}")
+        Args:
+            match_store (str): Optional compiled match store directory to read
+                               instead of parsing match_data/*.json
+            workers (int): Processes used to parse match_data/*.json (default: one per CPU)
+        """
+        print("Loading match data for analysis...")
         
-        # Sort matches by date
-        self.match_data.sort(key=lambda x: datetime.fromisoformat(x['match_date'].replace('Z', '+00:00')))
-        self.match_dates = [datetime.fromisoformat(m['match_date'].replace('Z', '+00:00')) for m in self.match_data]
+        if match_store:
+            # Already date ordered and division normalized; replayed straight from its memory-mapped columns
+            self.match_store = MatchStore.load(match_store)
+            self.match_dates = [parse_match_date({'match_date': self.match_store.match_date(i)})
+                                for i in range(len(self.match_store))]
+        else:
+            match_files_location = './match_data/'
+            manifest = update_manifest(match_files_location)
+            self.match_data = read_match_files(match_files_location, matches_with_results(manifest), workers)
+            
+            # Sort matches by date, then match id
+            self.match_data.sort(key=lambda x: (parse_match_date(x), x.get('match_id', -1)))
+            self.match_dates = [parse_match_date(m) for m in self.match_data]
         
-        print(f"Loaded {len(self.match_data)} matches from {self.match_dates[0].date()} to {self.match_dates[-1].date()}")
+        print(f"Loaded {self._match_count()} matches from {self.match_dates[0].date()} to {self.match_dates[-1].date()}")
         
         self._analyze_player_activity_patterns()
         self._analyze_temporal_gaps()
         
+    def _match_count(self):
+        return len(self.match_store) if self.match_store is not None else len(self.match_data)
+    
+    def _match_scores(self, i):
+        """Match percentages of the results of match ``i``"""
+        if self.match_store is not None:
+            return self.match_store.match_percentage[self.match_store.result_slice(i)].tolist()
+        return [result['match_percentage'] for result in self.match_data[i]['combined_results']]
+    
+    def _iter_match_results(self):
+        """Yield (match date, results) per match, each result a dict with the player's names, region and division"""
+        if self.match_store is None:
+            for match_date, match in zip(self.match_dates, self.match_data):
+                yield match_date, match['combined_results']
+            return
+        store = self.match_store
+        players = store.tables['players']
+        divisions = store.tables['divisions']
+        for i, match_date in enumerate(self.match_dates):
+            rows = store.result_slice(i)
+            yield match_date, [
+                {'first_name': players['first_name'][code], 'last_name': players['last_name'][code],
+                 'region': players['region'][code], 'division': divisions[division_code],
+                 'match_percentage': percentage}
+                for code, division_code, percentage in zip(store.player_code[rows].tolist(),
+                                                           store.division_code[rows].tolist(),
+                                                           store.match_percentage[rows].tolist())
+            ]
+    
+    def _replay(self, ranking_system, start=0, end=None):
+        """Rate matches ``start`` to ``end`` (exclusive) of the loaded data in a ranking system"""
+        if self.match_store is not None:
+            ranking_system.replay_match_store(self.match_store, start=start, end=end)
+        else:
+            for match in self.match_data[start:end]:
+                ranking_system.process_match(match)
+    
     def _analyze_player_activity_patterns(self):
         """Analyze how often players compete and their consistency"""
         print("Analyzing player activity patterns...")
@@ -52,10 +133,8 @@ class SigmaDecayOptimizer:
         player_matches = defaultdict(list)
         player_performances = defaultdict(list)
         
-        for match in self.match_data:
-            match_date = datetime.fromisoformat(match['match_date'].replace('Z', '+00:00'))
-            
-            for result in match['combined_results']:
+        for match_date, results in self._iter_match_results():
+            for result in results:
                 # Create player identifier
                 division = normalize_division_name(result.get('division', 'Unknown'))
                 player_id = f"{result['first_name']}_{result['last_name']}_{result.get('region', 'Unknown')}_{division}".lower().replace(' ', '_')
@@ -157,8 +236,12 @@ class SigmaDecayOptimizer:
             print(f"  Players with high consistency (CV < 0.1): {sum(1 for cv in cvs if cv < 0.1)}")
             print(f"  Players with low consistency (CV > 0.3): {sum(1 for cv in cvs if cv > 0.3)}")
     
-    def simulate_decay_models(self):
-        """Simulate different decay models and evaluate their effectiveness"""
+    def simulate_decay_models(self, workers=None):
+        """Simulate different decay models and evaluate their effectiveness
+        
+        Args:
+            workers (int): Processes the models are replayed in (default: one per CPU)
+        """
         print("\n" + "="*80)
         print("SIMULATING DECAY MODELS")
         print("="*80)
@@ -189,90 +272,204 @@ class SigmaDecayOptimizer:
             {'name': 'Adaptive High', 'type': 'adaptive', 'base_decay': 0.015, 'consistency_factor': 1.5, 'max_multiplier': 2.0},
         ]
         
-        results = []
-        
-        for model in decay_models:
-            print(f"Testing {model['name']}...")
-            
-            # Create a custom ranking system with this decay model
-            ranking_system = self._create_custom_ranking_system(model)
-            
-            # Process all matches
-            for match in self.match_data:
-                ranking_system.process_match(match)
-            
-            # Evaluate the model
-            evaluation = self._evaluate_model(ranking_system, model)
-            results.append(evaluation)
+        results = self.run_models(decay_models, workers)
         
         # Print results
         self._print_model_comparison(results)
         
         return results
     
-    def _create_custom_ranking_system(self, model):
-        """Create a ranking system with custom decay model"""
-        class CustomRankingSystem(IPSCRankingSystem):
-            def __init__(self, decay_model):
-                super().__init__()
-                self.decay_model = decay_model
-                self.player_consistency = {}  # For adaptive models
+    def simulate_model(self, model):
+        """Replay every match with one decay model and evaluate the resulting ratings"""
+        ranking_system = self._create_custom_ranking_system(model)
+        # Predictive metrics are scored in the same replay, before each match is rated
+        ranking_system.evaluator = PredictiveEvaluator()
+        self._replay(ranking_system)
+        return self._evaluate_model(ranking_system, model)
+    
+    def run_models(self, models, workers=None):
+        """Evaluate decay models, in parallel over ``workers`` processes
+        
+        Workers are forked after the matches are loaded, so they share the
+        read-only match data copy-on-write instead of each loading or
+        receiving it. Each model is replayed independently from a fresh
+        ranking system, giving the same results as the serial loop.
+        Evaluations come back in the order of ``models``; ``workers``
+        defaults to the number of CPUs and 1 runs them in this process.
+        """
+        global _sweep_optimizer
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = max(1, min(workers, len(models)))
+        if workers > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+            print("Process forking is not available, running the models serially")
+            workers = 1
+        
+        if workers == 1:
+            results = []
+            for model in models:
+                print(f"Testing {model['name']}...")
+                results.append(self.simulate_model(model))
+            return results
+        
+        print(f"Testing {len(models)} models in {workers} processes...")
+        _sweep_optimizer = self
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as executor:
+                results = []
+                for model, evaluation in zip(models, executor.map(_simulate_forked_model, models)):
+                    print(f"Tested {model['name']}")
+                    results.append(evaluation)
+        finally:
+            _sweep_optimizer = None
+        return results
+    
+    def _data_fingerprint(self):
+        """Hash identifying the loaded matches (ids, dates and, where known, file contents)"""
+        digest = hashlib.sha256()
+        if self.match_store is not None:
+            # Same format as for match dicts, which carry no content hash when read from a store
+            for i in range(len(self.match_store)):
+                digest.update(f"{int(self.match_store.match_id[i])}|{self.match_store.match_date(i)}|\n".encode())
+            return digest.hexdigest()
+        for match in self.match_data:
+            digest.update(f"{match.get('match_id')}|{match['match_date']}|{match.get('content_hash', '')}\n".encode())
+        return digest.hexdigest()
+    
+    def evaluate_parameters(self, parameters, split_index, stop_above=None):
+        """Replay all matches with the given parameters and score predictions after ``split_index``
+        
+        The loss is the negative predictive log-likelihood of the test matches'
+        pairwise results, divided by the number of pairs in all test matches.
+        Partial sums can only grow, so once the loss of the matches scored so far
+        exceeds ``stop_above`` the full loss must too; the replay is then stopped
+        and an infinite loss returned (the partial sum is only a lower bound).
+        """
+        ranking_system = IPSCRankingSystem(
+            decay_model=ExponentialDecay(initial_decay=parameters['exponential_initial_decay'],
+                                         growth_rate=parameters['exponential_growth_rate']),
+            max_sigma_multiplier=parameters['max_sigma_multiplier'],
+            # Reproduces BradleyTerryPart, at a fraction of the cost per replay
+            vectorized_kernel=True,
+        )
+        for level in SEARCH_LEVELS:
+            ranking_system.beta_values[level] = parameters['beta_' + level.lower().replace(' ', '_')]
+        
+        match_count = self._match_count()
+        total_pairs = sum(ordered_pairs(self._match_scores(i)) for i in range(split_index, match_count))
+        
+        self._replay(ranking_system, end=split_index)
+        
+        evaluator = PredictiveEvaluator()
+        ranking_system.evaluator = evaluator
+        # Test matches are replayed in chunks, checking after each whether to stop
+        interval = EARLY_STOP_INTERVAL if stop_above is not None else match_count
+        for start in range(split_index, match_count, interval):
+            end = min(start + interval, match_count)
+            self._replay(ranking_system, start, end)
+            if stop_above is not None and end < match_count:
+                loss = -evaluator.totals['log_likelihood'] / total_pairs
+                if loss > stop_above:
+                    return float('inf'), end - split_index, True
+        return -evaluator.totals['log_likelihood'] / max(total_pairs, 1), match_count - split_index, False
+    
+    def search_parameters(self, method='nelder-mead', max_evaluations=100, train_fraction=SEARCH_TRAIN_FRACTION,
+                          cache_directory=SEARCH_CACHE_LOCATION):
+        """Search decay and beta parameters minimizing the predictive loss on a time split
+        
+        The oldest ``train_fraction`` of the matches only builds up ratings; each
+        later match is predicted from the ratings before it and then rated. The
+        search runs over the logarithms of the parameters (keeping them positive)
+        with scipy.optimize. Every complete evaluation is cached in ``cache_directory``
+        under a hash of the parameters, split and match data, so an interrupted
+        search resumes without repeating replays. With Nelder-Mead an evaluation is
+        stopped early, with an infinite loss, once it cannot beat the best complete
+        evaluation; such evaluations are not cached. Powell interpolates along its
+        line searches, which an infinite loss would break, so it always completes.
+        
+        Returns:
+            dict: Best parameters, their loss and the evaluations made
+        """
+        print("\n" + "="*80)
+        print(f"PARAMETER SEARCH ({method})")
+        print("="*80)
+        
+        os.makedirs(cache_directory, exist_ok=True)
+        names = list(SEARCH_PARAMETERS)
+        split_index = int(self._match_count() * train_fraction)
+        fingerprint = self._data_fingerprint()
+        print(f"Training on {split_index} matches, scoring predictions on {self._match_count() - split_index} "
+              f"matches from {self.match_dates[split_index].date()}")
+        
+        evaluations = []
+        
+        def objective(log_values):
+            # Rounded so the cache key does not depend on the last bits of the optimizer's arithmetic
+            parameters = {name: float(f"{value:.6g}") for name, value in zip(names, np.exp(log_values))}
+            key = hashlib.sha256(json.dumps({'parameters': parameters, 'split_index': split_index,
+                                             'data': fingerprint}, sort_keys=True).encode()).hexdigest()
+            cache_path = os.path.join(cache_directory, f"{key}.json")
             
-            def adjust_for_inactivity(self, current_date):
-                """Custom inactivity adjustment based on model type"""
-                for player_id, player_data in self.players.items():
-                    if player_id in self.player_last_match:
-                        days_since_last_match = (current_date - self.player_last_match[player_id]).days
-                        if days_since_last_match > 0:
-                            current_rating = player_data['rating']
-                            
-                            # Calculate decay based on model type
-                            if self.decay_model['type'] == 'constant':
-                                additional_sigma = self.decay_model['decay_per_day'] * days_since_last_match
-                            
-                            elif self.decay_model['type'] == 'logarithmic':
-                                additional_sigma = (self.decay_model['base_decay'] * days_since_last_match + 
-                                                 self.decay_model['log_factor'] * np.log(1 + days_since_last_match))
-                            
-                            elif self.decay_model['type'] == 'exponential':
-                                additional_sigma = (self.decay_model['initial_decay'] * 
-                                                 (np.exp(self.decay_model['growth_rate'] * days_since_last_match / 30) - 1))
-                            
-                            elif self.decay_model['type'] == 'adaptive':
-                                # Get player consistency (coefficient of variation)
-                                consistency = self.player_consistency.get(player_id, 1.0)  # Default to average consistency
-                                # Higher consistency (lower CV) = slower decay
-                                consistency_multiplier = 1.0 + (consistency * self.decay_model['consistency_factor'])
-                                additional_sigma = self.decay_model['base_decay'] * days_since_last_match * consistency_multiplier
-                            
-                            else:
-                                additional_sigma = 0.01 * days_since_last_match  # Fallback
-                            
-                            # Apply the decay
-                            new_sigma = current_rating.sigma + additional_sigma
-                            max_sigma = START_SIGMA * self.decay_model['max_multiplier']
-                            new_sigma = min(new_sigma, max_sigma)
-                            
-                            try:
-                                player_data['rating'] = self.model.rating(
-                                    mu=current_rating.mu,
-                                    sigma=new_sigma
-                                )
-                            except Exception as e:
-                                pass  # Skip if error
+            entry = None
+            if os.path.exists(cache_path):
+                with open(cache_path, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+                source = 'cached'
+                if entry.get('stopped_early'):
+                    entry = None  # Written by an older version, evaluate it fully
+            if entry is None:
+                stop_above = None
+                if method == 'nelder-mead':
+                    stop_above = min((e['loss'] for e in evaluations if not e['stopped_early']), default=None)
+                started = time.perf_counter()
+                loss, matches_scored, stopped_early = self.evaluate_parameters(parameters, split_index, stop_above)
+                entry = {
+                    'parameters': parameters,
+                    'loss': loss,
+                    'matches_scored': matches_scored,
+                    'stopped_early': stopped_early,
+                    'seconds': time.perf_counter() - started,
+                }
+                # A stopped evaluation depends on the threshold of this search, so only complete ones are reused
+                if not stopped_early:
+                    with open(cache_path + '.tmp', 'w', encoding='utf-8') as f:
+                        json.dump(entry, f, indent=2)
+                    os.replace(cache_path + '.tmp', cache_path)
+                source = 'stopped early' if stopped_early else f"{entry['seconds']:.1f}s"
             
-            def set_player_consistency(self, player_id, consistency):
-                """Set player consistency for adaptive models"""
-                self.player_consistency[player_id] = consistency
-        
-        ranking_system = CustomRankingSystem(model)
-        
-        # For adaptive models, set player consistency values
+            evaluations.append(entry)
+            print(f"  {len(evaluations):>4}  loss {entry['loss']:.6f}  ({source})  "
+                  + ", ".join(f"{name}={value:.4g}" for name, value in parameters.items()))
+            return entry['loss']
+        
+        start = np.log([SEARCH_PARAMETERS[name] for name in names])
+        options = {'maxfev': max_evaluations}
+        if method == 'nelder-mead':
+            options.update(xatol=1e-3, fatol=1e-6)
+        result = optimize.minimize(objective, start, method='Nelder-Mead' if method == 'nelder-mead' else 'Powell', options=options)
+        
+        best = min((entry for entry in evaluations if not entry['stopped_early']), key=lambda entry: entry['loss'])
+        print(f"\nBest loss {best['loss']:.6f} after {len(evaluations)} evaluations ({result.message})")
+        print("Parameters:")
+        for name, value in best['parameters'].items():
+            print(f"  {name} = {value:.6g}")
+        return {'parameters': best['parameters'], 'loss': best['loss'], 'evaluations': evaluations}
+    
+    def _create_custom_ranking_system(self, model):
+        """Create a ranking system with the decay model described by ``model`` (see decay_models.py)"""
+        options = {}
         if model['type'] == 'adaptive':
-            for player_id, consistency_data in self.player_performance_consistency.items():
-                ranking_system.set_player_consistency(player_id, consistency_data['coefficient_of_variation'])
-        
-        return ranking_system
+            # Player consistency (coefficient of variation) for adaptive models
+            options['consistency'] = {player_id: consistency_data['coefficient_of_variation']
+                                      for player_id, consistency_data in self.player_performance_consistency.items()}
+        
+        # Eager decay is one vectorized pass over all players per match; lazy decay is a
+        # Python-level step per participant plus a per-player flush before ranking.
+        # Both give identical evaluations, but eager replays are faster: 4.4s vs 6.9s
+        # per model with 60k players and 1500 matches, 0.75s vs 1.6s on match_data/.
+        return IPSCRankingSystem(decay_model=make_decay_model(model, **options),
+                                 max_sigma_multiplier=model['max_multiplier'],
+                                 lazy_decay=False)
     
     def _evaluate_model(self, ranking_system, model):
         """Evaluate a decay model's effectiveness"""
@@ -312,6 +509,12 @@ class SigmaDecayOptimizer:
             'high_sigma_players': sum(1 for s in sigmas if s > START_SIGMA * 1.8),
         }
         
+        if ranking_system.evaluator is not None:
+            predictive = ranking_system.evaluator.summary()
+            evaluation['pairwise_accuracy'] = predictive['pairwise_accuracy']
+            evaluation['log_loss'] = predictive['log_loss']
+            evaluation['rank_correlation'] = predictive['mean_rank_correlation']
+        
         return evaluation
     
     def _print_model_comparison(self, results):
@@ -326,7 +529,8 @@ class SigmaDecayOptimizer:
         
         results.sort(key=composite_score)
         
-        print(f"{'Model':<20} {'Avg σ':<8} {'Med σ':<8} {'σ Spread':<10} {'Reasonable %':<12} {'High σ Count':<12} {'Avg Rating':<12}")
+        print(f"{'Model':<20} {'Avg σ':<8} {'Med σ':<8} {'σ Spread':<10} {'Reasonable %':<12} {'High σ Count':<12} {'Avg Rating':<12} "
+              f"{'Accuracy':<10} {'Log loss':<10} {'Rank ρ':<8}")
         print("-" * 120)
         
         for result in results:
@@ -336,11 +540,19 @@ class SigmaDecayOptimizer:
                   f"{result['sigma_spread']:<10.3f} "
                   f"{result['reasonable_uncertainty_ratio']*100:<12.1f} "
                   f"{result['high_sigma_players']:<12} "
-                  f"{result['avg_rating']:<12.1f}")
+                  f"{result['avg_rating']:<12.1f} "
+                  f"{result.get('pairwise_accuracy') or 0:<10.4f} "
+                  f"{result.get('log_loss') or 0:<10.4f} "
+                  f"{result.get('rank_correlation') or 0:<8.4f}")
         
         print("\nBest models (lowest composite score):")
         for i, result in enumerate(results[:3]):
             print(f"{i+1}. {result['model']['name']}: {result['model']}")
+        
+        predictive = [result for result in results if result.get('log_loss') is not None]
+        if predictive:
+            best = min(predictive, key=lambda result: result['log_loss'])
+            print(f"Best predictive model (lowest log loss on pre-match ratings): {best['model']['name']}")
     
     def recommend_optimal_parameters(self, results):
         """Recommend optimal decay parameters based on analysis"""
@@ -373,34 +585,48 @@ class SigmaDecayOptimizer:
             print(f"SIGMA_DECAY_PER_DAY = {model['decay_per_day']}")
             print(f"MAX_SIGMA_MULTIPLIER = {model['max_multiplier']}")
         
-        elif model['type'] == 'logarithmic':
-            print("# Replace the adjust_for_inactivity method with:")
-            print(f"additional_sigma = {model['base_decay']} * days_since_last_match + {model['log_factor']} * np.log(1 + days_since_last_match)")
-        
-        elif model['type'] == 'exponential':
-            print("# Replace the adjust_for_inactivity method with:")
-            print(f"additional_sigma = {model['initial_decay']} * (np.exp({model['growth_rate']} * days_since_last_match / 30) - 1)")
-        
-        elif model['type'] == 'adaptive':
-            print("# Implement adaptive decay based on player consistency")
-            print(f"base_decay = {model['base_decay']}")
-            print(f"consistency_factor = {model['consistency_factor']}")
-            print("# consistency_multiplier = 1.0 + (player_cv * consistency_factor)")
-            print("# additional_sigma = base_decay * days_since_last_match * consistency_multiplier")
+        else:
+            decay_model = make_decay_model(model)
+            print("# Pass this decay model (see decay_models.py) to IPSCRankingSystem(decay_model=...):")
+            print(f"# {decay_model.formula()}")
+            print(f"decay_model = {decay_model!r}")
+            print(f"MAX_SIGMA_MULTIPLIER = {model['max_multiplier']}")
         
         return best_model
 
 def main():
+    parser = argparse.ArgumentParser(description='Analyze player activity and compare sigma decay models')
+    parser.add_argument('--match-store', nargs='?', const=MATCH_STORE_LOCATION, default=None,
+                       help='Read matches from a compiled match store (see match_store.py) instead of match_data/')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Processes used to parse match_data/*.json (default: one per CPU)')
+    parser.add_argument('--sweep-workers', type=int, default=None,
+                       help='Processes the decay models are replayed in (default: one per CPU)')
+    parser.add_argument('--search', nargs='?', const='nelder-mead', choices=SEARCH_METHODS, default=None,
+                       help='Search decay and beta parameters by predictive loss instead of comparing fixed models')
+    parser.add_argument('--max-evaluations', type=int, default=100,
+                       help='Replays the parameter search may run')
+    parser.add_argument('--train-fraction', type=float, default=SEARCH_TRAIN_FRACTION,
+                       help='Share of the matches (oldest first) used only to build up ratings in the search')
+    parser.add_argument('--search-cache', default=SEARCH_CACHE_LOCATION,
+                       help='Directory caching search evaluations by parameter hash')
+    args = parser.parse_args()
+    
     optimizer = SigmaDecayOptimizer()
     
     # Load and analyze the data
-    optimizer.load_and_analyze_data()
+    optimizer.load_and_analyze_data(match_store=args.match_store, workers=args.workers)
     
     # Print activity analysis
     optimizer.print_activity_analysis()
     
+    if args.search:
+        optimizer.search_parameters(method=args.search, max_evaluations=args.max_evaluations,
+                                    train_fraction=args.train_fraction, cache_directory=args.search_cache)
+        return
+    
     # Simulate different decay models
-    results = optimizer.simulate_decay_models()
+    results = optimizer.simulate_decay_models(workers=args.sweep_workers)
     
     # Recommend optimal parameters
     best_model = optimizer.recommend_optimal_parameters(results)
@@ -0,0 +1,163 @@
+"""
+Point-in-time rankings ("ranking as of date D").
+Restores the nearest stored checkpoint before the date (the dated history
+checkpoints kept by `combined_skill.py --history`, or the latest checkpoint),
+replays only the matches between it and the date, applies inactivity decay
+up to the date and ranks.
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from combined_skill import IPSCRankingSystem, MATCH_FILES_LOCATION, CHECKPOINT_FILE, parse_match_date
+from division_normalizer import normalize_division_name
+from match_manifest import update_manifest, matches_with_results, read_match_files
+from match_store import MatchStore, MATCH_STORE_LOCATION
+from rating_checkpoint import (load_checkpoint, restore_checkpoint, parameter_differences,
+                               read_checkpoint_header, nearest_history_checkpoint, HISTORY_LOCATION)
+from rating_store import to_microseconds
+
+
+def parse_as_of(date):
+    """Moment a ranking is requested for; a bare date means the end of that day"""
+    if isinstance(date, datetime):
+        return date
+    if isinstance(date, str) and 'T' not in date and ' ' not in date.strip():
+        return datetime.fromisoformat(date) + timedelta(days=1)
+    return datetime.fromisoformat(str(date))
+
+
+def _match_key(match_time, match_id):
+    return (match_time, -1 if match_id is None else match_id)
+
+
+def choose_checkpoint(as_of, history_directory=HISTORY_LOCATION, checkpoint_file=CHECKPOINT_FILE):
+    """Path of the latest stored checkpoint whose last match is before ``as_of``, or None"""
+    as_of_time = to_microseconds(as_of)
+    path, entry = nearest_history_checkpoint(as_of, history_directory)
+    best_processed = entry['matches_processed'] if entry else -1
+
+    # The latest checkpoint may be closer than any history checkpoint
+    header = read_checkpoint_header(checkpoint_file)
+    if header and header.get('last_match_date') and header['matches_processed'] > best_processed:
+        if to_microseconds(datetime.fromisoformat(header['last_match_date'])) < as_of_time:
+            path = checkpoint_file
+    return path
+
+
+def matches_between(after_key, as_of, match_store=None):
+    """Matches after (date, match id) ``after_key`` and before ``as_of``, in processing order
+
+    Returns a list of match dicts, or with ``match_store`` a (store, start, end)
+    range of its positions.
+    """
+    as_of_time = to_microseconds(as_of)
+
+    if match_store:
+        store = MatchStore.load(match_store)
+        times = np.asarray(store.match_time)
+        ids = np.asarray(store.match_id)
+        end = int(np.searchsorted(times, as_of_time, side='left'))
+        start = 0
+        if after_key is not None:
+            start = int(np.searchsorted(times, after_key[0], side='left'))
+            while start < end and _match_key(int(times[start]), int(ids[start])) <= after_key:
+                start += 1
+        return store, start, end
+
+    manifest = update_manifest(MATCH_FILES_LOCATION)
+    rows = []
+    for row in matches_with_results(manifest):
+        key = _match_key(to_microseconds(parse_match_date(row)), row['match_id'])
+        if key[0] < as_of_time and (after_key is None or key > after_key):
+            rows.append(row)
+    matches = read_match_files(MATCH_FILES_LOCATION, rows, workers=1)
+    matches.sort(key=lambda x: (parse_match_date(x), x.get('match_id', -1)))
+    return matches
+
+
+def ranking_as_of(date, division=None, sweden_only=True, history_directory=HISTORY_LOCATION,
+                  checkpoint_file=CHECKPOINT_FILE, match_store=None, ranking_system=None):
+    """
+    Ranking as it stood at ``date``.
+
+    Args:
+        date: datetime, or ISO date string (a bare date means the end of that day)
+        division (str): Only return this division (any spelling the normalizer accepts)
+        sweden_only (bool): Only rank Swedish players, as the published ranking does
+        history_directory (str): Directory of dated checkpoints
+        checkpoint_file (str): Latest checkpoint, also used if it is before the date
+        match_store (str): Compiled match store to replay from instead of match_data/
+        ranking_system (IPSCRankingSystem): Fresh system with the parameters to use
+
+    Returns:
+        list: Player dicts as returned by generate_ranking
+    """
+    as_of = parse_as_of(date)
+    ranking_system = ranking_system or IPSCRankingSystem()
+
+    after_key = None
+    path = choose_checkpoint(as_of, history_directory, checkpoint_file)
+    checkpoint = load_checkpoint(path) if path else None
+    if checkpoint is not None:
+        differences = parameter_differences(ranking_system, checkpoint)
+        if differences:
+            print(f"Checkpoint parameters differ ({', '.join(differences)}), replaying from the start")
+        else:
+            restore_checkpoint(ranking_system, checkpoint)
+            header = checkpoint['header']
+            after_key = _match_key(to_microseconds(datetime.fromisoformat(header['last_match_date'])),
+                                   header.get('last_match_id'))
+            print(f"Restored checkpoint {path} ({header['matches_processed']} matches up to {header['last_match_date']})")
+
+    matches = matches_between(after_key, as_of, match_store)
+    if match_store:
+        store, start, end = matches
+        print(f"Replaying {end - start} matches up to {as_of.isoformat()}")
+        ranking_system.replay_match_store(store, start=start, end=end)
+    else:
+        print(f"Replaying {len(matches)} matches up to {as_of.isoformat()}")
+        for match in matches:
+            ranking_system.process_match(match)
+
+    ranking_system.apply_decay_until(as_of)
+    rankings = ranking_system.generate_ranking(sweden_only=sweden_only)
+
+    if division:
+        normalized_division = normalize_division_name(division)
+        rankings = sorted((player for player in rankings if player['division'] == normalized_division),
+                          key=lambda player: player['division_rank'])
+    return rankings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Show the IPSC ranking as it stood at a given date')
+    parser.add_argument('date', help='ISO date (end of that day) or datetime')
+    parser.add_argument('--division', default=None, help='Only show this division')
+    parser.add_argument('--top', type=int, default=50, help='Number of players to show')
+    parser.add_argument('--all-regions', action='store_true', help='Rank players from all regions, not only Sweden')
+    parser.add_argument('--history', default=HISTORY_LOCATION, help='Directory of dated history checkpoints')
+    parser.add_argument('--match-store', nargs='?', const=MATCH_STORE_LOCATION, default=None,
+                       help='Replay from a compiled match store instead of match_data/')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rankings = ranking_as_of(args.date, division=args.division, sweden_only=not args.all_regions,
+                             history_directory=args.history, match_store=args.match_store)
+    elapsed = time.perf_counter() - start
+
+    rank_field = 'division_rank' if args.division else 'combined_rank'
+    print(f"\nRanking as of {args.date}" + (f" - {normalize_division_name(args.division)}" if args.division else ""))
+    print(f"{'Rank':<6} {'Name':<25} {'Division':<22} {'Rating':>8} {'Matches':>8}")
+    for player in rankings[:args.top]:
+        name = f"{player['first_name']} {player['last_name']}"
+        print(f"{player[rank_field]:<6} {name:<25} {player['division']:<22} "
+              f"{player['conservative_rating']:>8.1f} {player['matches_played']:>8}")
+    print(f"\n{len(rankings)} players ranked in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
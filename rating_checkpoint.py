@@ -0,0 +1,276 @@
+"""
+Persisted rating checkpoints for incremental re-rating.
+A checkpoint holds the full rating state after the last processed match,
+together with the parameters it was produced with, so that a later run can
+resume from it and only replay matches that are newer.
+"""
+
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+
+from rating_store import RatingStore, METADATA_FIELDS, NO_MATCH, to_microseconds
+
+CHECKPOINT_VERSION = 1
+
+# Directory of dated checkpoints kept during replay for point-in-time queries
+HISTORY_LOCATION = './checkpoints/history/'
+HISTORY_INDEX_FILE = 'index.json'
+
+STATE_COLUMNS = ('mu', 'sigma', 'last_match_time', 'matches_played')
+
+# Lazy decay not yet applied, only in checkpoints saved without flushing it
+PENDING_DECAY_COLUMNS = ('decayed_through', 'decay_timeline')
+
+
+def checkpoint_parameters(ranking_system):
+    """Parameters that affect ratings; a checkpoint is only reusable if these match"""
+    model = ranking_system.model
+    parameters = {
+        'model': type(model).__name__,
+        'mu': model.mu,
+        'sigma': model.sigma,
+        'tau': model.tau,
+        'decay_model': ranking_system.decay_model.parameters(),
+        'max_sigma_multiplier': ranking_system.max_sigma_multiplier,
+        'beta_values': dict(ranking_system.beta_values),
+    }
+    # Only set when enabled so that checkpoints of sequential replays stay valid
+    if getattr(ranking_system, 'same_day_batch', False):
+        parameters['same_day_batch'] = True
+    return parameters
+
+
+def save_checkpoint(ranking_system, path, flush=True):
+    """Write the rating state of a ranking system to a checkpoint file
+
+    Outstanding lazy decay is applied first so that the stored state is the
+    same regardless of decay mode. With ``flush=False`` (history checkpoints
+    taken during replay) it is stored instead, as each player's position in
+    the pending part of the decay timeline, and applied when the checkpoint is
+    restored. The file is written to a temporary name and renamed into place
+    so a crash never leaves a partial checkpoint.
+    """
+    if flush:
+        ranking_system.flush_pending_decay()
+    store = ranking_system.store
+
+    last_match_date = ranking_system.last_match_date
+    processed_match_ids = ranking_system.processed_match_ids
+    header = {
+        'version': CHECKPOINT_VERSION,
+        'created': datetime.now().isoformat(),
+        'parameters': checkpoint_parameters(ranking_system),
+        'last_match_date': last_match_date.isoformat() if last_match_date else None,
+        'matches_processed': len(processed_match_ids),
+        'last_match_id': processed_match_ids[-1] if processed_match_ids else None,
+        'time_decay_stats': {key: float(value) if key == 'total_decay_applied' else int(value)
+                             for key, value in ranking_system.time_decay_stats.items()},
+    }
+
+    arrays = {column: store.active(column) for column in STATE_COLUMNS}
+    arrays['processed_match_ids'] = np.array(
+        [-1 if match_id is None else int(match_id) for match_id in ranking_system.processed_match_ids],
+        dtype=np.int64
+    )
+    # SHA-256 of each rated match file, all zero where unknown (e.g. rated from a match store)
+    arrays['processed_match_hashes'] = np.array(
+        [list(bytes.fromhex(content_hash)) if content_hash else [0] * 32
+         for content_hash in ranking_system.processed_match_hashes],
+        dtype=np.uint8
+    ).reshape(-1, 32)
+    if not flush and ranking_system.lazy_decay:
+        timeline_length = ranking_system.decay_timeline_length
+        decayed_through = store.active('decayed_through')
+        pending = decayed_through[(decayed_through >= 0) & (decayed_through < timeline_length)]
+        base = int(pending.min()) if pending.size else timeline_length
+        arrays['decayed_through'] = np.where(decayed_through >= 0, decayed_through - base, -1)
+        arrays['decay_timeline'] = ranking_system.decay_timeline[base:timeline_length]
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        np.savez(
+            f,
+            header=np.array(json.dumps(header)),
+            metadata=np.array(json.dumps(store.metadata, ensure_ascii=False)),
+            **arrays
+        )
+    os.replace(temp_path, path)
+    return header
+
+
+def _hashes_from_array(digests):
+    """Hex content hashes from an (n, 32) digest array, None for unknown (all zero) rows"""
+    return [digest.tobytes().hex() if digest.any() else None for digest in digests]
+
+
+def load_checkpoint(path):
+    """Read a checkpoint file, returning None if it is missing or of another version"""
+    if not os.path.exists(path):
+        print(f"No checkpoint found at {path}")
+        return None
+
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            header = json.loads(str(data['header']))
+            if header.get('version') != CHECKPOINT_VERSION:
+                print(f"Checkpoint version {header.get('version')} is not supported (expected {CHECKPOINT_VERSION})")
+                return None
+            checkpoint = {
+                'header': header,
+                'metadata': json.loads(str(data['metadata'])),
+                'processed_match_ids': data['processed_match_ids'].tolist(),
+                'processed_match_hashes': _hashes_from_array(data['processed_match_hashes'])
+                if 'processed_match_hashes' in data.files
+                else [None] * len(data['processed_match_ids']),
+            }
+            for column in STATE_COLUMNS + PENDING_DECAY_COLUMNS:
+                if column in data.files:
+                    checkpoint[column] = data[column]
+    except Exception as e:
+        print(f"Error loading checkpoint {path}: {e}")
+        return None
+
+    return checkpoint
+
+
+def read_checkpoint_header(path):
+    """Read only the header of a checkpoint file, or None if it is missing or unreadable"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            return json.loads(str(data['header']))
+    except Exception as e:
+        print(f"Error reading checkpoint header {path}: {e}")
+        return None
+
+
+def parameter_differences(ranking_system, checkpoint):
+    """List the rating parameters that differ between a ranking system and a checkpoint"""
+    current = json.loads(json.dumps(checkpoint_parameters(ranking_system)))
+    stored = checkpoint['header']['parameters']
+    return sorted(key for key in set(current) | set(stored) if current.get(key) != stored.get(key))
+
+
+def restore_checkpoint(ranking_system, checkpoint):
+    """Replace the rating state of a fresh ranking system with a checkpoint's state"""
+    header = checkpoint['header']
+    metadata = checkpoint['metadata']
+    size = len(checkpoint['mu'])
+
+    store = RatingStore(ranking_system.model.mu, ranking_system.model.sigma, capacity=max(size, 1024))
+    for idx in range(size):
+        store.add_player(*(metadata[field][idx] for field in METADATA_FIELDS))
+    for column in STATE_COLUMNS:
+        store.active(column)[:] = checkpoint[column]
+
+    ranking_system.store = store
+    ranking_system.player_handles = {}
+    ranking_system.ranking_cache = {}
+    if 'decay_timeline' in checkpoint:
+        # Pick up the pending decay where the replay left it
+        timeline = checkpoint['decay_timeline']
+        ranking_system.decay_timeline = np.empty(max(2 * len(timeline), 1024), dtype=np.int64)
+        ranking_system.decay_timeline[:len(timeline)] = timeline
+        ranking_system.decay_timeline_length = len(timeline)
+        store.active('decayed_through')[:] = checkpoint['decayed_through']
+    else:
+        # The checkpoint was fully decayed when saved, so the lazy decay timeline starts empty
+        store.active('decayed_through')[:] = np.where(store.active('last_match_time') != NO_MATCH, 0, -1)
+        ranking_system.decay_timeline_length = 0
+
+    ranking_system.processed_match_ids = [None if match_id == -1 else match_id
+                                          for match_id in checkpoint['processed_match_ids']]
+    ranking_system.processed_match_hashes = list(checkpoint['processed_match_hashes'])
+    last_match_date = header['last_match_date']
+    ranking_system.last_match_date = datetime.fromisoformat(last_match_date) if last_match_date else None
+    ranking_system.time_decay_stats.update(header['time_decay_stats'])
+    if not ranking_system.lazy_decay:
+        # Eager decay expects every player to be up to date
+        for idx in range(size):
+            ranking_system.apply_pending_decay(idx)
+
+
+def _history_index_path(directory):
+    return os.path.join(directory, HISTORY_INDEX_FILE)
+
+
+def list_history_checkpoints(directory=HISTORY_LOCATION):
+    """Dated checkpoints in a history directory, ordered by last match date"""
+    path = _history_index_path(directory)
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    return sorted(entries, key=lambda entry: entry['matches_processed'])
+
+
+def save_history_checkpoint(ranking_system, directory=HISTORY_LOCATION):
+    """Save a checkpoint named after its last match date and add it to the history index
+
+    Entries for checkpoints at or after this one (from an earlier, longer
+    replay) are replaced, so the index always describes a single replay.
+    Pending lazy decay is stored rather than applied (see save_checkpoint),
+    and nothing is written if the latest entry already holds this state.
+    """
+    last_match_date = ranking_system.last_match_date
+    path = os.path.join(directory, f"rating_checkpoint_{last_match_date.strftime('%Y-%m-%d')}.npz")
+    processed_match_ids = ranking_system.processed_match_ids
+    entries = list_history_checkpoints(directory)
+    if (entries and entries[-1]['matches_processed'] == len(processed_match_ids) and
+            entries[-1]['last_match_id'] == (processed_match_ids[-1] if processed_match_ids else None) and
+            os.path.exists(os.path.join(directory, entries[-1]['path']))):
+        return None
+    header = save_checkpoint(ranking_system, path, flush=False)
+
+    entries = [entry for entry in entries if entry['matches_processed'] < header['matches_processed']]
+    entries.append({
+        'path': os.path.basename(path),
+        'last_match_date': header['last_match_date'],
+        'last_match_id': header['last_match_id'],
+        'matches_processed': header['matches_processed'],
+    })
+    index_path = _history_index_path(directory)
+    with open(index_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(entries, f, indent=2)
+    os.replace(index_path + '.tmp', index_path)
+    return header
+
+
+def nearest_history_checkpoint(as_of, directory=HISTORY_LOCATION):
+    """Path and index entry of the latest history checkpoint whose last match is before ``as_of``"""
+    as_of_time = to_microseconds(as_of)
+    best = None
+    for entry in list_history_checkpoints(directory):
+        if to_microseconds(datetime.fromisoformat(entry['last_match_date'])) < as_of_time:
+            best = entry
+    if best is None:
+        return None, None
+    return os.path.join(directory, best['path']), best
+
+
+def truncate_history(directory=HISTORY_LOCATION, matches_processed=0):
+    """Drop history checkpoints taken after ``matches_processed`` matches
+
+    Called when a replay restarts from that position, since later history
+    checkpoints may describe matches that have since changed.
+    """
+    entries = list_history_checkpoints(directory)
+    kept = [entry for entry in entries if entry['matches_processed'] <= matches_processed]
+    if len(kept) == len(entries):
+        return 0
+    for entry in entries[len(kept):]:
+        path = os.path.join(directory, entry['path'])
+        if os.path.exists(path) and all(other['path'] != entry['path'] for other in kept):
+            os.remove(path)
+    index_path = _history_index_path(directory)
+    with open(index_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(kept, f, indent=2)
+    os.replace(index_path + '.tmp', index_path)
+    return len(entries) - len(kept)
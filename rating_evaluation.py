@@ -0,0 +1,155 @@
+"""
+Predictive evaluation of ratings during replay.
+Before each match is rated, the participants' pre-match ratings are scored
+against the actual result: every pair of shooters with different match
+percentages is a prediction of who finishes ahead, with the Bradley-Terry
+win probability the rating model itself uses. Per match this gives the
+pairwise accuracy, the log-likelihood of the observed order and the rank
+correlation between rating and result, so model quality comes out of the
+same replay that produces the ratings.
+"""
+
+import numpy as np
+from scipy.stats import rankdata
+
+# Matches with fewer participants than this are not scored
+MIN_PARTICIPANTS = 2
+
+
+def pairwise_log_likelihood(mu, sigma, scores, beta):
+    """Log-likelihood of the observed pairwise order of one match under pre-match ratings
+
+    Args:
+        mu, sigma: Pre-match ratings of the participants
+        scores: Match percentage of each participant (higher is better)
+        beta (float): Performance variability of the match level
+
+    Returns:
+        tuple: (summed log-likelihood, number of ordered pairs); tied pairs are left out
+    """
+    mu = np.asarray(mu, dtype=np.float64)
+    variance = np.asarray(sigma, dtype=np.float64) ** 2
+    scores = np.asarray(scores, dtype=np.float64)
+
+    finished_ahead = scores[:, None] > scores[None, :]
+    pairs = int(np.count_nonzero(finished_ahead))
+    if pairs == 0:
+        return 0.0, 0
+
+    c = np.sqrt(variance[:, None] + variance[None, :] + 2 * beta * beta)
+    margin = (mu[:, None] - mu[None, :]) / c
+    # log P(i ahead of j) = -log(1 + exp(-margin))
+    return float(-np.logaddexp(0.0, -margin[finished_ahead]).sum()), pairs
+
+
+def pairwise_correct(mu, scores):
+    """Ordered pairs whose order the ratings predict (equal ratings count as half)"""
+    mu = np.asarray(mu, dtype=np.float64)
+    scores = np.asarray(scores, dtype=np.float64)
+    finished_ahead = scores[:, None] > scores[None, :]
+    rating_difference = (mu[:, None] - mu[None, :])[finished_ahead]
+    return float(np.count_nonzero(rating_difference > 0) + 0.5 * np.count_nonzero(rating_difference == 0))
+
+
+def rank_correlation(mu, scores):
+    """Spearman correlation between pre-match rating and match result, or None if undefined"""
+    rating_ranks = rankdata(mu)
+    result_ranks = rankdata(scores)
+    rating_ranks -= rating_ranks.mean()
+    result_ranks -= result_ranks.mean()
+    denominator = np.sqrt((rating_ranks * rating_ranks).sum() * (result_ranks * result_ranks).sum())
+    if denominator == 0:
+        return None
+    return float((rating_ranks * result_ranks).sum() / denominator)
+
+
+def ordered_pairs(scores):
+    """Number of pairs of participants with different scores"""
+    _, counts = np.unique(np.asarray(scores, dtype=np.float64), return_counts=True)
+    n = int(counts.sum())
+    return (n * (n - 1) - int((counts * (counts - 1)).sum())) // 2
+
+
+class PredictiveEvaluator:
+    """Accumulates predictive metrics of the matches from ``start_time`` (microseconds) on
+
+    Assign to ``IPSCRankingSystem.evaluator``; the ranking system calls
+    ``observe`` with the pre-match ratings of every match it rates.
+    """
+
+    def __init__(self, start_time=None):
+        self.start_time = start_time
+        self.totals = self._empty_totals()
+        self.correlation_sum = 0.0
+        self.correlated_matches = 0
+        self.levels = {}
+
+    @staticmethod
+    def _empty_totals():
+        return {'matches': 0, 'pairs': 0, 'log_likelihood': 0.0, 'correct_pairs': 0.0}
+
+    def observe(self, match_time, match_level, beta, mu, sigma, scores):
+        """Score one match's pre-match ratings against its result"""
+        if self.start_time is not None and match_time < self.start_time:
+            return
+        if len(scores) < MIN_PARTICIPANTS:
+            return
+        log_likelihood, pairs = pairwise_log_likelihood(mu, sigma, scores, beta)
+        correct = pairwise_correct(mu, scores)
+        correlation = rank_correlation(mu, scores)
+
+        level = self.levels.get(match_level)
+        if level is None:
+            level = self.levels[match_level] = self._empty_totals()
+        for totals in (self.totals, level):
+            totals['matches'] += 1
+            totals['pairs'] += pairs
+            totals['log_likelihood'] += log_likelihood
+            totals['correct_pairs'] += correct
+
+        if correlation is not None:
+            self.correlation_sum += correlation
+            self.correlated_matches += 1
+
+    def log_loss(self):
+        """Mean negative log-likelihood per ordered pair"""
+        pairs = self.totals['pairs']
+        return -self.totals['log_likelihood'] / pairs if pairs else 0.0
+
+    def summary(self):
+        """Metrics as a JSON-serializable dict, overall and per match level"""
+        def metrics(totals):
+            pairs = totals['pairs']
+            return {
+                'matches': totals['matches'],
+                'pairs': pairs,
+                'pairwise_accuracy': totals['correct_pairs'] / pairs if pairs else None,
+                'log_loss': -totals['log_likelihood'] / pairs if pairs else None,
+            }
+
+        summary = metrics(self.totals)
+        summary['mean_rank_correlation'] = (self.correlation_sum / self.correlated_matches
+                                            if self.correlated_matches else None)
+        summary['levels'] = {level: metrics(totals) for level, totals in sorted(self.levels.items())}
+        return summary
+
+    def print_summary(self):
+        """Print the overall and per-level metrics"""
+        summary = self.summary()
+        print("\n" + "="*70)
+        print("PREDICTIVE EVALUATION (pre-match ratings vs. results)")
+        print("="*70)
+        if not summary['pairs']:
+            print("No matches scored.")
+            return summary
+        print(f"{'Level':<12} {'Matches':>8} {'Pairs':>12} {'Accuracy':>10} {'Log loss':>10}")
+        print("-"*70)
+        for level, metrics in summary['levels'].items():
+            print(f"{level:<12} {metrics['matches']:>8} {metrics['pairs']:>12} "
+                  f"{metrics['pairwise_accuracy']:>10.4f} {metrics['log_loss']:>10.4f}")
+        print("-"*70)
+        print(f"{'All':<12} {summary['matches']:>8} {summary['pairs']:>12} "
+              f"{summary['pairwise_accuracy']:>10.4f} {summary['log_loss']:>10.4f}")
+        if summary['mean_rank_correlation'] is not None:
+            print(f"Mean rank correlation (Spearman) per match: {summary['mean_rank_correlation']:.4f}")
+        return summary
@@ -0,0 +1,101 @@
+"""
+Vectorized Bradley-Terry partial pairing update for the IPSC ranking system.
+Performs the same rating update as openskill's BradleyTerryPart.rate for
+matches where every competitor is a one-player team, but on NumPy arrays
+of mu/sigma instead of per-player rating and team objects.
+"""
+
+import numpy as np
+
+
+def bradley_terry_part_rate(model, mu, sigma, scores):
+    """
+    Rate one match of single-player teams with the parameters of ``model``.
+
+    The update mirrors BradleyTerryPart.rate: sigma is widened by tau, players
+    are ordered by score (ties keep their input order and share a rank), each
+    player is compared with the players within ``model.window_size`` places of
+    them, and mu/sigma are updated from the averaged omega/delta terms.
+
+    Args:
+        model: openskill BradleyTerryPart instance supplying beta, tau, kappa,
+               window_size, margin and limit_sigma
+        mu (np.ndarray): Current mu of each player, in result order
+        sigma (np.ndarray): Current sigma of each player, in result order
+        scores (array-like): Score of each player, higher is better
+
+    Returns:
+        tuple: (new_mu, new_sigma) arrays in the same order as the input
+    """
+    mu = np.asarray(mu, dtype=np.float64)
+    original_sigma = np.asarray(sigma, dtype=np.float64)
+    scores = np.asarray(scores, dtype=np.float64)
+
+    num_teams = len(mu)
+    if num_teams < 2:
+        raise ValueError(f"Argument 'teams' must have at least 2 teams, not {num_teams}.")
+
+    # Correct sigma with tau
+    tau = model.tau
+    sigma = np.sqrt(original_sigma * original_sigma + tau * tau)
+
+    # Order players by score; a player's rank is the number of players with a strictly better score
+    order = np.argsort(-scores, kind='stable')
+    sorted_neg_scores = -scores[order]
+    ranks = np.searchsorted(sorted_neg_scores, sorted_neg_scores, side='left')
+    team_mu = mu[order]
+    team_sigma = sigma[order]
+    team_sigma_squared = team_sigma ** 2
+    sorted_scores = scores[order]
+
+    two_beta_squared = 2 * model.beta ** 2
+    window = model.window_size
+    margin = model.margin
+    positions = np.arange(num_teams)
+
+    omega_sum = np.zeros(num_teams)
+    delta_sum = np.zeros(num_teams)
+    comparisons = np.zeros(num_teams)
+
+    # Opponents are visited in ascending position so the sums accumulate in the same order
+    for offset in range(-window, window + 1):
+        if offset == 0:
+            continue
+        q = positions + offset
+        valid = (q >= 0) & (q < num_teams)
+        if not valid.any():
+            continue
+        q = np.clip(q, 0, num_teams - 1)
+
+        margin_divisor = 1.0
+        if margin > 0.0:
+            score_diff = np.abs(sorted_scores - sorted_scores[q])
+            margin_divisor = np.where(score_diff > margin, np.log1p(score_diff / margin), 1.0)
+
+        c_iq = np.sqrt(team_sigma_squared + team_sigma_squared[q] + two_beta_squared)
+        p_iq = 1 / (1 + np.exp(((team_mu[q] - team_mu) / margin_divisor) / c_iq))
+        sigma_to_ciq = team_sigma_squared / c_iq
+        s = np.where(ranks[q] > ranks, 1.0, np.where(ranks[q] == ranks, 0.5, 0.0))
+        gamma_value = np.sqrt(team_sigma_squared) / c_iq
+
+        omega_sum += np.where(valid, sigma_to_ciq * (s - p_iq), 0.0)
+        delta_sum += np.where(valid, (gamma_value * sigma_to_ciq / c_iq) * p_iq * (1 - p_iq), 0.0)
+        comparisons += valid
+
+    omega = omega_sum / comparisons
+    delta = delta_sum / comparisons
+
+    # With one player per team the player's share of the team variance is exactly one
+    new_mu = team_mu + omega
+    new_sigma = team_sigma * np.sqrt(np.maximum(1 - delta, model.kappa))
+
+    # Scatter back to input order
+    result_mu = np.empty(num_teams)
+    result_sigma = np.empty(num_teams)
+    result_mu[order] = new_mu
+    result_sigma[order] = new_sigma
+
+    if model.limit_sigma:
+        result_sigma = np.minimum(result_sigma, original_sigma)
+
+    return result_mu, result_sigma
@@ -0,0 +1,215 @@
+"""
+Append-only rating ledger for per-player rating history.
+During replay every rated result is appended as a fixed-size binary record
+(match index, player index, mu/sigma before and after, placement and
+percentage). A per-player index built when the ledger is closed lets a
+shooter's full trajectory be read in O(their matches) without replaying.
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+
+from rating_store import from_microseconds
+
+LEDGER_LOCATION = './ledger/'
+
+RECORD_DTYPE = np.dtype([
+    ('match_index', '<i4'),
+    ('player_index', '<i4'),
+    ('mu_before', '<f8'),
+    ('mu_after', '<f8'),
+    ('sigma_before', '<f8'),
+    ('sigma_after', '<f8'),
+    ('placement', '<i4'),
+    ('percentage', '<f8'),
+])
+
+MATCH_DTYPE = np.dtype([
+    ('match_index', '<i4'),
+    ('match_id', '<i8'),
+    ('match_time', '<i8'),
+])
+
+RECORDS_FILE = 'records.bin'
+MATCHES_FILE = 'matches.bin'
+PLAYERS_FILE = 'players.json'
+INDEX_FILE = 'player_index.npz'
+
+# Records buffered in memory before they are appended to disk
+FLUSH_RECORDS = 65536
+
+
+def _truncate_from(path, dtype, match_index):
+    """Drop the records of ``match_index`` onwards from an append-only file"""
+    if not os.path.exists(path):
+        return 0
+    records = np.memmap(path, dtype=dtype, mode='r') if os.path.getsize(path) else np.empty(0, dtype)
+    keep = int(np.searchsorted(records['match_index'], match_index, side='left'))
+    del records
+    with open(path, 'r+b') as f:
+        f.truncate(keep * dtype.itemsize)
+    return keep
+
+
+def placements(scores):
+    """Competition placement (1 = best, ties share a placement) of each score"""
+    scores = np.asarray(scores, dtype=np.float64)
+    sorted_neg_scores = np.sort(-scores)
+    return np.searchsorted(sorted_neg_scores, -scores, side='left') + 1
+
+
+class RatingLedger:
+    """Writer of the append-only rating ledger of a replay"""
+
+    def __init__(self, directory=LEDGER_LOCATION, start_match_index=0):
+        """Open a ledger for appending from match position ``start_match_index``
+
+        Records of that match position onwards (from an earlier, longer run)
+        are dropped first, so a full replay starts an empty ledger and an
+        incremental one continues the existing history.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.records_path = os.path.join(directory, RECORDS_FILE)
+        self.matches_path = os.path.join(directory, MATCHES_FILE)
+
+        self.records_kept = _truncate_from(self.records_path, RECORD_DTYPE, start_match_index)
+        _truncate_from(self.matches_path, MATCH_DTYPE, start_match_index)
+
+        self._records = []
+        self._matches = []
+        self._buffered = 0
+
+    def record_match(self, match_index, match_id, match_time, player_indices,
+                     mu_before, sigma_before, mu_after, sigma_after, scores):
+        """Append the rating change of every participant of one match"""
+        records = np.empty(len(player_indices), dtype=RECORD_DTYPE)
+        records['match_index'] = match_index
+        records['player_index'] = player_indices
+        records['mu_before'] = mu_before
+        records['mu_after'] = mu_after
+        records['sigma_before'] = sigma_before
+        records['sigma_after'] = sigma_after
+        records['placement'] = placements(scores)
+        records['percentage'] = scores
+        self._records.append(records)
+
+        match_id = -1 if match_id is None or match_id == 'unknown' else int(match_id)
+        self._matches.append((match_index, match_id, match_time))
+
+        self._buffered += len(records)
+        if self._buffered >= FLUSH_RECORDS:
+            self.flush()
+
+    def flush(self):
+        """Append buffered records to disk"""
+        if self._records:
+            with open(self.records_path, 'ab') as f:
+                f.write(np.concatenate(self._records).tobytes())
+        if self._matches:
+            with open(self.matches_path, 'ab') as f:
+                f.write(np.array(self._matches, dtype=MATCH_DTYPE).tobytes())
+        self._records = []
+        self._matches = []
+        self._buffered = 0
+
+    def close(self, player_ids):
+        """Flush, then write the player table and rebuild the per-player index
+
+        Args:
+            player_ids (list): Player id of each player index (the rating store's order)
+        """
+        self.flush()
+
+        players_path = os.path.join(self.directory, PLAYERS_FILE)
+        with open(players_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(list(player_ids), f, ensure_ascii=False)
+        os.replace(players_path + '.tmp', players_path)
+
+        records = load_records(self.directory)
+        player_index = records['player_index']
+        order = np.argsort(player_index, kind='stable').astype(np.int64)
+        offsets = np.zeros(len(player_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(player_index, minlength=len(player_ids)), out=offsets[1:])
+
+        index_path = os.path.join(self.directory, INDEX_FILE)
+        with open(index_path + '.tmp', 'wb') as f:
+            np.savez(f, order=order, offsets=offsets)
+        os.replace(index_path + '.tmp', index_path)
+        return len(records)
+
+
+def load_records(directory=LEDGER_LOCATION):
+    """Memory-map the ledger's rating records"""
+    path = os.path.join(directory, RECORDS_FILE)
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return np.empty(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r')
+
+
+class LedgerReader:
+    """Read-only access to per-player histories of a closed ledger"""
+
+    def __init__(self, directory=LEDGER_LOCATION):
+        self.directory = directory
+        self.records = load_records(directory)
+        self.matches = np.fromfile(os.path.join(directory, MATCHES_FILE), dtype=MATCH_DTYPE)
+        with open(os.path.join(directory, PLAYERS_FILE), 'r', encoding='utf-8') as f:
+            self.player_ids = json.load(f)
+        self.player_lookup = {player_id: idx for idx, player_id in enumerate(self.player_ids)}
+        with np.load(os.path.join(directory, INDEX_FILE)) as index:
+            self.order = index['order']
+            self.offsets = index['offsets']
+
+    def player_history(self, player_index):
+        """Ledger records of one player index in match order"""
+        rows = self.order[self.offsets[player_index]:self.offsets[player_index + 1]]
+        return self.records[rows]
+
+    def trajectory(self, player_id):
+        """List of dicts describing each rated match of a player, oldest first"""
+        history = self.player_history(self.player_lookup[player_id])
+        match_positions = np.searchsorted(self.matches['match_index'], history['match_index'])
+        matches = self.matches[match_positions]
+        return [
+            {
+                'match_index': int(record['match_index']),
+                'match_id': int(match['match_id']),
+                'match_date': from_microseconds(match['match_time']).isoformat(),
+                'placement': int(record['placement']),
+                'percentage': float(record['percentage']),
+                'mu_before': float(record['mu_before']),
+                'mu_after': float(record['mu_after']),
+                'sigma_before': float(record['sigma_before']),
+                'sigma_after': float(record['sigma_after']),
+            }
+            for record, match in zip(history, matches)
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Show the rating history of a player from the rating ledger')
+    parser.add_argument('player', help='Player id, or part of one to list matching ids')
+    parser.add_argument('--ledger', default=LEDGER_LOCATION, help='Ledger directory')
+    args = parser.parse_args()
+
+    reader = LedgerReader(args.ledger)
+    if args.player not in reader.player_lookup:
+        candidates = [player_id for player_id in reader.player_ids if args.player.lower() in player_id]
+        print(f"No player with id {args.player}. Matching ids:" if candidates else f"No player matches {args.player}")
+        for player_id in candidates[:50]:
+            print(f"  {player_id}")
+        return
+
+    print(f"Rating history of {args.player}")
+    print(f"{'Date':<20} {'Match':>7} {'Place':>6} {'%':>7} {'μ before':>9} {'μ after':>9} {'σ before':>9} {'σ after':>9}")
+    for entry in reader.trajectory(args.player):
+        print(f"{entry['match_date']:<20} {entry['match_id']:>7} {entry['placement']:>6} {entry['percentage']:>7.2f} "
+              f"{entry['mu_before']:>9.3f} {entry['mu_after']:>9.3f} {entry['sigma_before']:>9.3f} {entry['sigma_after']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Compact rating state storage for the IPSC ranking system.
+Players are interned to integer indices and their rating state is kept in
+parallel NumPy arrays, with descriptive fields in a separate metadata table.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+MICROSECONDS_PER_DAY = 86400 * 1000000
+
+# Sentinel for "no match played yet" in the last_match_time column
+NO_MATCH = np.iinfo(np.int64).min
+
+METADATA_FIELDS = ('player_id', 'first_name', 'last_name', 'alias', 'region', 'division')
+
+
+_NAIVE_EPOCH = datetime(1970, 1, 1)
+_AWARE_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def to_microseconds(date):
+    """Convert a match datetime to integer microseconds since the epoch"""
+    epoch = _NAIVE_EPOCH if date.tzinfo is None else _AWARE_EPOCH
+    return (date - epoch) // timedelta(microseconds=1)
+
+
+def from_microseconds(microseconds):
+    """Convert integer microseconds since the epoch back to a (naive) datetime"""
+    return _NAIVE_EPOCH + timedelta(microseconds=int(microseconds))
+
+
+def make_player_id(first_name, last_name, region, division):
+    """Create a unique player identifier with (normalized) division"""
+    return f"{first_name}_{last_name}_{region}_{division}".lower().replace(' ', '_').replace('+', 'plus').replace('-', 'minus')
+
+
+class RatingStore:
+    """Struct-of-arrays store of player ratings indexed by interned player index"""
+
+    def __init__(self, start_mu, start_sigma, capacity=1024):
+        self.start_mu = start_mu
+        self.start_sigma = start_sigma
+        self.size = 0
+
+        # Interned player ids: player_id -> index into the arrays below
+        self.index = {}
+
+        # Rating state columns
+        self.mu = np.empty(capacity, dtype=np.float64)
+        self.sigma = np.empty(capacity, dtype=np.float64)
+        self.last_match_time = np.empty(capacity, dtype=np.int64)  # Microseconds since epoch
+        self.decayed_through = np.empty(capacity, dtype=np.int64)  # Lazy decay timeline position
+        self.matches_played = np.empty(capacity, dtype=np.int32)
+
+        # Metadata table, one list per field, aligned with the arrays
+        self.metadata = {field: [] for field in METADATA_FIELDS}
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, player_id):
+        return player_id in self.index
+
+    def _grow(self):
+        """Double the capacity of all state columns"""
+        capacity = max(2 * len(self.mu), 1)
+        for column in ('mu', 'sigma', 'last_match_time', 'decayed_through', 'matches_played'):
+            old = getattr(self, column)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, column, new)
+
+    def add_player(self, player_id, first_name, last_name, alias, region, division):
+        """Intern a new player with default rating and return its index"""
+        if self.size == len(self.mu):
+            self._grow()
+
+        idx = self.size
+        self.mu[idx] = self.start_mu
+        self.sigma[idx] = self.start_sigma
+        self.last_match_time[idx] = NO_MATCH
+        self.decayed_through[idx] = -1
+        self.matches_played[idx] = 0
+
+        self.metadata['player_id'].append(player_id)
+        self.metadata['first_name'].append(first_name)
+        self.metadata['last_name'].append(last_name)
+        self.metadata['alias'].append(alias)
+        self.metadata['region'].append(region)
+        self.metadata['division'].append(division)
+
+        self.index[player_id] = idx
+        self.size += 1
+        return idx
+
+    def active(self, column):
+        """View of a state column restricted to the players stored so far"""
+        return getattr(self, column)[:self.size]
+
+    def player(self, idx):
+        """Return a dict with the metadata and rating state of one player"""
+        player = {field: values[idx] for field, values in self.metadata.items()}
+        player.update({
+            'mu': float(self.mu[idx]),
+            'sigma': float(self.sigma[idx]),
+            'matches_played': int(self.matches_played[idx]),
+        })
+        return player
+
+    def nbytes(self):
+        """Approximate memory used by the state columns"""
+        return sum(getattr(self, column).nbytes
+                   for column in ('mu', 'sigma', 'last_match_time', 'decayed_through', 'matches_played'))
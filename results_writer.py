@@ -0,0 +1,114 @@
+"""
+Output stage for the ranking result files.
+Serializes rankings to JSON and CSV, writes the files concurrently and
+atomically (temporary file renamed into place), and optionally writes
+precompressed .gz/.br siblings next to each file for the website.
+"""
+
+import csv
+import gzip
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_FORMATS = ('gz', 'br')
+
+# Numeric CSV fields rounded for better readability
+ROUNDED_CSV_FIELDS = ('conservative_rating', 'mu', 'sigma', 'ordinal', 'percentage_of_best')
+
+
+def rankings_json(players, compact=False):
+    """Serialize a list of ranked players to JSON bytes"""
+    if compact:
+        text = json.dumps(players, ensure_ascii=False, separators=(',', ':'))
+    else:
+        text = json.dumps(players, indent=2, ensure_ascii=False)
+    return text.encode('utf-8')
+
+
+def rankings_csv(players, fieldnames):
+    """Serialize a list of ranked players to CSV bytes with only ``fieldnames``"""
+    output = io.StringIO(newline='')
+    if players:
+        writer = csv.DictWriter(output, fieldnames=fieldnames)
+        writer.writeheader()
+
+        for player in players:
+            # Create a copy of the player dict with only the fields we want in CSV
+            csv_row = {field: player.get(field, '') for field in fieldnames}
+            # Round numeric values for better CSV readability
+            for numeric_field in ROUNDED_CSV_FIELDS:
+                if isinstance(csv_row.get(numeric_field), (int, float)):
+                    csv_row[numeric_field] = round(csv_row[numeric_field], 2)
+            writer.writerow(csv_row)
+    return output.getvalue().encode('utf-8')
+
+
+def compress(data, compression):
+    """Compress bytes as 'gz' (reproducible, no timestamp) or 'br'"""
+    if compression == 'gz':
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if compression == 'br':
+        if brotli is None:
+            raise ImportError("Writing .br files requires the brotli package")
+        return brotli.compress(data, quality=11)
+    raise ValueError(f"Unknown compression format: {compression}")
+
+
+def write_atomic(path, data):
+    """Write bytes to a temporary file next to ``path`` and rename it into place"""
+    temp_path = f"{path}.tmp{os.getpid()}"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def available_compressions(compressions):
+    """Drop compression formats whose library is not installed"""
+    if 'br' in compressions and brotli is None:
+        print("brotli is not installed, skipping .br files (pip install brotli)")
+        return tuple(c for c in compressions if c != 'br')
+    return tuple(compressions)
+
+
+def write_output_file(path, data, compressions=()):
+    """Write one output file and its compressed siblings, returning the paths written"""
+    written = []
+    for compression in compressions:
+        sibling = f"{path}.{compression}"
+        write_atomic(sibling, compress(data, compression))
+        written.append(sibling)
+    # The plain file goes last, so its siblings are never older than it
+    write_atomic(path, data)
+    written.append(path)
+    return written
+
+
+def write_output_files(outputs, compressions=(), workers=None):
+    """Write many output files concurrently
+
+    Args:
+        outputs (dict): Path -> callable returning the file's bytes
+        compressions (tuple): Sibling formats to write, from COMPRESSION_FORMATS
+        workers (int): Number of writer threads (default: one per CPU)
+
+    Returns:
+        dict: Path -> list of paths written for it, in the order of ``outputs``
+    """
+    def write(item):
+        path, serialize = item
+        return write_output_file(path, serialize(), compressions)
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        return dict(zip(outputs, executor.map(write, outputs.items())))
@@ -0,0 +1,207 @@
+"""
+Run instrumentation for the IPSC ranking system.
+Collects wall time and call counts per pipeline stage, per-match latency
+with the slowest matches, row and player counters, and optionally a
+cProfile capture, and exports them as a JSON run report.
+"""
+
+import cProfile
+import functools
+import heapq
+import io
+import json
+import os
+import pstats
+import sys
+import time
+from array import array
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Number of slowest matches kept in the report
+SLOWEST_MATCHES = 20
+
+# Number of functions listed from a cProfile capture
+PROFILE_TOP_FUNCTIONS = 30
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if unknown"""
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def timed_stage(name):
+    """Decorator timing each call of a method as stage ``name`` of ``self.metrics``"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.stage(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class RunMetrics:
+    """Stage timings, per-match latency and counters of one ranking run"""
+
+    def __init__(self, slowest_matches=SLOWEST_MATCHES):
+        self.stage_seconds = {}
+        self.stage_calls = {}
+        self.slowest_matches = slowest_matches
+
+        # Per-match measurements, in processing order
+        self.match_latency = array('d')
+        self.match_rows = array('q')
+        self.match_players_touched = array('q')
+        self.match_players_decayed = array('q')
+        self._slowest = []  # Min-heap of (seconds, sequence, match summary)
+
+        self.profile_stats = None
+        self.profile_file = None
+
+    def add_time(self, stage, seconds, calls=1):
+        """Add wall time (and calls) to a stage"""
+        self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+        self.stage_calls[stage] = self.stage_calls.get(stage, 0) + calls
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block of code as one call of stage ``name``"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def record_match(self, match_id, seconds, rows, players_touched, players_decayed=0):
+        """Record one processed match
+
+        Args:
+            match_id: Id of the match
+            seconds (float): Wall time from lookup of the participants to the rating update
+            rows (int): Result rows of the match
+            players_touched (int): Distinct participants whose rating was updated
+            players_decayed (int): Players whose sigma was decayed for this match
+        """
+        self.match_latency.append(seconds)
+        self.match_rows.append(rows)
+        self.match_players_touched.append(players_touched)
+        self.match_players_decayed.append(players_decayed)
+
+        entry = (seconds, len(self.match_latency), {
+            'match_id': match_id,
+            'seconds': seconds,
+            'rows': rows,
+            'players_touched': players_touched,
+            'players_decayed': players_decayed,
+        })
+        if len(self._slowest) < self.slowest_matches:
+            heapq.heappush(self._slowest, entry)
+        elif seconds > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    @contextmanager
+    def profiled(self, output_file=None):
+        """Capture a cProfile of a block, optionally dumping the raw stats to ``output_file``"""
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            if output_file:
+                directory = os.path.dirname(output_file)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                profiler.dump_stats(output_file)
+                self.profile_file = output_file
+
+            stats = pstats.Stats(profiler, stream=io.StringIO())
+            stats.sort_stats('cumulative')
+            self.profile_stats = [
+                {
+                    'function': f"{filename}:{line}({name})",
+                    'calls': primitive_calls,
+                    'total_calls': total_calls,
+                    'own_seconds': own_time,
+                    'cumulative_seconds': cumulative_time,
+                }
+                for (filename, line, name), (primitive_calls, total_calls, own_time, cumulative_time, _)
+                in sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP_FUNCTIONS]
+            ]
+
+    def _latency_summary(self):
+        """Count, mean, percentiles and maximum of the per-match latencies"""
+        if not self.match_latency:
+            return {'count': 0}
+        latencies = sorted(self.match_latency)
+        count = len(latencies)
+
+        def percentile(p):
+            return latencies[min(count - 1, int(p / 100 * count))]
+
+        return {
+            'count': count,
+            'total_seconds': sum(latencies),
+            'mean_seconds': sum(latencies) / count,
+            'p50_seconds': percentile(50),
+            'p90_seconds': percentile(90),
+            'p99_seconds': percentile(99),
+            'max_seconds': latencies[-1],
+        }
+
+    def report(self, ranking_system=None):
+        """Build the run report as a JSON-serializable dict"""
+        report = {
+            'created': datetime.now().isoformat(),
+            'stages': {
+                stage: {'seconds': self.stage_seconds[stage], 'calls': self.stage_calls[stage]}
+                for stage in self.stage_seconds
+            },
+            'match_latency': self._latency_summary(),
+            'slowest_matches': [entry[2] for entry in sorted(self._slowest, key=lambda e: (-e[0], e[1]))],
+            'counters': {
+                'matches_processed': len(self.match_latency),
+                'rows_processed': sum(self.match_rows),
+                'players_touched': sum(self.match_players_touched),
+                'max_players_touched_per_match': max(self.match_players_touched, default=0),
+                'players_decayed': sum(self.match_players_decayed),
+            },
+            'peak_rss_mb': peak_rss_mb(),
+        }
+
+        if ranking_system is not None:
+            report['players'] = len(ranking_system.store)
+            report['decay_mode'] = 'lazy' if ranking_system.lazy_decay else 'eager'
+            report['rating_backend'] = 'vectorized' if ranking_system.vectorized_kernel else 'openskill'
+            report['time_decay_stats'] = {
+                key: float(value) for key, value in ranking_system.time_decay_stats.items()
+            }
+            if ranking_system.evaluator is not None:
+                report['predictive_evaluation'] = ranking_system.evaluator.summary()
+
+        if self.profile_stats is not None:
+            report['profile'] = {'file': self.profile_file, 'top_functions': self.profile_stats}
+
+        return report
+
+    def save_report(self, path, ranking_system=None):
+        """Write the run report as JSON, atomically"""
+        report = self.report(ranking_system)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        os.replace(temp_path, path)
+        return report
@@ -0,0 +1,164 @@
+"""
+How much same-day batching changes the rankings.
+Replays all matches twice, strictly in order and with same_day_batch (each
+calendar day's matches rated from a snapshot of the ratings at the start of
+the day), and compares the resulting rankings: rating correlation, top-N
+overlap, rank shifts and the players that moved the most.
+
+Example:
+    python same_day_report.py --workers 4 --output
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from combined_skill import IPSCRankingSystem, parse_match_date
+from model_comparison import ranking_agreement, TOP_PLAYERS
+
+SAME_DAY_REPORT_FILE = './same_day_report.json'
+
+# Players with the largest rank shifts listed in the report
+TOP_MOVERS = 20
+
+
+def replay(matches, same_day_batch=False, executor=None):
+    """Replay date ordered match dicts sequentially or in same-day batches and return the ranking system"""
+    ranking_system = IPSCRankingSystem(same_day_batch=same_day_batch)
+    if same_day_batch:
+        ranking_system.replay_days(matches, executor)
+    else:
+        for match in matches:
+            if match.get('combined_results'):
+                ranking_system.process_match(match)
+    return ranking_system
+
+
+def batch_statistics(matches):
+    """Matches and players affected by batching, i.e. on days with more than one match"""
+    matches = [match for match in matches if match.get('combined_results')]
+    matches_per_day = Counter(parse_match_date(match).date() for match in matches)
+    shared_days = {day for day, count in matches_per_day.items() if count > 1}
+    appearances = Counter()
+    for match in matches:
+        day = parse_match_date(match).date()
+        if day in shared_days:
+            for result in match['combined_results']:
+                appearances[(day, result['first_name'], result['last_name'], result.get('region'),
+                             result.get('division'))] += 1
+    return {
+        'days': len(matches_per_day),
+        'days_with_several_matches': len(shared_days),
+        'matches_on_shared_days': sum(matches_per_day[day] for day in shared_days),
+        'max_matches_per_day': max(matches_per_day.values(), default=0),
+        'shooters_in_several_matches_of_a_day': sum(1 for count in appearances.values() if count > 1),
+    }
+
+
+def compare(sequential, batched, sweden_only=True, top_players=TOP_PLAYERS, top_movers=TOP_MOVERS):
+    """Agreement of the batched ranking with the sequential one and the players that moved most"""
+    sequential_ranking = sequential.generate_ranking(sweden_only=sweden_only)
+    batched_ranking = batched.generate_ranking(sweden_only=sweden_only)
+    sequential_by_id = {player['player_id']: player for player in sequential_ranking}
+
+    movers = []
+    for player in batched_ranking:
+        before = sequential_by_id.get(player['player_id'])
+        if before is None:
+            continue
+        movers.append({
+            'player_id': player['player_id'],
+            'name': f"{player['first_name']} {player['last_name']}",
+            'division': player['division'],
+            'sequential_rank': before['combined_rank'],
+            'batched_rank': player['combined_rank'],
+            'rating_change': player['conservative_rating'] - before['conservative_rating'],
+        })
+    changed = [mover for mover in movers if mover['rating_change'] != 0]
+    movers.sort(key=lambda mover: (-abs(mover['batched_rank'] - mover['sequential_rank']),
+                                   -abs(mover['rating_change'])))
+    return {
+        'players_ranked': len(batched_ranking),
+        'players_with_changed_rating': len(changed),
+        'max_rating_change': max((abs(mover['rating_change']) for mover in changed), default=0.0),
+        'players_with_changed_rank': sum(1 for mover in movers if mover['batched_rank'] != mover['sequential_rank']),
+        **ranking_agreement(batched_ranking, sequential_ranking, top_players),
+        'largest_movers': movers[:top_movers],
+    }
+
+
+def print_report(report, top_players=TOP_PLAYERS):
+    """Print the same-day batching report"""
+    batches = report['batches']
+    agreement = report['agreement']
+    print("\n" + "="*80)
+    print("SAME-DAY BATCHING VS SEQUENTIAL REPLAY")
+    print("="*80)
+    print(f"Days with matches: {batches['days']}, with several matches: {batches['days_with_several_matches']} "
+          f"({batches['matches_on_shared_days']} matches, at most {batches['max_matches_per_day']} per day)")
+    print(f"Shooters in several matches of one day: {batches['shooters_in_several_matches_of_a_day']}")
+    print(f"Replay time: sequential {report['sequential_seconds']:.2f}s, batched {report['batched_seconds']:.2f}s")
+    print(f"\nPlayers ranked: {agreement['players_ranked']}, rating changed: {agreement['players_with_changed_rating']} "
+          f"(max {agreement['max_rating_change']:.4f}), rank changed: {agreement['players_with_changed_rank']}")
+    correlation = agreement['rating_correlation_with_baseline']
+    print(f"Rating correlation (Spearman): {correlation:.6f}" if correlation is not None else
+          "Rating correlation (Spearman): -")
+    print(f"Top {top_players} overlap: {agreement['top_overlap_with_baseline'] * 100:.0f}%")
+    shift = agreement['mean_rank_shift_from_baseline']
+    print(f"Mean rank shift: {shift:.2f}" if shift is not None else "Mean rank shift: -")
+
+    movers = [mover for mover in agreement['largest_movers'] if mover['rating_change'] != 0]
+    if movers:
+        print(f"\n{'Player':<30} {'Division':<20} {'Rank':>12} {'Rating change':>14}")
+        print("-"*80)
+        for mover in movers:
+            print(f"{mover['name'][:30]:<30} {mover['division'][:20]:<20} "
+                  f"{mover['sequential_rank']:>5} → {mover['batched_rank']:<5} {mover['rating_change']:>+14.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare same-day batched rankings with the sequential replay')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Processes rating the matches of one day (default: 1)')
+    parser.add_argument('--all-regions', action='store_true', help='Compare rankings of all regions, not only Sweden')
+    parser.add_argument('--output', nargs='?', const=SAME_DAY_REPORT_FILE, default=None,
+                       help='Write the report as JSON')
+    args = parser.parse_args()
+
+    print("Loading matches...")
+    matches = IPSCRankingSystem().load_matches()
+    print(f"Loaded {len(matches)} matches")
+
+    start = time.perf_counter()
+    sequential = replay(matches)
+    sequential_seconds = time.perf_counter() - start
+
+    executor = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+    try:
+        start = time.perf_counter()
+        batched = replay(matches, same_day_batch=True, executor=executor)
+        batched_seconds = time.perf_counter() - start
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    report = {
+        'sequential_seconds': sequential_seconds,
+        'batched_seconds': batched_seconds,
+        'batches': batch_statistics(matches),
+        'agreement': compare(sequential, batched, sweden_only=not args.all_regions),
+    }
+    print_report(report)
+
+    if args.output:
+        with open(args.output + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        os.replace(args.output + '.tmp', args.output)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
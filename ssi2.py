@@ -1,11 +1,15 @@
 import asyncio
+import contextlib
 import aiohttp
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 import re
 from dateutil import parser
 import json
 import os
-from typing import Optional, Dict, Any, List
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, Any, List, Tuple
+from match_manifest import update_manifest, save_manifest, manifest_row, is_row_eligible, NO_RESULTS
 
 LEVELS = {'Level II', 'Level III', 'Level IV', 'Level V'}
 
@@ -14,6 +18,25 @@ DIVISIONS = {
     'Pistol Caliber Carbine', 'Production Optics'
 }
 
+SSI_URL = 'https://shootnscoreit.com'
+
+REQUEST_TIMEOUT = 30      # Seconds per request
+PROGRESS_INTERVAL = 10    # Seconds between progress reports
+
+def has_class(name: str):
+    """Strainer class matcher for one class token
+
+    Unlike find(), a SoupStrainer compares class_ strings against the whole
+    class attribute, so class_='ssi-table' would drop <div class="ssi-table card">.
+    """
+    return lambda classes: classes is not None and name in classes.split()
+
+# Only the parts of each page that are read are built into a tree. The date
+# strainer matches the full class string, as the find() on its result does.
+SELECTION_STRAINER = SoupStrainer('div', class_=has_class('ssi-table'))
+DATE_STRAINER = SoupStrainer('div', class_='ssi-card-title title-2')
+COMBINED_STRAINER = SoupStrainer('table', id='sortTable')
+
 # Async-safe counters
 class AsyncCounter:
     def __init__(self):
@@ -34,6 +57,37 @@ successful_counter = AsyncCounter()
 failed_counter = AsyncCounter()
 skipped_counter = AsyncCounter()
 
+# Manifest rows of already scraped match files (filename -> row), loaded in main()
+existing_manifest: Dict[str, Dict[str, Any]] = {}
+
+# Whether existing_manifest has rows not yet written to disk, and the write in progress
+manifest_dirty = False
+manifest_save: Optional[asyncio.Future] = None
+
+# Scrape state of each match id, derived from the manifest
+ABSENT = 0          # No (readable) match file, fetch it
+INELIGIBLE = 1      # Saved, but not Level II+ with an eligible division
+COMPLETE = 2        # Saved with combined results
+NEEDS_RESULTS = 3   # Saved eligible match without combined results, fetch again
+STATE_NAMES = {ABSENT: 'absent', INELIGIBLE: 'ineligible', COMPLETE: 'complete', NEEDS_RESULTS: 'needs results'}
+
+# Scrape state by match id (one byte each), built from the manifest in main() and
+# updated as matches are saved, so skipped ids need no file I/O
+scrape_state = bytearray()
+
+# Bounds the requests in flight across all workers, created in main()
+request_semaphore: Optional[asyncio.Semaphore] = None
+
+# Processes parsing fetched pages off the event loop, created in main()
+parse_executor: Optional[ProcessPoolExecutor] = None
+
+async def fetch_text(session: aiohttp.ClientSession, url: str) -> str:
+    """GET a page and return its text, waiting for a free request slot first"""
+    async with request_semaphore if request_semaphore is not None else contextlib.nullcontext():
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)) as response:
+            response.raise_for_status()
+            return await response.text()
+
 def parse_date_string(date_text: str) -> Optional[str]:
     """Parse date string with special handling for noon/midnight"""
     if not date_text:
@@ -99,17 +153,37 @@ def parse_combined_results(soup: BeautifulSoup) -> List[Dict[str, Any]]:
     
     return results
 
-def check_existing_match_data(match_id: int, output_dir: str = "match_data") -> Optional[Dict[str, Any]]:
-    """Check if match data already exists and return its info"""
-    filepath = os.path.join(output_dir, f"match_{match_id}.json")
-    if os.path.exists(filepath):
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data
-        except Exception as e:
-            print(f"Error reading existing match {match_id}: {e}")
-    return None
+def row_scrape_state(row: Dict[str, Any]) -> int:
+    """Scrape state of a match from the manifest row of its file"""
+    if row['match_id'] is None:
+        return ABSENT  # Unreadable file, fetch it again
+    if not is_row_eligible(row, LEVELS, DIVISIONS):
+        return INELIGIBLE
+    if row['result_count'] == NO_RESULTS:
+        return NEEDS_RESULTS
+    return COMPLETE
+
+def set_scrape_state(match_id: int, state: int):
+    """Record the scrape state of a match id, growing the table as needed"""
+    if match_id >= len(scrape_state):
+        scrape_state.extend(bytes(match_id + 1 - len(scrape_state)))
+    scrape_state[match_id] = state
+
+def build_scrape_state(manifest: Dict[str, Dict[str, Any]], end_match_id: int = 0) -> Dict[int, int]:
+    """Fill the scrape state table from a manifest and return the number of ids in each state"""
+    scrape_state[:] = bytes(end_match_id + 1)
+    for filename, row in manifest.items():
+        id_match = re.fullmatch(r'match_(\d+)\.json', filename)
+        if id_match:
+            set_scrape_state(int(id_match.group(1)), row_scrape_state(row))
+    counts = {state: 0 for state in STATE_NAMES}
+    for state in scrape_state[1:]:
+        counts[state] += 1
+    return counts
+
+def match_scrape_state(match_id: int) -> int:
+    """Scrape state of a match id"""
+    return scrape_state[match_id] if match_id < len(scrape_state) else ABSENT
 
 def is_match_eligible(match_info: Optional[Dict[str, Any]]) -> bool:
     """Check if match is Level II or above and has eligible divisions"""
@@ -126,33 +200,19 @@ def is_match_eligible(match_info: Optional[Dict[str, Any]]) -> bool:
     
     return has_eligible_division
 
-async def get_match_info(session: aiohttp.ClientSession, match_id: int) -> Optional[Dict[str, Any]]:
-    """Get match info including combined results if it's Level II or above and has eligible divisions"""
-    url = f'https://shootnscoreit.com/ipsc/results/match/{match_id}/selection/'
+def parse_selection_page(text: str) -> Optional[Dict[str, Any]]:
+    """Title, return URL and divisions from a match's selection page, or None without a results table"""
+    soup = BeautifulSoup(text, 'html.parser', parse_only=SELECTION_STRAINER)
     
-    try:
-        async with session.get(url, timeout=aiohttp.ClientTimeout(total=30)) as response:
-            response.raise_for_status()
-            text = await response.text()
-    except Exception as e:
-        print(f"Error fetching match {match_id}: {e}")
-        return None
-        
-    soup = BeautifulSoup(text, 'html.parser')
-    
-    match_info = {
-        'match_id': match_id,
+    page_info = {
         'divisions': [],
         'match_url': None,
         'match_title': None,
-        'match_level': None,
-        'match_date': None
     }
     
     # Find the first ssi-table that contains the divisions and return URL
     first_table = soup.find('div', class_='ssi-table')
     if not first_table:
-        print(f"No table found for match {match_id}")
         return None
         
     # Get the match title from the title row
@@ -162,12 +222,12 @@ async def get_match_info(session: aiohttp.ClientSession, match_id: int) -> Optio
         title_text = title_row.get_text(strip=True)
         if title_text.endswith('return'):
             title_text = title_text[:-6].strip()  # Remove "return" from the end
-        match_info['match_title'] = title_text
+        page_info['match_title'] = title_text
         
         # Find the return URL button
         return_btn = title_row.find('a', class_='btn btn-primary')
         if return_btn:
-            match_info['match_url'] = return_btn.get('href')
+            page_info['match_url'] = return_btn.get('href')
     
     # Find all division links in the items-spaced-8px div
     items_div = first_table.find('div', class_='items-spaced-8px')
@@ -179,31 +239,68 @@ async def get_match_info(session: aiohttp.ClientSession, match_id: int) -> Optio
             # Skip the "Combined" link for divisions list
             if 'combined' not in link.get('href', ''):
                 name = link.text.strip()
-                match_info['divisions'].append({
+                page_info['divisions'].append({
                     'url': link.get('href'),
                     'name': name
                 })
+    return page_info
+
+def parse_match_page(text: str) -> Tuple[Optional[str], Optional[str]]:
+    """Match level and date (ISO format) from a match page"""
+    match_level = None
+    match_date = None
+    
+    # Look for match level in the page text
+    level_match = re.search(r'Level\s+(I{1,3}|IV|V)', text, re.IGNORECASE)
+    if level_match:
+        match_level = level_match.group(0)
+
+    # Extract match date from the ssi-card-title
+    date_title = BeautifulSoup(text, 'html.parser', parse_only=DATE_STRAINER).find('div', class_='ssi-card-title title-2')
+    if date_title:
+        date_text = date_title.get_text(strip=True)
+        match_date = parse_date_string(date_text)
+    return match_level, match_date
+
+def parse_combined_page(text: str) -> List[Dict[str, Any]]:
+    """Combined results from a match's combined results page"""
+    return parse_combined_results(BeautifulSoup(text, 'html.parser', parse_only=COMBINED_STRAINER))
+
+async def parse_page(parse, text: str):
+    """Run a page parser in the parse process pool (or inline when there is none)"""
+    if parse_executor is None:
+        return parse(text)
+    return await asyncio.get_running_loop().run_in_executor(parse_executor, parse, text)
+
+async def get_match_info(session: aiohttp.ClientSession, match_id: int) -> Optional[Dict[str, Any]]:
+    """Get match info including combined results if it's Level II or above and has eligible divisions"""
+    url = f'{SSI_URL}/ipsc/results/match/{match_id}/selection/'
+    
+    try:
+        text = await fetch_text(session, url)
+    except Exception as e:
+        print(f"Error fetching match {match_id}: {e}")
+        return None
+        
+    page_info = await parse_page(parse_selection_page, text)
+    if page_info is None:
+        print(f"No table found for match {match_id}")
+        return None
+    
+    match_info = {
+        'match_id': match_id,
+        'divisions': page_info['divisions'],
+        'match_url': page_info['match_url'],
+        'match_title': page_info['match_title'],
+        'match_level': None,
+        'match_date': None
+    }
     
     # Fetch match level and date from the match URL
     if match_info['match_url']:
         try:
-            async with session.get('https://shootnscoreit.com' + match_info['match_url'], 
-                                 timeout=aiohttp.ClientTimeout(total=30)) as match_response:
-                match_response.raise_for_status()
-                match_text = await match_response.text()
-                match_soup = BeautifulSoup(match_text, 'html.parser')
-                
-                # Look for match level in the page text
-                level_match = re.search(r'Level\s+(I{1,3}|IV|V)', match_text, re.IGNORECASE)
-                if level_match:
-                    match_info['match_level'] = level_match.group(0)
-
-                # Extract match date from the ssi-card-title
-                date_title = match_soup.find('div', class_='ssi-card-title title-2')
-                if date_title:
-                    date_text = date_title.get_text(strip=True)
-                    match_info['match_date'] = parse_date_string(date_text)
-                    
+            match_text = await fetch_text(session, SSI_URL + match_info['match_url'])
+            match_info['match_level'], match_info['match_date'] = await parse_page(parse_match_page, match_text)
         except Exception as e:
             print(f"Error fetching match details for {match_id}: {e}")
     
@@ -215,16 +312,13 @@ async def get_match_info(session: aiohttp.ClientSession, match_id: int) -> Optio
         print(f"Fetching combined results for {match_info['match_level']} match {match_id}")
         print(f"  Eligible divisions: {', '.join(eligible_divisions)}")
         
-        combined_url = f'https://shootnscoreit.com/ipsc/results/match/{match_id}/combined/'
+        combined_url = f'{SSI_URL}/ipsc/results/match/{match_id}/combined/'
         
         try:
-            async with session.get(combined_url, timeout=aiohttp.ClientTimeout(total=30)) as result_response:
-                result_response.raise_for_status()
-                result_text = await result_response.text()
-                result_soup = BeautifulSoup(result_text, 'html.parser')
-                combined_results = parse_combined_results(result_soup)
-                match_info['combined_results'] = combined_results
-                print(f"  Found {len(combined_results)} combined results for match {match_id}")
+            result_text = await fetch_text(session, combined_url)
+            combined_results = await parse_page(parse_combined_page, result_text)
+            match_info['combined_results'] = combined_results
+            print(f"  Found {len(combined_results)} combined results for match {match_id}")
                 
         except Exception as e:
             print(f"Error fetching combined results for match {match_id}: {e}")
@@ -242,6 +336,30 @@ async def get_match_info(session: aiohttp.ClientSession, match_id: int) -> Optio
     
     return match_info
 
+def mark_manifest_dirty():
+    global manifest_dirty
+    manifest_dirty = True
+
+async def persist_manifest(output_dir: str):
+    """Write the manifest in a thread if it has changed since it was last written
+
+    The write runs on a snapshot and is shielded from cancellation, so a
+    later write (e.g. at shutdown) can wait for it instead of racing it.
+    """
+    global manifest_dirty, manifest_save
+    if not manifest_dirty:
+        return
+    manifest_dirty = False
+    manifest_save = asyncio.get_running_loop().run_in_executor(None, save_manifest, dict(existing_manifest), output_dir)
+    await asyncio.shield(manifest_save)
+
+def write_match_file(filepath: str, match_info: Dict[str, Any]) -> Dict[str, Any]:
+    """Write a match file and return its manifest row, hashing the bytes written instead of rereading them"""
+    content = json.dumps(match_info, indent=2, ensure_ascii=False).encode('utf-8')
+    with open(filepath, 'wb') as f:
+        f.write(content)
+    return manifest_row(os.path.basename(filepath), content, os.stat(filepath), match_info)
+
 async def save_match_info(match_info: Dict[str, Any], output_dir: str = "match_data"):
     """Save match info to a JSON file"""
     if not match_info:
@@ -255,8 +373,11 @@ async def save_match_info(match_info: Dict[str, Any], output_dir: str = "match_d
     filepath = os.path.join(output_dir, filename)
     
     try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(match_info, f, indent=2, ensure_ascii=False)
+        # Written and hashed in a thread so the event loop keeps serving requests
+        row = await asyncio.get_running_loop().run_in_executor(None, write_match_file, filepath, match_info)
+        existing_manifest[filename] = row
+        mark_manifest_dirty()
+        set_scrape_state(match_id, row_scrape_state(row))
         print(f"Saved match {match_id} to {filepath}")
     except Exception as e:
         print(f"Error saving match {match_id}: {e}")
@@ -265,22 +386,18 @@ async def process_single_match(session: aiohttp.ClientSession, match_id: int, ou
     """Process a single match - this will be run in parallel"""
     global successful_counter, failed_counter, skipped_counter
     
-    # Check if file already exists
-    existing_data = check_existing_match_data(match_id, output_dir)
-    
-    if existing_data:
-        # If we have existing data, check if it's eligible and complete
-        if is_match_eligible(existing_data):
-            if 'combined_results' in existing_data:
-                print(f"Match {match_id} already processed with combined results, skipping...")
-                await skipped_counter.increment()
-                return 'skipped'
-            else:
-                print(f"Match {match_id} exists but missing combined results, reprocessing...")
-        else:
-            print(f"Match {match_id} already processed (not eligible), skipping...")
-            await skipped_counter.increment()
-            return 'skipped'
+    # Check the scrape state of earlier runs
+    state = match_scrape_state(match_id)
+    if state == COMPLETE:
+        print(f"Match {match_id} already processed with combined results, skipping...")
+        await skipped_counter.increment()
+        return 'skipped'
+    if state == INELIGIBLE:
+        print(f"Match {match_id} already processed (not eligible), skipping...")
+        await skipped_counter.increment()
+        return 'skipped'
+    if state == NEEDS_RESULTS:
+        print(f"Match {match_id} exists but missing combined results, reprocessing...")
     
     try:
         match_info = await get_match_info(session, match_id)
@@ -301,24 +418,46 @@ async def process_single_match(session: aiohttp.ClientSession, match_id: int, ou
         await failed_counter.increment()
         return 'failed'
 
-async def process_matches_batch(session: aiohttp.ClientSession, match_ids: List[int], output_dir: str) -> List[str]:
-    """Process a batch of matches concurrently"""
-    tasks = [process_single_match(session, match_id, output_dir) for match_id in match_ids]
-    return await asyncio.gather(*tasks, return_exceptions=True)
+async def match_worker(session: aiohttp.ClientSession, queue: asyncio.Queue, output_dir: str):
+    """Long-lived worker processing match ids from the queue until it gets None"""
+    while True:
+        match_id = await queue.get()
+        try:
+            if match_id is None:
+                return
+            await process_single_match(session, match_id, output_dir)
+        finally:
+            queue.task_done()
+
+async def report_progress(total_matches: int, output_dir: str, interval: float = PROGRESS_INTERVAL):
+    """Report progress and persist the manifest (if changed) every ``interval`` seconds until cancelled"""
+    started = time.perf_counter()
+    while True:
+        await asyncio.sleep(interval)
+        processed = successful_counter.value + skipped_counter.value + failed_counter.value
+        elapsed = time.perf_counter() - started
+        print(f"Progress: {processed}/{total_matches} matches processed ({processed / elapsed:.1f}/s)")
+        print(f"Successful: {successful_counter.value}, "
+              f"Skipped: {skipped_counter.value}, "
+              f"Failed: {failed_counter.value}")
+        await persist_manifest(output_dir)
 
-async def main():
-    """Main function to iterate over match IDs and save data using async processing"""
-    # You can adjust this range based on your needs
-    start_match_id = 1
-    end_match_id = 24700
+async def main(start_match_id: int = 1, end_match_id: int = 24700, output_dir: str = "match_data",
+               concurrent_limit: int = 50, parse_workers: Optional[int] = None):
+    """Main function to iterate over match IDs and save data using async processing
+    
+    ``concurrent_limit`` is the number of concurrent requests and
+    ``parse_workers`` the number of processes parsing HTML (default: one per CPU).
+    """
+    global request_semaphore, parse_executor
     
-    output_dir = "match_data"
-    concurrent_limit = 50  # Number of concurrent requests
-    batch_size = 100      # Process in batches for progress reporting
+    worker_count = 2 * concurrent_limit  # Workers also spend time on skipped ids and file I/O
     
     print(f"Starting to process matches from {start_match_id} to {end_match_id}")
     print(f"Using {concurrent_limit} concurrent connections")
-    print(f"Batch size: {batch_size}")
+    print(f"Workers: {worker_count}")
+    parse_workers = parse_workers or os.cpu_count() or 1
+    print(f"HTML parsing processes: {parse_workers}")
     print(f"Output directory: {output_dir}")
     print(f"Looking for divisions: {', '.join(sorted(DIVISIONS))}")
     print(f"Looking for levels: {', '.join(sorted(LEVELS))}")
@@ -326,6 +465,11 @@ async def main():
     # Create the output directory
     os.makedirs(output_dir, exist_ok=True)
     
+    # Load the manifest of already scraped matches so existing files need not be reopened
+    existing_manifest.update(update_manifest(output_dir, verbose=True))
+    state_counts = build_scrape_state(existing_manifest, end_match_id)
+    print("Scrape state: " + ", ".join(f"{count} {STATE_NAMES[state]}" for state, count in state_counts.items()))
+    
     # Configure aiohttp session with connection limits
     connector = aiohttp.TCPConnector(
         limit=concurrent_limit,
@@ -334,28 +478,34 @@ async def main():
         use_dns_cache=True
     )
     
-    timeout = aiohttp.ClientTimeout(total=30)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    request_semaphore = asyncio.Semaphore(concurrent_limit)
+    parse_executor = ProcessPoolExecutor(max_workers=parse_workers)
     
     async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
         total_matches = end_match_id - start_match_id + 1
-        processed_matches = 0
         
-        # Process matches in batches
-        for batch_start in range(start_match_id, end_match_id + 1, batch_size):
-            batch_end = min(batch_start + batch_size - 1, end_match_id)
-            match_ids = list(range(batch_start, batch_end + 1))
-            
-            print(f"\nProcessing batch: matches {batch_start} to {batch_end}")
-            
-            # Process the batch
-            results = await process_matches_batch(session, match_ids, output_dir)
-            processed_matches += len(match_ids)
-            
-            # Report progress
-            print(f"Progress: {processed_matches}/{total_matches} matches processed")
-            print(f"Successful: {successful_counter.value}, "
-                  f"Skipped: {skipped_counter.value}, "
-                  f"Failed: {failed_counter.value}")
+        # Workers take ids as they become free, so a slow request only holds up its own worker
+        queue = asyncio.Queue(maxsize=2 * worker_count)
+        workers = [asyncio.create_task(match_worker(session, queue, output_dir)) for _ in range(worker_count)]
+        progress = asyncio.create_task(report_progress(total_matches, output_dir))
+        
+        try:
+            for match_id in range(start_match_id, end_match_id + 1):
+                await queue.put(match_id)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            progress.cancel()
+            for worker in workers:
+                worker.cancel()
+            # Persist the manifest of everything scraped so far, after any write still in progress
+            if manifest_save is not None:
+                await asyncio.wait([manifest_save])
+            await persist_manifest(output_dir)
+            parse_executor.shutdown()
+            parse_executor = None
     
     print(f"\nCompleted processing matches {start_match_id} to {end_match_id}")
     print(f"Successful (Level II+ with eligible divisions): {successful_counter.value}")
@@ -364,4 +514,4 @@ async def main():
     print(f"Data saved to: {output_dir}/")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
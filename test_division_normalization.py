@@ -7,6 +7,7 @@ import json
 import os
 from collections import defaultdict
 from division_normalizer import normalize_division_name, get_division_statistics
+from match_manifest import update_manifest
 
 def test_normalization():
     """Test the division normalization on actual match data"""
@@ -15,19 +16,16 @@ def test_normalization():
     match_files_location = './match_data/'
     matches = []
     
-    # Load first 10 match files for testing
-    count = 0
-    for filename in sorted(os.listdir(match_files_location)):
-        if filename.endswith('.json') and count < 10:
-            filepath = os.path.join(match_files_location, filename)
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    match_data = json.load(f)
-                    if 'combined_results' in match_data and len(match_data['combined_results']) > 0:
-                        matches.append(match_data)
-                        count += 1
-            except Exception as e:
-                print(f"Error loading {filename}: {e}")
+    # Load first 10 match files with results for testing; the manifest lets us skip empty files unopened
+    manifest = update_manifest(match_files_location)
+    with_results = sorted(row['filename'] for row in manifest.values() if row['result_count'] > 0)
+    for filename in with_results[:10]:
+        filepath = os.path.join(match_files_location, filename)
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                matches.append(json.load(f))
+        except Exception as e:
+            print(f"Error loading {filename}: {e}")
     
     print(f"Loaded {len(matches)} matches for testing")
     
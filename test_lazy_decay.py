@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Regression check of lazy inactivity decay against the eager path, on synthetic matches.
+"""
+
+import numpy as np
+from benchmarks.synthetic import synthetic_matches
+from combined_skill import IPSCRankingSystem
+
+TOLERANCE = 1e-9
+
+def replay(matches, lazy_decay):
+    """Replay all matches with the given decay mode and return the ranking system"""
+    ranking_system = IPSCRankingSystem(lazy_decay=lazy_decay)
+    for match in matches:
+        ranking_system.process_match(match)
+    ranking_system.flush_pending_decay()
+    return ranking_system
+
+def test_lazy_decay_matches_eager():
+    """Lazy decay must reproduce the eager final ratings and decay statistics"""
+    matches = synthetic_matches(players=400, matches=150, years=3, seed=1)
+    eager = replay(matches, lazy_decay=False)
+    lazy = replay(matches, lazy_decay=True)
+
+    assert eager.store.index == lazy.store.index, "Player sets differ"
+    assert np.array_equal(eager.store.active('matches_played'), lazy.store.active('matches_played')), \
+        "Match counts differ"
+    for column in ('mu', 'sigma'):
+        max_diff = float(np.abs(eager.store.active(column) - lazy.store.active(column)).max(initial=0.0))
+        assert max_diff <= TOLERANCE, f"{column} differs by {max_diff}"
+    for key in ('players_affected', 'max_days_inactive'):
+        assert eager.time_decay_stats[key] == lazy.time_decay_stats[key], f"{key} differs"
+    assert abs(eager.time_decay_stats['total_decay_applied'] - lazy.time_decay_stats['total_decay_applied']) <= TOLERANCE
+    assert eager.time_decay_stats['max_days_inactive'] > 365, "No long inactivity was decayed"
+
+if __name__ == "__main__":
+    test_lazy_decay_matches_eager()
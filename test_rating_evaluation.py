@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Check of the vectorized predictive metrics against a pair-by-pair computation.
+"""
+
+import math
+import numpy as np
+from scipy.stats import spearmanr
+from rating_evaluation import pairwise_log_likelihood, pairwise_correct, rank_correlation, ordered_pairs
+
+TOLERANCE = 1e-9
+
+def reference_metrics(mu, sigma, scores, beta):
+    """Log-likelihood, correct pairs and ordered pairs computed one pair at a time"""
+    log_likelihood = 0.0
+    correct = 0.0
+    pairs = 0
+    for i in range(len(scores)):
+        for j in range(len(scores)):
+            if scores[i] <= scores[j]:
+                continue
+            c = math.sqrt(sigma[i] ** 2 + sigma[j] ** 2 + 2 * beta ** 2)
+            log_likelihood += math.log(1 / (1 + math.exp(-(mu[i] - mu[j]) / c)))
+            correct += 1.0 if mu[i] > mu[j] else 0.5 if mu[i] == mu[j] else 0.0
+            pairs += 1
+    return log_likelihood, correct, pairs
+
+def test_metrics_match_pairwise_loop():
+    """Vectorized metrics must equal the pair-by-pair definitions, including ties"""
+    rng = np.random.default_rng(0)
+    for size in (2, 5, 40, 150):
+        mu = rng.normal(25, 3, size)
+        mu[: size // 4] = np.round(mu[: size // 4])  # Some equal ratings
+        sigma = rng.uniform(1, 8, size)
+        scores = np.round(rng.uniform(20, 100, size), 0)  # Some tied results
+        beta = 25 / 6
+
+        log_likelihood, pairs = pairwise_log_likelihood(mu, sigma, scores, beta)
+        expected_log_likelihood, expected_correct, expected_pairs = reference_metrics(mu, sigma, scores, beta)
+
+        assert pairs == expected_pairs == ordered_pairs(scores), f"Pair counts differ for {size} players"
+        assert abs(log_likelihood - expected_log_likelihood) <= TOLERANCE * max(1.0, abs(expected_log_likelihood))
+        assert pairwise_correct(mu, scores) == expected_correct
+        assert abs(rank_correlation(mu, scores) - spearmanr(mu, scores).correlation) <= TOLERANCE
+        print(f"{size:>4} players: {pairs} pairs, log-likelihood {log_likelihood:.4f}")
+
+    assert rank_correlation([1.0, 2.0], [50.0, 50.0]) is None
+    print("✓ Vectorized predictive metrics match the pairwise definitions")
+
+if __name__ == "__main__":
+    test_metrics_match_pairwise_loop()
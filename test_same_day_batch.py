@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Checks of same-day batching: days with a single match must be rated exactly as
+in the sequential replay, and a day's updates must not depend on how the
+matches are rated (in process or in worker processes).
+"""
+
+import numpy as np
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from benchmarks.synthetic import synthetic_matches
+from combined_skill import parse_match_date
+from same_day_report import replay
+
+COLUMNS = ('mu', 'sigma', 'last_match_time', 'matches_played')
+
+def assert_same_state(expected, actual):
+    """Assert two ranking systems hold bit-identical ratings"""
+    assert expected.store.index == actual.store.index, "Player sets differ"
+    for column in COLUMNS:
+        assert np.array_equal(expected.store.active(column), actual.store.active(column)), f"{column} differs"
+    assert expected.time_decay_stats == actual.time_decay_stats, "Decay statistics differ"
+    assert expected.processed_match_ids == actual.processed_match_ids, "Processed matches differ"
+
+def test_single_match_days_match_sequential():
+    """With one match per day, batching must not change any rating"""
+    matches = synthetic_matches(players=400, matches=150, years=2, seed=4)
+    one_per_day = list({parse_match_date(match).date(): match for match in matches}.values())
+    assert len(one_per_day) < len(matches), "No day with several matches was dropped"
+
+    sequential = replay(one_per_day)
+    batched = replay(one_per_day, same_day_batch=True)
+    sequential.flush_pending_decay()
+    batched.flush_pending_decay()
+    assert_same_state(sequential, batched)
+
+def test_batches_are_deterministic():
+    """Rating a day's matches in worker processes must give the same state as in process"""
+    # A year of matches, so that many days hold several
+    matches = synthetic_matches(players=400, matches=150, years=1, seed=5)
+    assert max(Counter(parse_match_date(match).date() for match in matches).values()) > 2
+    in_process = replay(matches, same_day_batch=True)
+    with ProcessPoolExecutor(max_workers=3) as executor:
+        in_workers = replay(matches, same_day_batch=True, executor=executor)
+    assert_same_state(in_process, in_workers)
+
+def test_player_in_several_matches_of_a_day():
+    """A player in two matches of one day gets the sum of both mu changes from the day's snapshot"""
+    def match(match_id, hour, results):
+        return {
+            'match_id': match_id,
+            'match_date': f'2024-05-04T{hour:02d}:00:00Z',
+            'match_level': 'Level II',
+            'combined_results': [
+                {'first_name': name, 'last_name': 'Test', 'region': 'SWE', 'division': 'Open', 'match_percentage': score}
+                for name, score in results
+            ],
+        }
+    first = match(1, 9, [('A', 100.0), ('B', 80.0)])
+    second = match(2, 14, [('A', 60.0), ('C', 90.0)])
+
+    batched = replay([first, second], same_day_batch=True)
+    single_first = replay([first], same_day_batch=True)
+    single_second = replay([second], same_day_batch=True)
+
+    a = batched.store.index['a_test_swe_open']
+    expected_mu = (single_first.store.mu[single_first.store.index['a_test_swe_open']] +
+                   single_second.store.mu[single_second.store.index['a_test_swe_open']] - batched.model.mu)
+    assert np.isclose(batched.store.mu[a], expected_mu)
+    assert batched.store.matches_played[a] == 2
+    # Players in one match get exactly that match's result
+    assert batched.store.mu[batched.store.index['c_test_swe_open']] == \
+        single_second.store.mu[single_second.store.index['c_test_swe_open']]
+
+if __name__ == "__main__":
+    test_single_match_days_match_sequential()
+    test_batches_are_deterministic()
+    test_player_in_several_matches_of_a_day()
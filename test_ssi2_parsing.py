@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Check that the strained page parsers of ssi2.py read the same data as parsing the whole page.
+"""
+
+import ssi2
+
+SELECTION_PAGE = """
+<html><body>
+<div class="navbar"><a href="/event/22/">Events</a></div>
+<div class="ssi-table card">
+  <div class="ssi-title-row">Test Match 2024 <a class="btn btn-primary" href="/event/22/1234/">return</a></div>
+  <div class="items-spaced-8px">
+    <a href="/event/22/1234/div/open/">Open</a>
+    <a href="/event/22/1234/div/standard/">Standard</a>
+    <a href="/event/22/1234/div/combined/">Combined</a>
+    <a href="/event/22/1234/div/open/cat/lady/">Lady</a>
+  </div>
+</div>
+<div class="ssi-table">
+  <div class="ssi-title-row">Other table</div>
+</div>
+</body></html>
+"""
+
+MATCH_PAGE = """
+<html><body>
+<p>Level III</p>
+<div class="ssi-card-title">Not the date</div>
+<div class="ssi-card-title title-2">June 8, 2024, noon</div>
+</body></html>
+"""
+
+COMBINED_PAGE = """
+<html><body>
+<table class="summary"><tbody><tr><td>1</td></tr></tbody></table>
+<table id="sortTable" class="table striped"><thead><tr><th>#</th></tr></thead><tbody>
+  <tr><td>1</td><td>100.00</td><td>500.0</td><td>Anna</td><td>Test</td><td>Open</td><td>None</td>
+      <td>SWE</td><td>A</td><td></td><td>Club</td></tr>
+  <tr><td>2</td><td>80.50</td><td>402.5</td><td>Bo</td><td>Test</td><td>Production Optics</td><td>S L</td>
+      <td>NOR</td><td>B</td><td>bo</td><td>Club 2</td></tr>
+</tbody></table>
+</body></html>
+"""
+
+def parse_unstrained(parse, text):
+    """Run a page parser with its strainers disabled, i.e. on the whole page"""
+    strainers = {name: getattr(ssi2, name) for name in ('SELECTION_STRAINER', 'DATE_STRAINER', 'COMBINED_STRAINER')}
+    try:
+        for name in strainers:
+            setattr(ssi2, name, None)
+        return parse(text)
+    finally:
+        for name, strainer in strainers.items():
+            setattr(ssi2, name, strainer)
+
+def test_strained_parsers_match_whole_page():
+    """Strainers must keep the multi-class results table and read the same data as the whole page"""
+    selection = ssi2.parse_selection_page(SELECTION_PAGE)
+    assert selection == parse_unstrained(ssi2.parse_selection_page, SELECTION_PAGE)
+    assert selection['match_title'] == 'Test Match 2024'
+    assert selection['match_url'] == '/event/22/1234/'
+    assert [division['name'] for division in selection['divisions']] == ['Open', 'Standard']
+
+    match_page = ssi2.parse_match_page(MATCH_PAGE)
+    assert match_page == parse_unstrained(ssi2.parse_match_page, MATCH_PAGE)
+    assert match_page == ('Level III', '2024-06-08T12:00:00')
+
+    combined = ssi2.parse_combined_page(COMBINED_PAGE)
+    assert combined == parse_unstrained(ssi2.parse_combined_page, COMBINED_PAGE)
+    assert [result['first_name'] for result in combined] == ['Anna', 'Bo']
+    assert combined[1]['category'] == ['S', 'L']
+
+if __name__ == "__main__":
+    test_strained_parsers_match_whole_page()
@@ -11,15 +11,15 @@ from datetime import datetime
 import argparse
 
 def copy_ranking_files():
-    """Copy JSON ranking files from results/ to docs/data/"""
+    """Copy JSON ranking files (and .gz/.br siblings) from results/ to docs/data/"""
     source_dir = "results"
     target_dir = "docs/data"
     
     # Ensure target directory exists
     os.makedirs(target_dir, exist_ok=True)
     
-    # Copy all JSON files
-    json_files = [f for f in os.listdir(source_dir) if f.endswith('.json')]
+    # Copy all JSON files and their precompressed copies
+    json_files = [f for f in os.listdir(source_dir) if f.endswith(('.json', '.json.gz', '.json.br'))]
     
     copied_files = []
     for filename in json_files:
@@ -0,0 +1,220 @@
+"""
+Conflict-aware parallel replay of matches.
+Two matches without a shooter in common cannot affect each other's ratings,
+so matches are scheduled in waves over the player-overlap graph: a match goes
+in the wave after the latest wave of any of its participants. Matches in one
+wave have disjoint participants and only depend on earlier waves, so they are
+rated concurrently by forked worker processes that update the rating arrays
+in shared memory.
+
+Every match still decays and rates its participants exactly as it would at
+its position in date order (the lazy decay timeline holds all match times
+up front), so the ratings are bit-identical to a sequential replay.
+"""
+
+import copy
+import mmap
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from rating_store import to_microseconds
+
+# Rating store columns written while rating matches
+SHARED_COLUMNS = ('mu', 'sigma', 'last_match_time', 'decayed_through', 'matches_played')
+
+# Waves with fewer matches than this per worker are rated in the main process
+MIN_MATCHES_PER_WORKER = 4
+
+# Replay whose prepared matches forked workers rate (shared copy-on-write)
+_wave_replay = None
+
+
+def schedule_waves(offsets, participants, num_players):
+    """Wave of each match: one after the latest wave of any of its participants
+
+    Args:
+        offsets (np.ndarray): Match k's participants are participants[offsets[k]:offsets[k + 1]]
+        participants (np.ndarray): Player indices of all matches, in match order
+        num_players (int): Number of player indices
+
+    Returns:
+        np.ndarray: Wave number (from 0) of each match
+    """
+    last_wave = np.full(num_players, -1, dtype=np.int64)
+    waves = np.empty(len(offsets) - 1, dtype=np.int64)
+    for k in range(len(waves)):
+        players = participants[offsets[k]:offsets[k + 1]]
+        wave = int(last_wave[players].max(initial=-1)) + 1
+        waves[k] = wave
+        last_wave[players] = wave
+    return waves
+
+
+def _share_columns(store):
+    """Move the store's state columns into anonymous shared memory inherited by forked workers"""
+    for column in SHARED_COLUMNS:
+        values = store.active(column)
+        buffer = mmap.mmap(-1, max(values.nbytes, 1))
+        shared = np.frombuffer(buffer, dtype=values.dtype, count=len(values))
+        shared[:] = values
+        setattr(store, column, shared)
+
+
+def _unshare_columns(store):
+    """Copy the state columns back into ordinary arrays"""
+    for column in SHARED_COLUMNS:
+        setattr(store, column, np.array(store.active(column)))
+
+
+def _rate_forked_matches(positions):
+    """Rate matches of one wave in a forked worker"""
+    return [_wave_replay.rate_match(k) for k in positions]
+
+
+class WaveReplay:
+    """Replays matches with a ranking system, rating each wave of independent matches in parallel"""
+
+    def __init__(self, ranking_system, workers=None):
+        self.ranking_system = ranking_system
+        self.workers = max(1, workers if workers is not None else (os.cpu_count() or 1))
+
+    def unsupported_reason(self):
+        """Why this ranking system can only be replayed sequentially, or None"""
+        ranking_system = self.ranking_system
+        if not ranking_system.lazy_decay:
+            return "eager decay touches every player before each match"
+        if ranking_system.ledger is not None:
+            return "the rating ledger is written in match order"
+        if ranking_system.history_directory:
+            return "history checkpoints are taken in match order"
+        if ranking_system.same_day_batch:
+            return "same-day batches are rated from a snapshot of the day"
+        if ranking_system.evaluator is not None:
+            return "the predictive evaluator scores matches in order"
+        return None
+
+    def _prepare(self, matches):
+        """Resolve participants in match order and put every match time on the decay timeline"""
+        ranking_system = self.ranking_system
+        self.matches = [match for match in matches if match.get('combined_results')]
+        self.dates = [datetime.fromisoformat(match['match_date'].replace('Z', '+00:00')) for match in self.matches]
+        self.times = [to_microseconds(date) for date in self.dates]
+        self.levels = [match.get('match_level', 'Level II') for match in self.matches]
+        self.scores = [[result['match_percentage'] for result in match['combined_results']]
+                       for match in self.matches]
+
+        participants = []
+        offsets = [0]
+        for match in self.matches:
+            for result in match['combined_results']:
+                participants.append(ranking_system.get_or_create_player(
+                    result['first_name'],
+                    result['last_name'],
+                    result.get('region', 'Unknown'),
+                    result.get('division', 'Unknown'),
+                    result.get('alias'),
+                ))
+            offsets.append(len(participants))
+        self.participants = np.array(participants, dtype=np.int64)
+        self.offsets = np.array(offsets, dtype=np.int64)
+
+        # Match k is rated at timeline position timeline_start + k + 1, as in a sequential replay
+        self.timeline_start = ranking_system.decay_timeline_length
+        for match_time in self.times:
+            ranking_system._append_to_decay_timeline(match_time)
+
+        # One model per level so concurrent matches do not share a mutable beta
+        self.level_models = {}
+        for level in set(self.levels):
+            model = copy.copy(ranking_system.model)
+            model.beta = ranking_system.beta_values.get(level, ranking_system.beta_values['Level II'])
+            self.level_models[level] = model
+
+    def rate_match(self, k):
+        """Decay and rate match ``k`` at its sequential timeline position
+
+        Returns:
+            tuple: (match position, decay statistics of the match, players decayed, seconds)
+        """
+        started = time.perf_counter()
+        ranking_system = self.ranking_system
+        store = ranking_system.store
+        players = self.participants[self.offsets[k]:self.offsets[k + 1]].tolist()
+        position = self.timeline_start + k + 1
+
+        ranking_system.decay_statistics_log = decay_statistics = []
+        players_decayed = 0
+        for idx in players:
+            players_decayed += ranking_system.apply_pending_decay(idx, upto=position)
+            store.decayed_through[idx] = position
+        ranking_system.decay_statistics_log = None
+
+        ranking_system._update_ratings(self.level_models[self.levels[k]], self.matches[k].get('match_id', 'unknown'),
+                                       self.times[k], players, self.scores[k])
+        return k, decay_statistics, players_decayed, time.perf_counter() - started
+
+    def replay(self, matches):
+        """Rate all matches (date ordered match dicts) and return the number of waves"""
+        global _wave_replay
+        ranking_system = self.ranking_system
+
+        with ranking_system.metrics.stage('schedule'):
+            self._prepare(matches)
+            waves = schedule_waves(self.offsets, self.participants, len(ranking_system.store))
+        if len(waves) == 0:
+            return 0
+
+        order = np.argsort(waves, kind='stable')
+        bounds = np.searchsorted(waves[order], np.arange(int(waves.max()) + 2))
+        wave_sizes = np.diff(bounds)
+        print(f"Scheduled {len(waves)} matches in {len(wave_sizes)} waves "
+              f"(mean {wave_sizes.mean():.1f}, max {wave_sizes.max()} matches per wave)")
+
+        results = [None] * len(waves)
+        workers = self.workers
+        if workers > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+            print("Process forking is not available, rating the waves in this process")
+            workers = 1
+
+        _share_columns(ranking_system.store)
+        _wave_replay = self
+        executor = None
+        try:
+            if workers > 1:
+                executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork'))
+            for wave in range(len(wave_sizes)):
+                positions = order[bounds[wave]:bounds[wave + 1]]
+                if executor is None or len(positions) < MIN_MATCHES_PER_WORKER * 2:
+                    wave_results = [self.rate_match(k) for k in positions.tolist()]
+                else:
+                    chunks = np.array_split(positions, min(workers, len(positions) // MIN_MATCHES_PER_WORKER))
+                    wave_results = [result for chunk_results in executor.map(_rate_forked_matches,
+                                                                              [chunk.tolist() for chunk in chunks])
+                                    for result in chunk_results]
+                for result in wave_results:
+                    results[result[0]] = result
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            _wave_replay = None
+            _unshare_columns(ranking_system.store)
+
+        # Bookkeeping in match order, as a sequential replay would have done it
+        for k, decay_statistics, players_decayed, seconds in results:
+            for entry in decay_statistics:
+                ranking_system.add_decay_statistics(*entry)
+            match = self.matches[k]
+            ranking_system.processed_match_ids.append(match.get('match_id', 'unknown'))
+            ranking_system.processed_match_hashes.append(match.get('content_hash'))
+            players = self.participants[self.offsets[k]:self.offsets[k + 1]]
+            ranking_system.metrics.record_match(match.get('match_id', 'unknown'), seconds, len(players),
+                                                len(np.unique(players)), players_decayed)
+        ranking_system.last_match_date = self.dates[-1]
+        ranking_system.model.beta = self.level_models[self.levels[-1]].beta
+        ranking_system.ranking_cache.clear()
+        return len(wave_sizes)